@@ -0,0 +1,346 @@
+# benchmark_stages.py
+"""
+Stage-level micro-benchmarks for the speech analysis pipeline.
+
+Times the individual analysis stages on reproducible synthetic clips so a
+change to pitch tracking, fluency, scoring, text normalization or the
+aligner shows up as a number instead of a feeling. Clips are synthesized
+from a seed (voiced harmonic tones with pitch glides, noise bursts and
+silences of controlled length), so every run and every machine analyzes
+exactly the same signal.
+
+Workflow:
+1. Synthesize one clip per requested length and the text fixtures
+2. Time every benchmark (warm-up call, then --repeat timed calls)
+3. Write min / median / p95 / mean per benchmark to JSON
+4. Compare medians against a stored baseline and exit 1 on regressions
+
+Usage:
+    python benchmark_stages.py --update-baseline           # record a baseline
+    python benchmark_stages.py                             # compare against it
+    python benchmark_stages.py --lengths 1,3 --filter pitch --repeat 10
+    python benchmark_stages.py --model                     # include wav2vec2 inference
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+sys.path.append('.')
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+DEFAULT_LENGTHS = (1.0, 3.0, 10.0)
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+DEFAULT_OUTPUT = "benchmarks/latest.json"
+
+# Text fixtures: (reference, hypothesis with a few errors, language)
+TEXT_FIXTURES = {
+    "word": ("rabbit", "wabbit", "english"),
+    "sentence": ("the rabbit runs around the garden", "the wabbit wuns awound the garden", "english"),
+    "paragraph": (
+        " ".join(["she sells sea shells by the sea shore and the shells she sells are surely sea shells"] * 3),
+        " ".join(["she sells see sells by the sea sore and the shells she sells are surly sea sells"] * 3),
+        "english"
+    ),
+    "tamil": ("அம்மா பழம் சாப்பிடு", "அமா பலம் சாப்பிடு", "tamil"),
+}
+
+
+# ===== Synthetic fixtures =====
+
+def synthesize_clip(duration: float, sample_rate: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """
+    Reproducible speech-like clip of `duration` seconds.
+
+    Layout (fractions of the duration): 10% silence, 35% voiced tone gliding
+    120 -> 220 Hz, 10% noise burst (fricative), 10% silence, 25% voiced tone
+    gliding 200 -> 140 Hz, 10% silence. Voiced segments have 6 harmonics
+    with 1/k amplitudes and 20 ms fades; a -50 dB noise floor runs under
+    everything so SNR and silence detection see a realistic background.
+
+    Args:
+        duration: Clip length in seconds
+        sample_rate: Output rate
+        seed: Seed for the noise components
+
+    Returns:
+        float32 samples in [-1, 1]
+    """
+    rng = np.random.default_rng(seed)
+    total = int(round(duration * sample_rate))
+    layout = [("silence", 0.10), ("glide", 0.35, 120.0, 220.0), ("noise", 0.10),
+              ("silence", 0.10), ("glide", 0.25, 200.0, 140.0), ("silence", 0.10)]
+
+    segments = []
+    for kind, fraction, *params in layout:
+        n = int(round(fraction * total))
+        if kind == "silence":
+            segments.append(np.zeros(n))
+        elif kind == "noise":
+            segments.append(0.15 * rng.standard_normal(n) * _fade(n, sample_rate))
+        else:
+            segments.append(0.5 * _harmonic_glide(n, sample_rate, *params) * _fade(n, sample_rate))
+
+    audio = np.concatenate(segments)
+    audio = np.pad(audio, (0, max(0, total - len(audio))))[:total]
+    audio += 10 ** (-50 / 20) * rng.standard_normal(total)
+    return np.clip(audio, -1.0, 1.0).astype(np.float32)
+
+
+def _harmonic_glide(n: int, sample_rate: int, f_start: float, f_end: float, harmonics: int = 6) -> np.ndarray:
+    # Integrate the linear frequency ramp to get a continuous phase
+    frequency = np.linspace(f_start, f_end, n)
+    phase = 2 * np.pi * np.cumsum(frequency) / sample_rate
+    signal = sum(np.sin(k * phase) / k for k in range(1, harmonics + 1))
+    return signal / np.max(np.abs(signal)) if n else signal
+
+
+def _fade(n: int, sample_rate: int, seconds: float = 0.02) -> np.ndarray:
+    ramp = min(n // 2, int(seconds * sample_rate))
+    envelope = np.ones(n)
+    if ramp:
+        envelope[:ramp] = np.linspace(0, 1, ramp)
+        envelope[-ramp:] = np.linspace(1, 0, ramp)
+    return envelope
+
+
+# ===== Benchmarks =====
+
+class Benchmark:
+    """A named callable timed on one prepared fixture."""
+
+    __slots__ = ("name", "fn")
+
+    def __init__(self, name: str, fn: Callable[[], object]):
+        self.name = name
+        self.fn = fn
+
+
+def build_benchmarks(lengths, include_model: bool = False) -> List[Benchmark]:
+    """
+    Prepare fixtures and the benchmark list.
+
+    Fixture preparation (synthesis, RMS / f0 tracks used as scoring input,
+    model loading) happens here and is not timed.
+    """
+    import librosa
+    from src.services.speech_analyzer import SpeechAnalyzer
+    from src.utils.alignment import align
+    from src.utils.scoring_algorithms import ScoringAlgorithms
+    from src.utils.text_normalization import normalize_text
+
+    analyzer = SpeechAnalyzer()
+    scoring = ScoringAlgorithms()
+    benchmarks = []
+
+    # Audio stages at every clip length
+    for length in lengths:
+        audio = synthesize_clip(length)
+        rms = librosa.feature.rms(y=audio)[0]
+        f0 = librosa.yin(audio, fmin=65, fmax=2093, sr=SAMPLE_RATE)
+        f0 = f0[rms[:len(f0)] > np.max(rms) * 0.1]
+        tag = f"[{length:g}s]"
+        benchmarks += [
+            Benchmark(f"analyze_pitch{tag}", lambda a=audio: analyzer.analyze_pitch(a)),
+            Benchmark(f"analyze_pitch_fast{tag}", lambda a=audio: analyzer.analyze_pitch(a, fast=True)),
+            Benchmark(f"analyze_fluency{tag}", lambda a=audio: analyzer.analyze_fluency(a)),
+            Benchmark(f"analyze_formants{tag}", lambda a=audio: analyzer.analyze_formants(a)),
+            Benchmark(f"signal_quality{tag}", lambda a=audio: analyzer.check_signal_quality(a)),
+            Benchmark(f"scoring.calculate_pitch_score{tag}", lambda f=f0: scoring.calculate_pitch_score(f, 0.7)),
+            Benchmark(f"scoring.calculate_fluency_score{tag}",
+                      lambda r=rms: scoring.calculate_fluency_score(r, SAMPLE_RATE)),
+        ]
+
+        if include_model:
+            model = analyzer.model_wrapper or _load_model(analyzer)
+            benchmarks += [
+                Benchmark(f"model.transcribe{tag}", lambda a=audio: model.transcribe(a, sample_rate=SAMPLE_RATE)),
+                Benchmark(f"model.extract_features{tag}",
+                          lambda a=audio: model.extract_features(a, sample_rate=SAMPLE_RATE)),
+            ]
+
+    # Text stages at every text size
+    for size, (reference, hypothesis, language) in TEXT_FIXTURES.items():
+        tag = f"[{size}]"
+        phoneme_map = scoring.calculate_phoneme_similarity(hypothesis, reference, language)
+        phoneme_scores = {unit: value["score"] for unit, value in phoneme_map.items()}
+        benchmarks += [
+            Benchmark(f"normalize_text{tag}", lambda r=reference, l=language: normalize_text(r, l)),
+            Benchmark(f"align{tag}", lambda r=reference, h=hypothesis: align(r, h)),
+            Benchmark(f"scoring.calculate_position_scores{tag}",
+                      lambda r=reference, h=hypothesis, l=language: scoring.calculate_position_scores(r, h, l)),
+            Benchmark(f"scoring.calculate_phoneme_similarity{tag}",
+                      lambda r=reference, h=hypothesis, l=language: scoring.calculate_phoneme_similarity(h, r, l)),
+            Benchmark(f"scoring.calculate_pronunciation_score{tag}",
+                      lambda p=phoneme_scores: scoring.calculate_pronunciation_score(p, 0.8)),
+        ]
+
+    benchmarks.append(Benchmark(
+        "scoring.calculate_overall_score",
+        lambda: scoring.calculate_overall_score(82.0, 76.0, 88.0, acoustic_confidence=0.8)
+    ))
+    return benchmarks
+
+
+def _load_model(analyzer):
+    analyzer.load_models()
+    if analyzer.model_wrapper is None:
+        raise RuntimeError("--model requested but the wav2vec2 model could not be loaded")
+    return analyzer.model_wrapper
+
+
+def time_benchmark(benchmark: Benchmark, repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Run the benchmark and summarize its call times in milliseconds."""
+    for _ in range(warmup):
+        benchmark.fn()
+
+    # Cheap calls are looped so one sample is well above timer resolution
+    start = time.perf_counter()
+    benchmark.fn()
+    single = time.perf_counter() - start
+    loops = max(1, min(1000, int(0.01 / single))) if single > 0 else 1000
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            benchmark.fn()
+        samples.append((time.perf_counter() - start) / loops * 1000)
+
+    samples = np.array(samples)
+    return {
+        "min_ms": round(float(samples.min()), 4),
+        "median_ms": round(float(np.median(samples)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "mean_ms": round(float(samples.mean()), 4),
+        "loops": loops,
+        "repeat": repeat
+    }
+
+
+def run_benchmarks(benchmarks: List[Benchmark], repeat: int, name_filter: Optional[str] = None) -> Dict:
+    """Time every (matching) benchmark; returns the JSON report."""
+    import librosa
+
+    results = {}
+    for benchmark in benchmarks:
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        results[benchmark.name] = time_benchmark(benchmark, repeat)
+        print(f"⏱️  {benchmark.name:<50} {results[benchmark.name]['median_ms']:>10.3f} ms")
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "librosa": librosa.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+
+
+def compare(report: Dict, baseline: Dict, threshold: float = 0.25, min_delta_ms: float = 0.05) -> List[Dict]:
+    """
+    Compare medians against a baseline report.
+
+    Args:
+        report: run_benchmarks() output
+        baseline: A previously saved report
+        threshold: Relative slowdown that counts as a regression (0.25 = 25%)
+        min_delta_ms: Absolute slowdowns below this are timer noise
+
+    Returns:
+        One entry per benchmark present in both, with "ratio" and "status"
+        ("regression", "improvement" or "ok")
+    """
+    rows = []
+    for name, result in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None or previous["median_ms"] <= 0:
+            continue
+        ratio = result["median_ms"] / previous["median_ms"]
+        delta = result["median_ms"] - previous["median_ms"]
+        status = "ok"
+        if ratio > 1 + threshold and delta > min_delta_ms:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold) and -delta > min_delta_ms:
+            status = "improvement"
+        rows.append({
+            "name": name,
+            "baseline_ms": previous["median_ms"],
+            "current_ms": result["median_ms"],
+            "ratio": round(ratio, 3),
+            "status": status
+        })
+    return rows
+
+
+def _write_json(path: str, data: Dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark individual speech analysis stages")
+    parser.add_argument("--lengths", default=",".join(f"{length:g}" for length in DEFAULT_LENGTHS),
+                        help="comma-separated clip lengths in seconds")
+    parser.add_argument("--repeat", type=int, default=5, help="timed samples per benchmark")
+    parser.add_argument("--filter", help="only benchmarks whose name contains this")
+    parser.add_argument("--model", action="store_true", help="also time wav2vec2 inference")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write this run's JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown that fails the run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    lengths = [float(length) for length in args.lengths.split(",") if length]
+
+    report = run_benchmarks(build_benchmarks(lengths, args.model), args.repeat, args.filter)
+    _write_json(args.output, report)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.update_baseline:
+        _write_json(args.baseline, report)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️  No baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        rows = compare(report, json.load(f), args.threshold)
+    report["comparison"] = rows
+    _write_json(args.output, report)
+
+    regressions = [row for row in rows if row["status"] == "regression"]
+    for row in rows:
+        if row["status"] != "ok":
+            icon = "❌" if row["status"] == "regression" else "✅"
+            print(f"{icon} {row['name']}: {row['baseline_ms']:.3f} -> {row['current_ms']:.3f} ms (x{row['ratio']})")
+    print(f"\n{len(regressions)} regression(s) in {len(rows)} compared benchmarks")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Speech Analysis Stage Benchmarks")
+    print("=" * 60)
+    sys.exit(main())
@@ -0,0 +1,383 @@
+# load_test_api.py
+"""
+End-to-end API load test against an in-memory MongoDB.
+
+Boots src.main:app in-process with connect_to_mongo swapped for a
+mongomock-motor client, seeds users and exercises, and drives a realistic
+mix of login, exercise listing, speech analysis and progress calls from
+concurrent async clients (httpx over ASGI, no sockets). Concurrency is
+stepped up until the worker breaks (error rate or analyze p95 over the
+limit), so the capacity of a single worker can be measured before a
+rollout without a live database.
+
+Analysis runs in LOAD_TEST_MODE by default (seeded synthetic results with
+sampled stage latencies, see services/synthetic_load.py); --real-models
+runs actual inference instead. Clients and server share one event loop,
+so the numbers include the harness' own overhead - compare runs with each
+other rather than with production dashboards.
+
+Workflow:
+1. Patch src.main.connect_to_mongo, run the app's startup handlers
+2. Seed --users users (one shared password hash) and --exercises exercises
+3. For each concurrency step: every virtual user logs in, then picks
+   weighted actions for --step-duration seconds
+4. Print throughput and p50/p90/p95/p99 per endpoint for each step; stop
+   at the first step past --max-error-rate or --slo-p95
+5. Optionally write every step's report to --output as JSON
+
+Needs httpx and mongomock-motor (pip install -r requirements-dev.txt).
+
+Usage:
+    python load_test_api.py --steps 1,2,4,8,16 --step-duration 30
+    python load_test_api.py --users 200 --exercises 50 --steps 32 --output load.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import sys
+import time
+import wave
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+sys.path.append('.')
+
+import numpy as np
+
+from src.config import settings
+
+# Relative weights of the actions a logged-in user takes
+DEFAULT_MIX = {
+    "exercises": 35,
+    "analyze": 25,
+    "progress_stats": 20,
+    "progress_history": 15,
+    "login": 5,
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+SEED_WORDS = [
+    ("rabbit", "r", "en"), ("sun", "s", "en"), ("lollipop", "l", "en"), ("shoe", "sh", "en"),
+    ("thumb", "th", "en"), ("garden", "g", "en"), ("அம்மா", "ம", "ta"), ("பழம்", "ழ", "ta"),
+]
+
+
+# ===== In-memory database =====
+
+async def connect_in_memory():
+    """Drop-in for connect_to_mongo backed by mongomock-motor."""
+    from beanie import init_beanie
+    from mongomock_motor import AsyncMongoMockClient
+    from src.database.database import db, DOCUMENT_MODELS
+
+    db.client = AsyncMongoMockClient()
+    await init_beanie(database=db.client[settings.MONGODB_DATABASE], document_models=DOCUMENT_MODELS)
+    print(f"✅ Connected to in-memory MongoDB: {settings.MONGODB_DATABASE}")
+
+
+def load_app(real_models: bool = False, job_workers: int = 0):
+    """Import the app with the in-memory database and load-test settings."""
+    settings.LOAD_TEST_MODE = not real_models
+    settings.JOB_WORKERS = job_workers
+
+    import src.main
+    src.main.connect_to_mongo = connect_in_memory
+    return src.main.app
+
+
+async def seed(users: int, exercises: int, password: str) -> Dict[str, List[str]]:
+    """
+    Insert test users and exercises.
+
+    Returns:
+        {"emails": [...], "exercise_ids": [...]}
+    """
+    from src.api.auth import get_password_hash
+    from src.database.models import User, Exercise
+    from src.utils.text_normalization import prepare_text
+
+    # Hashing is deliberately slow; one hash serves every seeded user
+    password_hash = get_password_hash(password)
+    emails = [f"loadtest{i}@example.com" for i in range(users)]
+    await User.insert_many([
+        User(email=email, username=f"loadtest{i}", password_hash=password_hash, age=7)
+        for i, email in enumerate(emails)
+    ])
+
+    documents = []
+    for i in range(exercises):
+        word, phoneme, language = SEED_WORDS[i % len(SEED_WORDS)]
+        documents.append(Exercise(
+            title=f"Load test {i}: {word}",
+            description="Seeded by load_test_api.py",
+            target_word=word,
+            target_phoneme=phoneme,
+            difficulty="easy",
+            exercise_type="word",
+            language=language,
+            target_prepared=prepare_text(word, language).to_document()
+        ))
+    await Exercise.insert_many(documents)
+    exercise_ids = [str(exercise.id) for exercise in await Exercise.find_all().to_list()]
+    return {"emails": emails, "exercise_ids": exercise_ids}
+
+
+def wav_bytes(audio: np.ndarray, sample_rate: int = 16000) -> bytes:
+    """Encode float samples as a 16-bit mono WAV file."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def synthetic_clips(count: int = 3) -> List[bytes]:
+    """A few distinct speech-like WAV uploads (2-5 s)."""
+    from benchmark_stages import synthesize_clip
+
+    return [wav_bytes(synthesize_clip(2.0 + 1.5 * i, seed=i)) for i in range(count)]
+
+
+# ===== Measurement =====
+
+class EndpointStats:
+    """Latencies and status codes per endpoint for one step."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, seconds: float, status: int):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+    def summary(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            values = np.array(latencies) * 1000
+            errors = sum(count for status, count in self.statuses[endpoint].items() if status >= 400)
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+                "errors": errors,
+                "statuses": dict(self.statuses[endpoint]),
+                **{f"p{p}_ms": round(float(np.percentile(values, p)), 1) for p in PERCENTILES},
+                "max_ms": round(float(values.max()), 1)
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        errors = sum(endpoint["errors"] for endpoint in endpoints.values())
+        return {
+            "requests": total,
+            "rps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "endpoints": endpoints
+        }
+
+
+class VirtualUser:
+    """One logged-in client picking weighted actions until the deadline."""
+
+    def __init__(self, client, email: str, password: str, fixtures: Dict, stats: EndpointStats,
+                 rng: random.Random, mix: Dict[str, int], think_time: float = 0.0):
+        self.client = client
+        self.email = email
+        self.password = password
+        self.fixtures = fixtures
+        self.stats = stats
+        self.rng = rng
+        self.actions = list(mix)
+        self.weights = [mix[action] for action in self.actions]
+        self.think_time = think_time
+        self.headers = {}
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            status = response.status_code
+        except Exception as e:
+            print(f"⚠️ {endpoint} failed: {e}")
+            response, status = None, 599
+        self.stats.record(endpoint, time.perf_counter() - started, status)
+        return response
+
+    async def login(self):
+        self.headers = {}
+        response = await self._request(
+            "login", "POST", "/api/auth/login/json", json={"email": self.email, "password": self.password}
+        )
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def exercises(self):
+        await self._request("exercises", "GET", "/api/exercises/", params={"limit": 20})
+
+    async def analyze(self):
+        clip = self.rng.choice(self.fixtures["clips"])
+        await self._request(
+            "analyze", "POST", "/api/speech/analyze",
+            files={"audio": ("clip.wav", clip, "audio/wav")},
+            data={"exercise_id": self.rng.choice(self.fixtures["exercise_ids"])}
+        )
+
+    async def progress_stats(self):
+        await self._request("progress_stats", "GET", "/api/progress/stats")
+
+    async def progress_history(self):
+        await self._request("progress_history", "GET", "/api/progress/history", params={"limit": 10})
+
+    async def run(self, deadline: float):
+        await self.login()
+        while time.perf_counter() < deadline:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            await getattr(self, action)()
+            if self.think_time:
+                await asyncio.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+
+class LoadTest:
+    """
+    Stepped load test of one in-process API worker.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.reports: List[Dict] = []
+
+    async def run_step(self, client, fixtures: Dict, concurrency: int) -> Dict:
+        """Run `concurrency` virtual users for --step-duration seconds."""
+        stats = EndpointStats()
+        deadline = time.perf_counter() + self.args.step_duration
+        users = [
+            VirtualUser(
+                client,
+                fixtures["emails"][i % len(fixtures["emails"])],
+                self.args.password,
+                fixtures,
+                stats,
+                random.Random(self.args.seed * 1000 + concurrency * 100 + i),
+                self.mix,
+                self.args.think_time
+            )
+            for i in range(concurrency)
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*(user.run(deadline) for user in users))
+        report = stats.summary(time.perf_counter() - started)
+        report["concurrency"] = concurrency
+
+        health = await client.get("/health")
+        if health.status_code == 200:
+            report["analysis"] = health.json().get("analysis")
+            report["load_shedding"] = health.json().get("load_shedding")
+        return report
+
+    def breaking_reason(self, report: Dict) -> Optional[str]:
+        if report["error_rate"] > self.args.max_error_rate:
+            return f"error rate {report['error_rate']:.1%} > {self.args.max_error_rate:.1%}"
+        analyze = report["endpoints"].get("analyze")
+        if analyze and analyze["p95_ms"] / 1000 > self.args.slo_p95:
+            return f"analyze p95 {analyze['p95_ms'] / 1000:.2f}s > {self.args.slo_p95:.2f}s"
+        return None
+
+    async def run(self, app) -> List[Dict]:
+        import httpx
+
+        await app.router.startup()
+        try:
+            fixtures = await seed(self.args.users, self.args.exercises, self.args.password)
+            fixtures["clips"] = synthetic_clips()
+            print(f"🌱 Seeded {self.args.users} users and {self.args.exercises} exercises")
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+                for concurrency in parse_steps(self.args.steps):
+                    report = await self.run_step(client, fixtures, concurrency)
+                    self.reports.append(report)
+                    print_report(report)
+                    reason = self.breaking_reason(report)
+                    if reason:
+                        report["breaking_point"] = reason
+                        print(f"💥 Breaking point at {concurrency} concurrent users: {reason}")
+                        break
+        finally:
+            await app.router.shutdown()
+
+        if self.args.output:
+            with open(self.args.output, "w", encoding="utf-8") as f:
+                json.dump({
+                    "created_at": datetime.utcnow().isoformat(),
+                    "config": vars(self.args),
+                    "steps": self.reports
+                }, f, indent=2)
+            print(f"💾 Report written to {self.args.output}")
+        return self.reports
+
+
+def print_report(report: Dict):
+    print(f"\n👥 {report['concurrency']} users: {report['requests']} requests, "
+          f"{report['rps']:.1f} req/s, error rate {report['error_rate']:.1%}")
+    print(f"   {'endpoint':<18}{'req':>7}{'req/s':>9}{'err':>6}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES))
+    for name, endpoint in report["endpoints"].items():
+        print(f"   {name:<18}{endpoint['requests']:>7}{endpoint['rps']:>9.1f}{endpoint['errors']:>6}"
+              + "".join(f"{endpoint[f'p{p}_ms']:>8.0f}ms" for p in PERCENTILES))
+
+
+def parse_steps(steps: str) -> List[int]:
+    return [int(step) for step in steps.split(",") if step]
+
+
+def parse_mix(mix: Optional[str]) -> Dict[str, int]:
+    """"analyze=50,exercises=50" -> weights (unlisted actions are disabled)."""
+    if not mix:
+        return dict(DEFAULT_MIX)
+    weights = {}
+    for item in mix.split(","):
+        action, _, weight = item.partition("=")
+        if action not in DEFAULT_MIX:
+            raise ValueError(f"Unknown action {action!r}; expected one of {sorted(DEFAULT_MIX)}")
+        weights[action] = int(weight)
+    return weights
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the API in-process against an in-memory MongoDB")
+    parser.add_argument("--users", type=int, default=50, help="seeded users (clients reuse them round-robin)")
+    parser.add_argument("--exercises", type=int, default=20, help="seeded exercises")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--steps", default="1,2,4,8,16,32", help="comma-separated concurrency levels")
+    parser.add_argument("--step-duration", type=float, default=20.0, help="seconds per concurrency level")
+    parser.add_argument("--mix", help="action weights, e.g. analyze=50,exercises=30,progress_stats=20")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's requests")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="stop when a step exceeds this")
+    parser.add_argument("--slo-p95", type=float, default=settings.ANALYSIS_LATENCY_SLO_SECONDS,
+                        help="stop when analyze p95 (seconds) exceeds this")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the users' action choices")
+    parser.add_argument("--real-models", action="store_true", help="run real inference instead of LOAD_TEST_MODE")
+    parser.add_argument("--job-workers", type=int, default=0, help="in-process job queue workers")
+    parser.add_argument("--output", help="write the step reports to this JSON file")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    app = load_app(args.real_models, args.job_workers)
+    await LoadTest(args).run(app)
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Speech Therapy API Load Test")
+    print("=" * 60)
+
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main())
@@ -0,0 +1,326 @@
+# reanalyze_sessions.py
+"""
+Bulk re-analysis of stored practice sessions.
+
+Re-runs the speech analysis pipeline over the audio kept for historical
+sessions (see KEEP_SESSION_AUDIO) and writes the new scores back, e.g.
+after a model or scoring-weight change.
+
+Workflow:
+1. Stream completed sessions in _id order (resuming after the checkpoint)
+2. Resolve each session's audio file and exercise target (one $in query
+   per chunk for uncached exercises)
+3. Analyze chunks in a process pool; each worker uses batched inference
+   (SpeechAnalyzer.analyze_batch)
+4. Write the new scores with unordered bulk writes and advance the
+   checkpoint once every earlier chunk is done
+5. Report throughput; in --dry-run mode print score diffs instead of writing
+
+Usage:
+    python reanalyze_sessions.py --dry-run --limit 200
+    python reanalyze_sessions.py --workers 4 --batch-size 16 --checkpoint reanalysis.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+sys.path.append('.')
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from src.config import settings
+
+SCORE_FIELDS = ("overall_score", "pronunciation_score", "pitch_score", "fluency_score", "confidence_score")
+SESSION_PROJECTION = {"_id": 1, "exercise_id": 1, "audio_url": 1, **{field: 1 for field in SCORE_FIELDS}}
+
+# ===== Worker process =====
+
+_analyzer = None
+
+
+def _init_worker(torch_threads: int):
+    """Load the models once per worker process."""
+    global _analyzer
+    from src.services.speech_analyzer import SpeechAnalyzer, HAS_AI_LIBS
+
+    if not HAS_AI_LIBS:
+        raise RuntimeError("AI libraries are not installed; refusing to write mock scores")
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    _analyzer = SpeechAnalyzer()
+    _analyzer.ensure_models_loaded()
+    if _analyzer.model_wrapper is None:
+        raise RuntimeError("Wav2Vec2 model could not be loaded")
+
+
+def _analyze_chunk(clips: List[Dict]) -> List[Dict]:
+    """
+    Analyze one chunk; returns Session field updates or {"error": ...} per clip.
+    """
+    from src.services.session_service import session_scores
+
+    updates = []
+    for result in _analyzer.analyze_batch(clips, shed=False):
+        if result.get("is_mock"):
+            # analyze_batch falls back to mock scores when a clip fails
+            updates.append({"error": "analysis failed"})
+        elif not result.get("success"):
+            updates.append({"error": result.get("error", "analysis failed")})
+        else:
+            updates.append(session_scores(result))
+    return updates
+
+
+# ===== Checkpoint =====
+
+def load_checkpoint(path: Optional[str]) -> Dict:
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"last_id": None, "processed": 0, "updated": 0, "failed": 0, "missing_audio": 0}
+
+
+def save_checkpoint(path: Optional[str], checkpoint: Dict):
+    if not path:
+        return
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, path)
+
+
+# ===== Main process =====
+
+class Reanalysis:
+    """
+    Streams sessions, fans chunks out to the pool and applies the results.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.checkpoint = {"last_id": None, "processed": 0, "updated": 0, "failed": 0, "missing_audio": 0}
+        if not args.dry_run and not args.restart:
+            self.checkpoint = load_checkpoint(args.checkpoint)
+        self.exercises: Dict[str, Optional[Dict]] = {}
+        self.deltas: Dict[str, List[float]] = {field: [] for field in SCORE_FIELDS}
+        self.started = time.perf_counter()
+        self.processed_this_run = 0
+        self.total = 0
+        self.last_report = 0.0
+
+    def audio_path(self, session: Dict) -> Optional[str]:
+        """Stored audio for a session, or None when it was not kept."""
+        if not session.get("audio_url"):
+            return None
+        path = os.path.join(self.args.audio_dir, os.path.basename(session["audio_url"]))
+        return path if os.path.exists(path) else None
+
+    async def load_exercises(self, sessions: List[Dict]):
+        """Fetch uncached exercises for a chunk with one $in query."""
+        from src.database.models import Exercise
+
+        wanted = {s["exercise_id"] for s in sessions if s.get("exercise_id")} - set(self.exercises)
+        object_ids = [ObjectId(exercise_id) for exercise_id in wanted if ObjectId.is_valid(exercise_id)]
+        for exercise_id in wanted:
+            self.exercises[exercise_id] = None
+        if object_ids:
+            cursor = Exercise.get_motor_collection().find(
+                {"_id": {"$in": object_ids}},
+                {"target_word": 1, "language": 1, "target_prepared": 1}
+            )
+            async for exercise in cursor:
+                self.exercises[str(exercise["_id"])] = exercise
+
+    def clip(self, session: Dict, audio_path: str) -> Dict:
+        exercise = self.exercises.get(session.get("exercise_id")) if session.get("exercise_id") else None
+        return {
+            "audio_path": audio_path,
+            "reference_text": exercise["target_word"] if exercise else "General Speech Practice",
+            "language": exercise.get("language") if exercise else None,
+            "prepared_target": exercise.get("target_prepared") if exercise else None,
+        }
+
+    async def run(self, pool=None):
+        """Re-analyze all matching sessions (pool: defaults to a process pool)."""
+        from src.database.models import Session
+
+        collection = Session.get_motor_collection()
+        query = {"is_completed": True}
+        if self.args.exercise_id:
+            query["exercise_id"] = self.args.exercise_id
+        if self.args.since:
+            query["timestamp"] = {"$gte": datetime.fromisoformat(self.args.since)}
+        if self.checkpoint["last_id"]:
+            query["_id"] = {"$gt": ObjectId(self.checkpoint["last_id"])}
+            print(f"↪️  Resuming after {self.checkpoint['last_id']} ({self.checkpoint['processed']} done)")
+
+        self.total = await collection.count_documents(query)
+        if self.args.limit:
+            self.total = min(self.total, self.args.limit)
+        print(f"🔎 {self.total} sessions to re-analyze{' (dry run)' if self.args.dry_run else ''}")
+
+        if pool is None:
+            # Spawned workers each load their own model (forking torch is unsafe)
+            pool_context = ProcessPoolExecutor(
+                max_workers=self.args.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.args.torch_threads,)
+            )
+        else:
+            pool_context = nullcontext(pool)
+
+        pending = deque()
+        with pool_context as pool:
+            loop = asyncio.get_running_loop()
+            chunk: List[Dict] = []
+            cursor = collection.find(query, SESSION_PROJECTION).sort("_id", 1).batch_size(500)
+            if self.args.limit:
+                cursor = cursor.limit(self.args.limit)
+
+            async for session in cursor:
+                chunk.append(session)
+                if len(chunk) < self.args.batch_size:
+                    continue
+                pending.append(await self.submit(pool, loop, chunk))
+                chunk = []
+                # Keep a bounded window of chunks in flight
+                while len(pending) >= self.args.workers * 2:
+                    await self.complete(collection, *pending.popleft())
+
+            if chunk:
+                pending.append(await self.submit(pool, loop, chunk))
+            while pending:
+                await self.complete(collection, *pending.popleft())
+
+        self.report(final=True)
+
+    async def submit(self, pool, loop, sessions: List[Dict]):
+        """Resolve audio and targets, then send the chunk to the pool."""
+        await self.load_exercises(sessions)
+        runnable, clips = [], []
+        for session in sessions:
+            audio_path = self.audio_path(session)
+            if audio_path is None:
+                self.checkpoint["missing_audio"] += 1
+                continue
+            runnable.append(session)
+            clips.append(self.clip(session, audio_path))
+
+        future = loop.run_in_executor(pool, _analyze_chunk, clips) if clips else None
+        return future, sessions, runnable
+
+    async def complete(self, collection, future, sessions: List[Dict], runnable: List[Dict]):
+        """Apply one finished chunk (in submission order) and advance the checkpoint."""
+        updates = await future if future is not None else []
+        now = datetime.utcnow()
+        operations = []
+        for session, update in zip(runnable, updates):
+            if "error" in update:
+                self.checkpoint["failed"] += 1
+                continue
+            self.diff(session, update)
+            operations.append(UpdateOne({"_id": session["_id"]}, {"$set": {**update, "reanalyzed_at": now}}))
+
+        if operations and not self.args.dry_run:
+            result = await collection.bulk_write(operations, ordered=False)
+            self.checkpoint["updated"] += result.modified_count
+        elif operations:
+            self.checkpoint["updated"] += len(operations)
+
+        self.checkpoint["processed"] += len(sessions)
+        self.checkpoint["last_id"] = str(sessions[-1]["_id"])
+        self.processed_this_run += len(sessions)
+        if not self.args.dry_run:
+            save_checkpoint(self.args.checkpoint, self.checkpoint)
+        self.report()
+
+    def diff(self, session: Dict, update: Dict):
+        """Track score deltas; print large ones in dry-run mode."""
+        changes = []
+        for field in SCORE_FIELDS:
+            old, new = session.get(field), update.get(field)
+            if old is None or new is None:
+                continue
+            delta = new - old
+            self.deltas[field].append(delta)
+            if abs(delta) >= self.args.diff_threshold:
+                changes.append(f"{field} {old:.1f} -> {new:.1f} ({delta:+.1f})")
+        if self.args.dry_run and changes:
+            print(f"   {session['_id']}: " + ", ".join(changes))
+
+    def report(self, final: bool = False):
+        """Throughput line every --report-every seconds (and at the end)."""
+        now = time.perf_counter()
+        if not final and now - self.last_report < self.args.report_every:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        rate = self.processed_this_run / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.processed_this_run, 0)
+        eta = f"{remaining / rate / 60:.1f} min" if rate > 0 and not final else "-"
+        print(
+            f"📈 {self.processed_this_run}/{self.total} sessions | {rate:.2f} clips/s | ETA {eta} | "
+            f"updated {self.checkpoint['updated']}, failed {self.checkpoint['failed']}, "
+            f"missing audio {self.checkpoint['missing_audio']}"
+        )
+        if final:
+            for field, deltas in self.deltas.items():
+                if deltas:
+                    mean = sum(deltas) / len(deltas)
+                    mean_abs = sum(abs(d) for d in deltas) / len(deltas)
+                    print(f"   {field}: mean change {mean:+.2f}, mean |change| {mean_abs:.2f}, "
+                          f"max |change| {max(abs(d) for d in deltas):.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Re-analyze stored session audio and update scores")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="analysis processes (each loads its own model)")
+    parser.add_argument("--batch-size", type=int, default=settings.INFERENCE_BATCH_SIZE,
+                        help="clips per worker task / model batch")
+    parser.add_argument("--torch-threads", type=int, default=1, help="torch threads per worker (0 = torch default)")
+    parser.add_argument("--audio-dir", default=settings.SESSION_AUDIO_DIR, help="where session audio is stored")
+    parser.add_argument("--exercise-id", help="only sessions of this exercise")
+    parser.add_argument("--since", help="only sessions from this ISO date on")
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many sessions")
+    parser.add_argument("--checkpoint", default="reanalysis_checkpoint.json", help="resume file")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="print score diffs, write nothing")
+    parser.add_argument("--diff-threshold", type=float, default=5.0, help="smallest change printed in dry runs")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between throughput lines")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    from src.database.database import connect_to_mongo, close_mongo_connection
+
+    args = parse_args(argv)
+    await connect_to_mongo()
+    try:
+        await Reanalysis(args).run()
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Speech Therapy Session Re-analysis")
+    print("=" * 60)
+
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main())
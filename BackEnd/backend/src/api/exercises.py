@@ -6,6 +6,7 @@ from datetime import datetime
 from src.database.models import Exercise, ExerciseType, DifficultyLevel, LanguageCode, User
 from src.database.schemas import ExerciseCreate, ExerciseUpdate, ExerciseResponse
 from src.api.auth import get_current_active_user
+from src.utils.text_normalization import prepare_text
 
 router = APIRouter()
 
@@ -121,7 +122,8 @@ async def create_exercise(
         badge_reward=exercise_data.badge_reward,
         created_by=str(current_user.id),
         created_at=datetime.utcnow(),
-        is_active=True
+        is_active=True,
+        target_prepared=prepare_text(exercise_data.target_word, exercise_data.language).to_document()
     )
     
     await new_exercise.insert()
@@ -171,6 +173,9 @@ async def update_exercise(
     for field, value in update_data.items():
         setattr(exercise, field, value)
     
+    # Keep the pre-normalized scoring target in sync
+    exercise.target_prepared = prepare_text(exercise.target_word, exercise.language).to_document()
+    
     await exercise.save()
     
     return ExerciseResponse(
@@ -0,0 +1,58 @@
+#backend/src/api/metrics.py
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from src.utils.metrics import REGISTRY, CONTENT_TYPE
+
+router = APIRouter()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration by route",
+    ["method", "route", "status"]
+)
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=REGISTRY.render(), headers={"Content-Type": CONTENT_TYPE})
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the matched route template (not the raw
+    path) so ids in URLs do not explode the label set. Written as plain
+    ASGI so streaming (SSE) responses and disconnect detection pass
+    through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"]
+            )
@@ -0,0 +1,138 @@
+#backend/src/api/profiling.py
+import asyncio
+import os
+import random
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from jose import JWTError, jwt
+from pydantic import BaseModel, Field
+
+from src.api.auth import get_current_active_user
+from src.config import settings
+from src.database.models import User, UserRole
+from src.utils import profiler
+
+router = APIRouter()
+
+
+class ProfileTokenRequest(BaseModel):
+    mode: str = "sample"
+    ttl_seconds: int = Field(300, ge=1, le=600)
+
+
+async def require_admin(current_user: User = Depends(get_current_active_user)) -> User:
+    """Only admins may profile requests or read profiles"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
+@router.post("/token")
+async def create_profile_token(body: ProfileTokenRequest, admin: User = Depends(require_admin)):
+    """
+    Mint a signed, single-use X-Profile header value.
+
+    Send it as `X-Profile: <value>` on the request to profile, authenticated
+    as the same admin; the response carries `X-Profile-Id`, the id to
+    download the profile with.
+    """
+    try:
+        value = profiler.sign_profile_header(admin.email, body.mode, body.ttl_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"header": "X-Profile", "value": value, "expires_in": body.ttl_seconds}
+
+
+@router.get("/", response_model=List[Dict])
+async def list_profiles(admin: User = Depends(require_admin)):
+    """Stored profiles, newest first"""
+    return profiler.list_profiles()
+
+
+@router.get("/{request_id}")
+async def download_profile(request_id: str, admin: User = Depends(require_admin)):
+    """Download a profile (.folded collapsed stacks or .prof pstats)"""
+    path = profiler.profile_path(request_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=os.path.basename(path), media_type="application/octet-stream")
+
+
+def _token_subject(headers: Dict[bytes, bytes]) -> Optional[str]:
+    """Subject (email) of the request's bearer token, if it is valid."""
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests on demand.
+
+    A request is profiled when its X-Profile header carries a valid
+    signature (see /api/admin/profiles/token) or, failing that, with
+    probability PROFILE_SAMPLE_RATE. The response then gets an
+    X-Profile-Id header and the profile is stored under that id. Requests
+    to the profile endpoints and /metrics are never sampled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _mode(self, scope) -> Optional[str]:
+        headers = dict(scope.get("headers") or [])
+        value = headers.get(profiler.PROFILE_HEADER.encode("latin-1"))
+        if value is not None:
+            return profiler.verify_profile_header(value.decode("latin-1"), _token_subject(headers))
+        path = scope.get("path", "")
+        if path.startswith("/api/admin/profiles") or path == "/metrics":
+            return None
+        if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+            return settings.PROFILE_DEFAULT_MODE
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = self._mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id_header = headers.get(profiler.REQUEST_ID_HEADER.encode("latin-1"))
+        request_id = profiler.request_id_from(request_id_header.decode("latin-1") if request_id_header else None)
+        status_code = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code["code"] = message["status"]
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"x-profile-id", request_id.encode("latin-1"))]
+                }
+            await send(message)
+
+        session = profiler.ProfileSession(mode, request_id)
+        token = profiler.activate(session)
+        session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.stop()
+            profiler.deactivate(token)
+            metadata = {"method": scope["method"], "path": scope["path"], "status": status_code["code"]}
+            try:
+                # Writing pstats / stacks is blocking file I/O
+                await asyncio.get_running_loop().run_in_executor(None, session.save, metadata)
+                print(f"🔬 Profiled {scope['method']} {scope['path']} ({mode}) as {request_id}")
+            except Exception as e:
+                print(f"⚠️ Could not store profile {request_id}: {e}")
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from src.database.models import User, Session, Progress, Exercise
 from src.database.schemas import UserStatistics, SessionResponse, ProgressResponse
 from src.api.auth import get_current_active_user
+from src.utils.series_codec import unpack_pitch_analysis
 
 router = APIRouter()
 
@@ -172,9 +173,15 @@ async def get_phoneme_mastery(current_user: User = Depends(get_current_active_us
 @router.get("/history", response_model=List[SessionResponse])
 async def get_session_history(
     limit: int = 10, 
+    include_contour: bool = False,
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get recent practice sessions"""
+    """
+    Get recent practice sessions.
+    
+    Pitch contours are stored encoded and only decoded (and returned as
+    `pitch_analysis`) when `include_contour` is set.
+    """
     print("DEBUG: Fetching history")
     sessions = await Session.find({"user_id": str(current_user.id)}).sort("-timestamp").limit(limit).to_list(None)
     
@@ -182,6 +189,8 @@ async def get_session_history(
     for s in sessions:
         s_dict = s.dict()
         s_dict['id'] = str(s.id) 
+        if include_contour:
+            s_dict['pitch_analysis'] = unpack_pitch_analysis(s.pitch_contour)
         result.append(SessionResponse(**s_dict))
         
     return result
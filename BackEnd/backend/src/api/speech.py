@@ -1,45 +1,89 @@
 #backend/src/api/speech.py
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request, Header, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, JSONResponse
+import asyncio
 import tempfile
+import time
 import os
 import json
 import shutil
+import uuid
 from typing import Optional, Dict, List
 from datetime import datetime
-try:
-    import librosa
-    HAS_LIBROSA = True
-except ImportError:
-    HAS_LIBROSA = False
 
 from src.services.speech_analyzer import SpeechAnalyzer
 from src.services.audio_processor import AudioProcessor
+from src.services.analysis_executor import analysis_executor, ExecutorOverloadedError, AnalysisTimeoutError
+from src.services.cancellation import (
+    CLIENT_CLOSED_REQUEST, CancellationToken, AnalysisCancelledError, ClientDisconnectedError,
+    run_until_disconnected
+)
+from src.services.session_service import record_session, record_sessions, session_response
+from src.services.job_queue import enqueue_job, TERMINAL_STATUSES
+from src.services.idempotency import (
+    claim_key, request_fingerprint, MAX_KEY_LENGTH,
+    IdempotencyKeyMismatchError, IdempotencyInProgressError
+)
 from src.api.auth import get_current_user
-from src.database.models import User, Session, Progress, Exercise
+from src.config import settings
+from src.database.models import User, Session, Progress, Exercise, AnalysisJob
 from src.database.schemas import SessionResponse
+from beanie import PydanticObjectId
+from beanie.operators import In
 
 router = APIRouter()
 speech_analyzer = SpeechAnalyzer()
 audio_processor = AudioProcessor()
 
+def rerecord_detail(analysis_result: Dict) -> Dict:
+    """Error detail for a clip rejected by the signal-quality gate."""
+    return {
+        "message": analysis_result["error"],
+        "issues": analysis_result["issues"],
+        "signal_quality": analysis_result["signal_quality"]
+    }
+
 @router.post("/analyze", response_model=dict)
 async def analyze_speech(
+    request: Request,
     audio: UploadFile = File(...),
     exercise_id: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    include_timings: bool = Query(False, alias="timings"),
     current_user: User = Depends(get_current_user)
 ):
     """
     Analyze speech audio and provide feedback
+    
+    If the client disconnects before the result is ready the analysis is
+    cancelled at its next checkpoint and no session is saved.
+    
+    With an `Idempotency-Key` header a retried request gets the original
+    response back (header `Idempotent-Replayed: true`) instead of a second
+    analysis and session; a duplicate sent while the original is still
+    running waits for its result.
+    
+    `?timings=true` adds a per-stage `timings` block (DEBUG only).
     """
+    request_started = time.perf_counter()
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
     temp_path = None
+    claim = None
     try:
         # Validate exercise exists if ID provided
         target_text = "General Speech Practice"
+        language = None
+        prepared_target = None
         if exercise_id:
             exercise = await Exercise.get(exercise_id)
             if not exercise:
                 raise HTTPException(status_code=404, detail="Exercise not found")
             target_text = exercise.target_word
+            language = exercise.language
+            prepared_target = exercise.target_prepared
 
         # Save uploaded file temporarily
         suffix = os.path.splitext(audio.filename)[1] or ".wav"
@@ -47,67 +91,93 @@ async def analyze_speech(
             shutil.copyfileobj(audio.file, tmp_file)
             temp_path = tmp_file.name
         
-        # Analyze speech using AI
+        # Claim the idempotency key, or replay the stored response
+        if idempotency_key:
+            with open(temp_path, "rb") as f:
+                fingerprint = request_fingerprint(exercise_id, f)
+            claim, stored = await claim_key(current_user.id, idempotency_key, fingerprint)
+            if stored is not None:
+                return JSONResponse(
+                    status_code=stored.status_code,
+                    content=stored.response,
+                    headers={"Idempotent-Replayed": "true"}
+                )
+        
+        # Analyze speech using AI (on the analysis pool, off the event loop)
         # We pass the target word/sentence as reference text
-        analysis_result = speech_analyzer.analyze_audio(
-            temp_path,
-            reference_text=target_text
+        cancel_token = CancellationToken()
+        executor_timings = {}
+        analysis_result = await run_until_disconnected(
+            request,
+            analysis_executor.run(
+                speech_analyzer.analyze_audio,
+                temp_path,
+                reference_text=target_text,
+                language=language,
+                prepared_target=prepared_target,
+                cancel_token=cancel_token,
+                timings=executor_timings
+            ),
+            cancel_token
         )
+        analysis_timings = analysis_result.pop("timings", None)
+        
+        if analysis_result.get("needs_rerecord"):
+            # Unusable recording: ask for a new one, nothing is saved
+            detail = rerecord_detail(analysis_result)
+            if claim:
+                await claim.complete(422, jsonable_encoder({"detail": detail}))
+            raise HTTPException(status_code=422, detail=detail)
         
         if not analysis_result["success"]:
             raise HTTPException(status_code=500, detail=analysis_result.get("error", "Analysis failed"))
         
-        # Get duration safely
-        duration = 0
-        if HAS_LIBROSA:
-            try:
-                duration = librosa.get_duration(filename=temp_path)
-            except:
-                pass
-        
-        if duration == 0:
-            # Fallback duration for mock mode or failure
-            import random
-            duration = random.randint(5, 15)
-        
-        # Save session to MongoDB
-        new_session = Session(
-            user_id=str(current_user.id),
-            exercise_id=exercise_id,
-            audio_url=f"/uploads/{os.path.basename(temp_path)}", # Placeholder URL
-            duration=duration,
-            pronunciation_score=analysis_result["overall_score"],
-            pitch_score=analysis_result["pitch_analysis"]["score"],
-            fluency_score=analysis_result["fluency_score"],
-            confidence_score=analysis_result.get("acoustic_confidence", 0) * 100, # Use actual model confidence
-            overall_score=analysis_result["overall_score"], 
-            mispronounced_phonemes=analysis_result["mispronounced_phonemes"],
-            pitch_contour=analysis_result["pitch_analysis"],
-            ai_feedback=analysis_result["feedback"],
-            suggestions=analysis_result["suggestions"],
-            strengths=analysis_result.get("strengths", []),
-            areas_to_improve=analysis_result.get("areas_to_improve", []),
-            points_earned=10 if analysis_result["pronunciation_score"] > 60 else 5,
-            is_completed=True
-        )
-        
-        await new_session.insert()
+        # Save session to MongoDB and update progress (unless nobody is waiting)
+        if await request.is_disconnected():
+            raise ClientDisconnectedError("Client disconnected before the session was saved")
+        persist_started = time.perf_counter()
+        # With a key the session id is fixed first: a takeover or retry reuses it
+        session_id = await claim.reserve_session() if claim else None
+        new_session = await record_session(current_user.id, exercise_id, temp_path, analysis_result, session_id)
+        persist_seconds = time.perf_counter() - persist_started
         
-        # Update User Progress (Async/Background simplified)
-        await update_user_progress(current_user.id, new_session)
-
-        return {
-            "session_id": str(new_session.id),
-            "analysis": analysis_result,
-            "feedback": analysis_result["feedback"],
-            "suggestions": analysis_result["suggestions"],
-            "points_earned": new_session.points_earned
-        }
+        response = session_response(new_session, analysis_result)
+        if claim:
+            await claim.complete(200, jsonable_encoder(response))
+        if include_timings and settings.DEBUG:
+            response["timings"] = {
+                "analysis": analysis_timings,
+                "queue_wait": round(executor_timings.get("queue_wait", 0.0), 4),
+                "executor_run": round(executor_timings.get("run", 0.0), 4),
+                "persist": round(persist_seconds, 4),
+                "request_total": round(time.perf_counter() - request_started, 4)
+            }
+        return response
             
+    except HTTPException:
+        raise
+    except IdempotencyKeyMismatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except (ClientDisconnectedError, AnalysisCancelledError) as e:
+        print(f"🛑 Analysis abandoned: {e}")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except AnalysisTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         print(f"Error in analyze_speech: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
+        # A failed attempt must not pin the key: let the retry run again
+        if claim and not claim.finished:
+            try:
+                await claim.release()
+            except Exception:
+                pass
+        
         # Cleanup temporary file
         if temp_path and os.path.exists(temp_path):
             try:
@@ -115,31 +185,233 @@ async def analyze_speech(
             except:
                 pass
 
-async def update_user_progress(user_id: str, session: Session):
-    """Update user's daily progress stats"""
-    user_id_str = str(user_id)
-    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    # specific query for Beanie might need adjustment depending on datetime storage, 
-    # but basic find should work.
-    # Note: Querying by date range is safer.
+
+@router.post("/analyze/batch", response_model=dict)
+async def analyze_speech_batch(
+    request: Request,
+    audio: List[UploadFile] = File(...),
+    exercise_ids: List[str] = Form([]),
+    include_timings: bool = Query(False, alias="timings"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Analyze many clips (a therapist's whole session) in one request.
     
-    progress = await Progress.find_one(
-        Progress.user_id == user_id_str,
-        Progress.date >= today
-    )
+    `exercise_ids` repeats once per clip, in the same order as `audio`
+    (empty for general practice), or is omitted entirely.
     
-    if not progress:
-        progress = Progress(user_id=user_id_str, date=today)
-        await progress.insert()
+    Workflow:
+    1. Fetch all exercises with one `$in` query
+    2. Analyze every clip in one executor task (batched model inference)
+    3. Insert all sessions with insert_many and update progress once
     
-    progress.sessions_completed += 1
-    progress.total_points += session.points_earned
-    if session.duration:
-        progress.total_duration += session.duration / 60
+    Each clip gets its own status in `results`; clips that fail do not
+    fail the batch. `?timings=true` adds per-clip timings (DEBUG only).
+    """
+    if len(audio) > settings.BATCH_MAX_CLIPS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_CLIPS} clips per batch")
+    if exercise_ids and len(exercise_ids) != len(audio):
+        raise HTTPException(status_code=422, detail="Provide one exercise_id per audio clip")
+    clip_exercise_ids = [exercise_id or None for exercise_id in exercise_ids] or [None] * len(audio)
+
+    temp_paths: List[str] = []
+    try:
+        # Step 1: One query for all referenced exercises
+        object_ids = set()
+        for exercise_id in clip_exercise_ids:
+            if exercise_id and PydanticObjectId.is_valid(exercise_id):
+                object_ids.add(PydanticObjectId(exercise_id))
+        exercises = {}
+        if object_ids:
+            found = await Exercise.find(In(Exercise.id, list(object_ids))).to_list()
+            exercises = {str(exercise.id): exercise for exercise in found}
+
+        results: List[Optional[Dict]] = [None] * len(audio)
+        clips, clip_index = [], []
+        for i, (upload, exercise_id) in enumerate(zip(audio, clip_exercise_ids)):
+            exercise = exercises.get(exercise_id) if exercise_id else None
+            if exercise_id and exercise is None:
+                results[i] = {"index": i, "exercise_id": exercise_id, "status_code": 404, "detail": "Exercise not found"}
+                continue
+
+            suffix = os.path.splitext(upload.filename or "")[1] or ".wav"
+            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+                shutil.copyfileobj(upload.file, tmp_file)
+                temp_paths.append(tmp_file.name)
+
+            clips.append({
+                "audio_path": tmp_file.name,
+                "reference_text": exercise.target_word if exercise else "General Speech Practice",
+                "language": exercise.language if exercise else None,
+                "prepared_target": exercise.target_prepared if exercise else None,
+            })
+            clip_index.append(i)
+
+        # Step 2: Analyze the whole batch as one executor task
+        analyses = []
+        if clips:
+            cancel_token = CancellationToken()
+            batches = -(-len(clips) // settings.INFERENCE_BATCH_SIZE)
+            analyses = await run_until_disconnected(
+                request,
+                analysis_executor.run(
+                    speech_analyzer.analyze_batch,
+                    clips,
+                    timeout=settings.ANALYSIS_TIMEOUT_SECONDS * batches,
+                    cancel_token=cancel_token
+                ),
+                cancel_token
+            )
+
+        # Step 3: Bulk-insert the successful clips
+        entries, entry_index = [], []
+        clip_timings = {}
+        for i, clip, analysis_result in zip(clip_index, clips, analyses):
+            exercise_id = clip_exercise_ids[i]
+            clip_timings[i] = analysis_result.pop("timings", None)
+            if analysis_result.get("needs_rerecord"):
+                results[i] = {"index": i, "exercise_id": exercise_id, "status_code": 422,
+                              "detail": rerecord_detail(analysis_result)}
+            elif not analysis_result["success"]:
+                results[i] = {"index": i, "exercise_id": exercise_id, "status_code": 500,
+                              "detail": analysis_result.get("error", "Analysis failed")}
+            else:
+                entries.append((exercise_id, clip["audio_path"], analysis_result))
+                entry_index.append(i)
+
+        if await request.is_disconnected():
+            raise ClientDisconnectedError("Client disconnected before the sessions were saved")
+        sessions = await record_sessions(current_user.id, entries)
+        for i, session, (exercise_id, _, analysis_result) in zip(entry_index, sessions, entries):
+            results[i] = {"index": i, "exercise_id": exercise_id, "status_code": 200,
+                          **session_response(session, analysis_result)}
+            if include_timings and settings.DEBUG:
+                results[i]["timings"] = clip_timings[i]
+
+        return {
+            "results": results,
+            "summary": {
+                "clips": len(audio),
+                "succeeded": len(sessions),
+                "failed": len(audio) - len(sessions),
+                "points_earned": sum(session.points_earned for session in sessions)
+            }
+        }
+
+    except HTTPException:
+        raise
+    except (ClientDisconnectedError, AnalysisCancelledError) as e:
+        print(f"🛑 Batch analysis abandoned: {e}")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except AnalysisTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        print(f"Error in analyze_speech_batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+
+
+# ===== Asynchronous analysis jobs =====
+
+def job_status(job: AnalysisJob) -> Dict:
+    """Client view of a job."""
+    status = {
+        "job_id": str(job.id),
+        "status": job.status.value,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+        "session_id": job.session_id,
+        "status_url": f"/api/speech/jobs/{job.id}",
+        "events_url": f"/api/speech/jobs/{job.id}/events",
+    }
+    if job.status in TERMINAL_STATUSES:
+        status["result"] = job.result
+    return status
+
+async def get_owned_job(job_id: str, user: User) -> AnalysisJob:
+    try:
+        job = await AnalysisJob.get(job_id)
+    except Exception:
+        job = None
+    if not job or job.user_id != str(user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/jobs", response_model=dict, status_code=202)
+async def submit_analysis_job(
+    audio: UploadFile = File(...),
+    exercise_id: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue speech audio for analysis and return a job id immediately.
     
-    # Update average score (simplified running average)
-    current_total_score = (progress.average_score * (progress.sessions_completed - 1)) + session.pronunciation_score
-    progress.average_score = current_total_score / progress.sessions_completed
+    Poll GET /jobs/{job_id} or subscribe to GET /jobs/{job_id}/events (SSE);
+    the session is saved when the job completes.
+    """
+    if exercise_id and not await Exercise.get(exercise_id):
+        raise HTTPException(status_code=404, detail="Exercise not found")
+
+    # Store the audio where workers can read it until the job finishes
+    os.makedirs(settings.JOB_AUDIO_DIR, exist_ok=True)
+    suffix = os.path.splitext(audio.filename or "")[1] or ".wav"
+    audio_path = os.path.join(settings.JOB_AUDIO_DIR, f"{uuid.uuid4().hex}{suffix}")
+    with open(audio_path, "wb") as buffer:
+        shutil.copyfileobj(audio.file, buffer)
+
+    job = await enqueue_job(current_user.id, exercise_id, audio_path)
+    return job_status(job)
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def get_analysis_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Current status of an analysis job (with the result once finished)."""
+    return job_status(await get_owned_job(job_id, current_user))
+
+@router.get("/jobs/{job_id}/events")
+async def stream_analysis_job(job_id: str, request: Request, current_user: User = Depends(get_current_user)):
+    """
+    Server-sent events for an analysis job.
     
-    await progress.save()
+    Emits a `status` event whenever the status changes and closes after the
+    terminal (completed/failed) event.
+    """
+    job = await get_owned_job(job_id, current_user)
+
+    async def events():
+        last_status = None
+        idle = 0.0
+        current = job
+        while True:
+            if current.status != last_status:
+                last_status = current.status
+                idle = 0.0
+                yield f"event: status\ndata: {json.dumps(jsonable_encoder(job_status(current)))}\n\n"
+                if current.status in TERMINAL_STATUSES:
+                    return
+            elif idle >= 15:
+                # Keep proxies from closing an idle stream
+                idle = 0.0
+                yield ": keep-alive\n\n"
+
+            await asyncio.sleep(settings.JOB_EVENTS_POLL_INTERVAL)
+            idle += settings.JOB_EVENTS_POLL_INTERVAL
+            if await request.is_disconnected():
+                return
+            current = await AnalysisJob.get(job.id) or current
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
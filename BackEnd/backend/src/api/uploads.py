@@ -0,0 +1,311 @@
+#backend/src/api/uploads.py
+import asyncio
+import os
+import shutil
+import uuid
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from starlette.requests import ClientDisconnect
+
+from src.api import video
+from src.api.auth import get_current_user
+from src.api.speech import job_status
+from src.config import settings
+from src.database.models import User, Exercise
+from src.services.analysis_executor import analysis_executor, ExecutorOverloadedError, AnalysisTimeoutError
+from src.services.cancellation import (
+    CLIENT_CLOSED_REQUEST, CancellationToken, AnalysisCancelledError, ClientDisconnectedError,
+    run_until_disconnected
+)
+from src.services.job_queue import enqueue_job
+from src.services.resumable_uploads import (
+    UPLOAD_KINDS, ResumableUpload, UploadNotFoundError, UploadOffsetMismatchError, UploadTooLargeError,
+    upload_store
+)
+from src.utils.video_decoder import VideoDecodeError
+
+router = APIRouter()
+
+OFFSET_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+class CreateUploadRequest(BaseModel):
+    kind: str = Field(..., description="video (session video) or audio (e.g. story recording)")
+    length: int = Field(..., gt=0, description="Total size in bytes")
+    filename: str = "upload"
+    exercise_id: Optional[str] = None
+
+
+class EarlyAnalysis:
+    """Speech scoring of one video upload while its bytes arrive (this process only)."""
+
+    def __init__(self):
+        self.state: Optional[Dict] = None
+        self.analyzed_offset = 0
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_token = CancellationToken()
+
+
+_early: Dict[str, EarlyAnalysis] = {}
+
+
+def upload_headers(upload: ResumableUpload) -> Dict[str, str]:
+    return {
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.length),
+        "Cache-Control": "no-store"
+    }
+
+
+def upload_status(upload: ResumableUpload) -> Dict:
+    early = _early.get(upload.upload_id)
+    return {
+        "upload_id": upload.upload_id,
+        "kind": upload.kind,
+        "offset": upload.offset,
+        "length": upload.length,
+        "complete": upload.complete,
+        "chunk_size": settings.RESUMABLE_CHUNK_SIZE,
+        "utterances_scored": len(early.state["utterances"]) if early and early.state else 0
+    }
+
+
+def get_owned_upload(upload_id: str, user: User) -> ResumableUpload:
+    try:
+        return upload_store.get(upload_id, str(user.id))
+    except UploadNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+
+async def exercise_target(exercise_id: Optional[str]) -> Dict:
+    """Target text for speech scoring (as in /api/speech/analyze)."""
+    target = {"reference_text": "General Speech Practice", "language": None, "prepared_target": None}
+    if exercise_id:
+        exercise = await Exercise.get(exercise_id)
+        if not exercise:
+            raise HTTPException(status_code=404, detail="Exercise not found")
+        target = {
+            "reference_text": exercise.target_word,
+            "language": exercise.language,
+            "prepared_target": exercise.target_prepared
+        }
+    return target
+
+
+def schedule_early_analysis(upload: ResumableUpload):
+    """
+    Start a speech scoring pass over the received part of a video upload.
+
+    At most one pass per upload runs at a time, and only after
+    RESUMABLE_EARLY_ANALYSIS_STEP new bytes; passes go through the
+    analysis executor, so they count against its limits like any analysis.
+    """
+    if upload.kind != "video" or not settings.RESUMABLE_EARLY_ANALYSIS or upload.complete:
+        return
+    early = _early.setdefault(upload.upload_id, EarlyAnalysis())
+    if early.task is not None and not early.task.done():
+        return
+    if upload.offset - early.analyzed_offset < settings.RESUMABLE_EARLY_ANALYSIS_STEP:
+        return
+    early.analyzed_offset = upload.offset
+    early.task = asyncio.create_task(_early_pass(upload, early))
+
+
+async def _early_pass(upload: ResumableUpload, early: EarlyAnalysis):
+    try:
+        target = await exercise_target(upload.exercise_id)
+        early.state = await analysis_executor.run(
+            video.video_analyzer.prescore_speech,
+            upload_store.data_path(upload),
+            early.state,
+            cancel_token=early.cancel_token,
+            **target
+        )
+    except (ExecutorOverloadedError, AnalysisTimeoutError, AnalysisCancelledError) as e:
+        # Skipped; finalize scores whatever is left
+        print(f"⏭️ Early analysis of upload {upload.upload_id} skipped: {e}")
+    except Exception as e:
+        print(f"⚠️ Early analysis of upload {upload.upload_id} failed: {e}")
+
+
+def discard_early_analysis(upload_id: str):
+    """Forget an upload's early analysis; a running pass stops at its next checkpoint."""
+    early = _early.pop(upload_id, None)
+    if early is not None:
+        early.cancel_token.cancel("upload discarded")
+
+
+async def prune_expired_uploads():
+    """Remove expired uploads (off the event loop) and their early analyses."""
+    pruned = await asyncio.get_running_loop().run_in_executor(None, upload_store.prune_expired)
+    for upload_id in pruned:
+        discard_early_analysis(upload_id)
+
+
+@router.post("", status_code=201)
+async def create_upload(
+    body: CreateUploadRequest,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Start a resumable upload.
+
+    Send the bytes with PATCH /api/uploads/{upload_id} (header
+    Upload-Offset, body application/offset+octet-stream), check progress
+    with HEAD after a broken connection, and POST .../finalize once all
+    bytes are in.
+    """
+    if body.kind not in UPLOAD_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(UPLOAD_KINDS)}")
+    if body.exercise_id:
+        await exercise_target(body.exercise_id)
+    await prune_expired_uploads()
+    try:
+        upload = upload_store.create(current_user.id, body.kind, body.length, body.filename, body.exercise_id)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    response.headers.update(upload_headers(upload))
+    response.headers["Location"] = f"/api/uploads/{upload.upload_id}"
+    return upload_status(upload)
+
+
+@router.get("")
+async def list_uploads(current_user: User = Depends(get_current_user)):
+    """Unfinished uploads of the current user (resume after an app restart)"""
+    return [upload_status(upload) for upload in upload_store.list_for_user(str(current_user.id))]
+
+
+@router.head("/{upload_id}")
+async def upload_offset(upload_id: str, current_user: User = Depends(get_current_user)):
+    """Bytes received so far (Upload-Offset header)"""
+    upload = get_owned_upload(upload_id, current_user)
+    return Response(status_code=200, headers=upload_headers(upload))
+
+
+@router.get("/{upload_id}")
+async def get_upload(upload_id: str, current_user: User = Depends(get_current_user)):
+    """Upload progress as JSON"""
+    return upload_status(get_owned_upload(upload_id, current_user))
+
+
+@router.patch("/{upload_id}", status_code=204)
+async def append_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset_header: int = Header(..., alias="Upload-Offset", ge=0),
+    content_type: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Append bytes at Upload-Offset.
+
+    409 (with the current Upload-Offset) when the offset is not where the
+    upload stands; whatever arrived before a connection broke is kept.
+    """
+    if (content_type or "").split(";")[0].strip() != OFFSET_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {OFFSET_CONTENT_TYPE}")
+    upload = get_owned_upload(upload_id, current_user)
+    try:
+        upload = await upload_store.append(upload, upload_offset_header, request.stream())
+    except UploadOffsetMismatchError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.expected)})
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ClientDisconnect:
+        # Received bytes are stored; the client resumes from HEAD
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    schedule_early_analysis(upload)
+    return Response(status_code=204, headers=upload_headers(upload))
+
+
+@router.post("/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, request: Request, current_user: User = Depends(get_current_user)):
+    """
+    Analyze a complete upload.
+
+    video: runs the video analysis (same result as /api/video/analyze);
+           utterances scored while uploading are not scored again
+    audio: queued as a speech analysis job (202, same as /api/speech/jobs)
+
+    Holds the upload's lock: a concurrent finalize or DELETE waits and then
+    finds the upload gone (404).
+    """
+    get_owned_upload(upload_id, current_user)
+    async with upload_store.locked(upload_id):
+        return await _finalize_locked(upload_id, request, current_user)
+
+
+async def _finalize_locked(upload_id: str, request: Request, current_user: User):
+    upload = get_owned_upload(upload_id, current_user)
+    if not upload.complete:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {upload.offset} of {upload.length} bytes",
+            headers={"Upload-Offset": str(upload.offset)}
+        )
+    target = await exercise_target(upload.exercise_id)
+    data_path = upload_store.data_path(upload)
+
+    if upload.kind == "audio":
+        os.makedirs(settings.JOB_AUDIO_DIR, exist_ok=True)
+        suffix = os.path.splitext(upload.filename)[1] or ".wav"
+        audio_path = os.path.join(settings.JOB_AUDIO_DIR, f"{uuid.uuid4().hex}{suffix}")
+        # The job directory may be on another device: move copies then
+        await asyncio.get_running_loop().run_in_executor(None, shutil.move, data_path, audio_path)
+        upload_store.delete(upload, keep_data=True)
+        job = await enqueue_job(current_user.id, upload.exercise_id, audio_path)
+        return JSONResponse(status_code=202, content=jsonable_encoder(job_status(job)))
+
+    # Let a running early pass finish: its utterances are not scored again
+    early = _early.get(upload.upload_id)
+    if early is not None and early.task is not None:
+        await early.task
+    prescored = early.state if early is not None else None
+
+    try:
+        cancel_token = CancellationToken()
+        analysis_result = await run_until_disconnected(
+            request,
+            analysis_executor.run(
+                video.video_analyzer.analyze_video,
+                data_path,
+                cancel_token=cancel_token,
+                prescored=prescored,
+                **target
+            ),
+            cancel_token
+        )
+    except (ClientDisconnectedError, AnalysisCancelledError) as e:
+        # The upload stays; finalize can be retried
+        print(f"🛑 Video analysis abandoned: {e}")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except AnalysisTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except VideoDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        print(f"Error in finalize_upload: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    discard_early_analysis(upload.upload_id)
+    upload_store.delete(upload)
+    return {"message": "Analysis Complete", "result": analysis_result}
+
+
+@router.delete("/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str, current_user: User = Depends(get_current_user)):
+    """Abandon an upload and its data (waits for a running finalize)"""
+    get_owned_upload(upload_id, current_user)
+    async with upload_store.locked(upload_id):
+        upload = get_owned_upload(upload_id, current_user)
+        discard_early_analysis(upload.upload_id)
+        upload_store.delete(upload)
+    return Response(status_code=204)
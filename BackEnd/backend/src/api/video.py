@@ -1,42 +1,87 @@
 #backend/src/api/video.py
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request
+import asyncio
 import tempfile
 import os
 import shutil
+from typing import Optional
 from src.services.video_analyzer import VideoAnalyzer
+from src.utils.video_decoder import VideoDecodeError
+from src.services.analysis_executor import analysis_executor, ExecutorOverloadedError, AnalysisTimeoutError
+from src.services.cancellation import (
+    CLIENT_CLOSED_REQUEST, CancellationToken, AnalysisCancelledError, ClientDisconnectedError,
+    run_until_disconnected
+)
 from src.api.auth import get_current_user
-from src.database.models import User
+from src.database.models import User, Exercise
 
 router = APIRouter()
 video_analyzer = VideoAnalyzer()
 
 @router.post("/analyze", response_model=dict)
 async def analyze_video(
+    request: Request,
     video: UploadFile = File(...),
+    exercise_id: Optional[str] = Form(None),
     current_user: User = Depends(get_current_user)
 ):
     """
     Analyze video to detect child activities.
+    
+    The audio track is scored utterance by utterance against the
+    exercise's target word (if `exercise_id` is given), so one upload
+    yields both the visual and the speech analysis.
     """
     temp_path = None
     try:
-        # Save uploaded file temporarily
+        target_text = "General Speech Practice"
+        language = None
+        prepared_target = None
+        if exercise_id:
+            exercise = await Exercise.get(exercise_id)
+            if not exercise:
+                raise HTTPException(status_code=404, detail="Exercise not found")
+            target_text = exercise.target_word
+            language = exercise.language
+            prepared_target = exercise.target_prepared
+
+        # Save uploaded file temporarily (off the event loop: session videos are large)
         suffix = os.path.splitext(video.filename)[1] or ".mp4"
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            shutil.copyfileobj(video.file, tmp_file)
             temp_path = tmp_file.name
+            await asyncio.get_running_loop().run_in_executor(None, shutil.copyfileobj, video.file, tmp_file)
         
-        # Analyze video using Mock AI
-        analysis_result = video_analyzer.analyze_video(temp_path)
-        
-        if not analysis_result["success"]:
-            raise HTTPException(status_code=500, detail="Video analysis failed")
-            
+        # Analyze sampled frames and the audio track (on the analysis pool, off the event loop)
+        cancel_token = CancellationToken()
+        analysis_result = await run_until_disconnected(
+            request,
+            analysis_executor.run(
+                video_analyzer.analyze_video,
+                temp_path,
+                reference_text=target_text,
+                language=language,
+                prepared_target=prepared_target,
+                cancel_token=cancel_token
+            ),
+            cancel_token
+        )
+
         return {
             "message": "Analysis Complete",
             "result": analysis_result
         }
             
+    except HTTPException:
+        raise
+    except VideoDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except (ClientDisconnectedError, AnalysisCancelledError) as e:
+        print(f"🛑 Video analysis abandoned: {e}")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except AnalysisTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         print(f"Error in analyze_video: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -50,6 +50,81 @@ class Settings(BaseSettings):
     MIN_PRONUNCIATION_SCORE: float = 60.0
     MIN_CONFIDENCE_SCORE: float = 0.7
     
+    # Signal-quality gate (clips failing it are not analyzed)
+    QUALITY_GATE_ENABLED: bool = True
+    QUALITY_MIN_SNR_DB: float = 10.0
+    QUALITY_MAX_CLIPPING_RATIO: float = 0.01
+    QUALITY_MIN_SPEECH_DURATION: float = 0.3  # seconds
+    QUALITY_MAX_DC_OFFSET: float = 0.1
+    
+    # Analysis execution (CPU-bound work runs off the event loop)
+    ANALYSIS_MAX_WORKERS: int = 2
+    ANALYSIS_MAX_QUEUE: int = 16
+    ANALYSIS_TIMEOUT_SECONDS: float = 120.0
+    PIPELINE_BRANCH_WORKERS: int = 4  # Concurrent branches within one analysis; 1 = sequential
+    INFERENCE_BATCH_SIZE: int = 8  # Clips per wav2vec2 forward pass in batch analysis
+    BATCH_MAX_CLIPS: int = 50  # Clips accepted by /api/speech/analyze/batch
+    ANALYSIS_LATENCY_WINDOW: int = 50  # Recent analyses kept for latency percentiles
+    
+    # Load shedding (optional analysis stages are degraded or skipped)
+    SHED_ENABLED: bool = True
+    SHED_QUEUE_DEPTH: int = 4  # Shed when this many analyses are waiting
+    ANALYSIS_LATENCY_SLO_SECONDS: float = 8.0  # ... or when recent p95 exceeds this
+    
+    # Load-test mode: seeded synthetic results with sampled stage latencies
+    # instead of model inference (see services/synthetic_load.py)
+    LOAD_TEST_MODE: bool = False
+    LOAD_TEST_SEED: int = 1234
+    LOAD_TEST_STAGE_LATENCIES: dict = {}  # {"pronunciation": [median_seconds, sigma], ...} overrides
+    LOAD_TEST_LATENCY_SCALE: float = 1.0  # 0 = no sleeps
+    
+    # On-demand request profiling (src/utils/profiler.py)
+    PROFILING_SECRET: str = os.getenv("PROFILING_SECRET", "")  # signs X-Profile headers; empty disables them
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of requests profiled without a header
+    PROFILE_DEFAULT_MODE: str = "sample"  # "sample" (stack sampling) or "cprofile"
+    PROFILE_SAMPLE_INTERVAL: float = 0.005  # seconds between stack samples
+    PROFILE_DIR: str = "uploads/profiles"
+    PROFILE_MAX_STORED: int = 50
+    
+    # Video analysis (sampled frames analyzed on a process pool)
+    VIDEO_FRAME_WORKERS: int = 2  # Frame analysis processes; 0 = analyze inline
+    VIDEO_SAMPLE_FPS: float = 4.0  # Frames analyzed per second of video
+    VIDEO_FRAME_MAX_SIDE: int = 320  # Frames are scaled down to this longer side
+    VIDEO_FRAME_BATCH: int = 16  # Frames per process pool task
+    VIDEO_MAX_FRAMES: int = 600  # Longer videos are sampled sparser
+    VIDEO_SEEK_GAP_SECONDS: float = 2.0  # Seek instead of decoding through larger gaps
+    VIDEO_MAX_UTTERANCES: int = 40  # Utterances of the audio track scored per video
+    VIDEO_MOUTH_OVERSAMPLE: int = 3  # Lip motion sampled at this multiple of VIDEO_SAMPLE_FPS; 1 = off
+    
+    # Analysis job queue (/api/speech/jobs)
+    JOB_WORKERS: int = 1  # In-process workers; 0 on API-only nodes
+    JOB_POLL_INTERVAL: float = 1.0  # seconds between polls of an empty queue
+    JOB_LEASE_SECONDS: float = 300.0  # a running job is reclaimed after this
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 5.0  # delay before the first retry; doubles with each attempt
+    JOB_RETRY_BACKOFF_MAX: float = 300.0
+    JOB_OVERLOAD_RETRY_SECONDS: float = 2.0  # executor full: retry after this, without using an attempt
+    JOB_AUDIO_DIR: str = "uploads/jobs"
+    JOB_EVENTS_POLL_INTERVAL: float = 0.5  # SSE status polling
+    
+    # Session audio retention (needed by reanalyze_sessions.py)
+    KEEP_SESSION_AUDIO: bool = False
+    SESSION_AUDIO_DIR: str = "uploads/sessions"
+    
+    # Idempotency-Key support on /api/speech/analyze
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # stored responses are replayed for a day
+    IDEMPOTENCY_LOCK_SECONDS: float = 180.0  # an in-flight key whose owner stopped renewing is taken over after this
+    IDEMPOTENCY_WAIT_SECONDS: float = 150.0  # how long a duplicate waits for the in-flight result
+    IDEMPOTENCY_POLL_INTERVAL: float = 0.5
+    
+    # Resumable uploads (/api/uploads); own directory, not AudioProcessor's uploads/audio
+    RESUMABLE_UPLOAD_DIR: str = "uploads/resumable"
+    RESUMABLE_MAX_UPLOAD_SIZE: int = 1024 * 1024 * 1024  # 1GB
+    RESUMABLE_CHUNK_SIZE: int = 5 * 1024 * 1024  # suggested PATCH size
+    RESUMABLE_UPLOAD_TTL_SECONDS: int = 86400  # unfinished uploads are deleted after a day
+    RESUMABLE_EARLY_ANALYSIS: bool = True  # score the received audio while the upload runs
+    RESUMABLE_EARLY_ANALYSIS_STEP: int = 2 * 1024 * 1024  # new bytes between early passes
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -2,7 +2,17 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from src.config import settings
-from src.database.models import User, Exercise, Session, Progress
+from src.database.models import User, Exercise, Session, Progress, AnalysisJob, IdempotencyRecord
+
+# Every Beanie document, registered on connect (also used by in-memory setups)
+DOCUMENT_MODELS = [
+    User,
+    Exercise,
+    Session,
+    Progress,
+    AnalysisJob,
+    IdempotencyRecord,
+]
 
 class Database:
     client: AsyncIOMotorClient = None
@@ -18,12 +28,7 @@ async def connect_to_mongo():
         # Initialize Beanie with document models
         await init_beanie(
             database=db.client[settings.MONGODB_DATABASE],
-            document_models=[
-                User,
-                Exercise,
-                Session,
-                Progress,
-            ]
+            document_models=DOCUMENT_MODELS
         )
         
         print(f"✅ Connected to MongoDB: {settings.MONGODB_DATABASE}")
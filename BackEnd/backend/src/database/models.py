@@ -1,5 +1,6 @@
 #backend\src\database\models.py
 from beanie import Document, Indexed
+from pymongo import IndexModel, ASCENDING
 from pydantic import Field, EmailStr
 from typing import Optional, List, Dict
 from datetime import datetime
@@ -30,6 +31,16 @@ class LanguageCode(str, Enum):
     TELUGU = "te"
     KANNADA = "kn"
 
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class IdempotencyStatus(str, Enum):
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
 # MongoDB Document Models using Beanie
 
 class User(Document):
@@ -129,6 +140,9 @@ class Exercise(Document):
     points: int = 10
     badge_reward: Optional[str] = None
     
+    # Scoring: normalized/tokenized target_word, refreshed on create/update
+    target_prepared: Optional[Dict] = None
+    
     class Settings:
         name = "exercises"
         indexes = [
@@ -159,8 +173,8 @@ class Session(Document):
     
     # Detailed Analysis
     mispronounced_phonemes: Optional[List[str]] = []
-    pitch_contour: Optional[Dict] = None  # {time: pitch_value}
-    formant_data: Optional[Dict] = None
+    pitch_contour: Optional[Dict] = None  # pitch analysis; "pitch_contour" key is a series_codec blob
+    formant_data: Optional[Dict] = None  # {voiced_frames, f1/f2/f3: {mean, median, std} in Hz}
     transcription: Optional[str] = None
     
     # AI Feedback
@@ -176,6 +190,8 @@ class Session(Document):
     # Status
     is_completed: bool = False
     attempts: int = 1
+    reanalyzed_at: Optional[datetime] = None  # Set by reanalyze_sessions.py
+    job_id: Optional[str] = None  # AnalysisJob that recorded it (also the session's _id)
     
     class Settings:
         name = "sessions"
@@ -248,4 +264,57 @@ class Feedback(Document):
             "user_id",
             "feedback_by",
             "created_at",
-        ]
\ No newline at end of file
+        ]
+
+
+class AnalysisJob(Document):
+    """Queued speech analysis; the collection doubles as the durable work queue"""
+    user_id: str
+    exercise_id: Optional[str] = None
+    audio_path: str
+    
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    worker_id: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None  # A running job past its lease is reclaimed
+    not_before: Optional[datetime] = None  # A requeued job waits until then (retry backoff)
+    
+    # Outcome
+    result: Optional[Dict] = None  # Same shape as the /analyze response
+    session_id: Optional[str] = None
+    error: Optional[str] = None
+    
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Settings:
+        name = "analysis_jobs"
+        indexes = [
+            "user_id",
+            [("status", 1), ("created_at", 1)],
+            [("status", 1), ("lease_expires_at", 1)],
+        ]
+
+class IdempotencyRecord(Document):
+    """Response stored under a client Idempotency-Key (expires via TTL index)"""
+    user_id: str
+    key: str
+    fingerprint: str  # Hash of the request payload; a reused key must match
+    
+    status: IdempotencyStatus = IdempotencyStatus.IN_PROGRESS
+    locked_until: Optional[datetime] = None  # In-flight owner's lease
+    owner: Optional[str] = None  # Nonce of the current owner; every owner write is filtered on it
+    session_id: Optional[str] = None  # Reserved before the Session is recorded; reused by takeovers
+    status_code: Optional[int] = None
+    response: Optional[Dict] = None
+    
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+    
+    class Settings:
+        name = "idempotency_keys"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("key", ASCENDING)], unique=True),
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
@@ -193,6 +193,7 @@ class SessionResponse(BaseModel):
     points_earned: int = 0
     badges_earned: Optional[List[str]] = []
     is_completed: bool = False
+    pitch_analysis: Optional[Dict] = None  # Only with include_contour=true
     
     class Config:
         from_attributes = True
@@ -12,6 +12,13 @@ import uvicorn
 
 from src.config import settings
 from src.database.database import connect_to_mongo, close_mongo_connection
+from src.services.analysis_executor import analysis_executor
+from src.services.job_queue import job_workers
+from src.services.analysis_pipeline import shutdown_branch_pool
+from src.services.video_analyzer import shutdown_frame_pool
+from src.services.load_shedding import load_shedder
+from src.api.metrics import RequestMetricsMiddleware
+from src.api.profiling import ProfilingMiddleware
 
 # Create FastAPI app
 app = FastAPI(
@@ -29,29 +36,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Location", "Upload-Offset", "Upload-Length"],
 )
 
+# Request timing for /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
+# On-demand profiling (signed X-Profile header or PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+
 # Event handlers for database connection
 @app.on_event("startup")
 async def startup_db_client():
     """Connect to MongoDB on startup"""
     await connect_to_mongo()
+    analysis_executor.start()
+    if settings.JOB_WORKERS > 0:
+        job_workers.start(speech.speech_analyzer, settings.JOB_WORKERS)
     print(f"🚀 {settings.APP_NAME} v{settings.VERSION} started")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close MongoDB connection on shutdown"""
+    await job_workers.stop()
+    await analysis_executor.shutdown()
+    shutdown_branch_pool()
+    shutdown_frame_pool()
     await close_mongo_connection()
     print("👋 Application shutdown complete")
 
 # Import and include routers
-from src.api import auth, exercises, speech, video, progress # , users
+from src.api import auth, exercises, speech, video, uploads, progress, metrics, profiling # , users
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(exercises.router, prefix="/api/exercises", tags=["Exercises"])
 app.include_router(speech.router, prefix="/api/speech", tags=["Speech Analysis"])
 app.include_router(video.router, prefix="/api/video", tags=["Video Analysis"])
+app.include_router(uploads.router, prefix="/api/uploads", tags=["Uploads"])
 # app.include_router(users.router, prefix="/api/users", tags=["Users"])
 app.include_router(progress.router, prefix="/api/progress", tags=["Progress"])
+app.include_router(metrics.router, tags=["Monitoring"])
+app.include_router(profiling.router, prefix="/api/admin/profiles", tags=["Admin"])
 
 # Static files for audio samples
 try:
@@ -77,7 +101,9 @@ async def health_check():
         "status": "healthy",
         "service": "speech-therapy-api",
         "version": settings.VERSION,
-        "database": "mongodb"
+        "database": "mongodb",
+        "analysis": analysis_executor.stats(),
+        "load_shedding": load_shedder.stats()
     }
 
 @app.get("/api/v1/info")
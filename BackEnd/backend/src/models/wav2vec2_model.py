@@ -14,16 +14,29 @@ import numpy as np
 import librosa
 from typing import Optional, Dict, List, Tuple, Union
 import logging
-from difflib import SequenceMatcher
-import re
+import time
 
-# Optional: for cleaner Tamil comparison if installed
-try:
-    from indic_transliteration import sanscript
-    from indic_transliteration.sanscript import SchemeMap, SCHEMES, transliterate
-    HAS_INDIC = True
-except ImportError:
-    HAS_INDIC = False
+from src.utils.alignment import DELETE
+from src.utils.phonetic_costs import get_cost_table, ACCEPTABLE_SUBSTITUTION_COST, UNRELATED_COST
+from src.utils.text_normalization import normalize_text, prepare_text, PreparedText
+from src.services.cancellation import CancellationToken, AnalysisCancelledError, raise_if_cancelled
+from src.utils.metrics import REGISTRY
+
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "wav2vec2_model_load_seconds",
+    "Time taken to load the Wav2Vec2 processor and model",
+    ["model"]
+)
+INFERENCE_SECONDS = REGISTRY.histogram(
+    "wav2vec2_inference_seconds",
+    "Wav2Vec2 forward pass time",
+    ["op"]
+)
+BATCH_SIZE = REGISTRY.histogram(
+    "wav2vec2_batch_size",
+    "Clips per batched Wav2Vec2 forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +80,7 @@ class Wav2Vec2SpeechModel:
         logger.info(f"Loading Wav2Vec2 model: {self.model_name} on {self.device} (language={self.language})")
 
         try:
+            started = time.perf_counter()
             # Load processor and model
             # Note: For XLSR-53, we use Wav2Vec2ForCTC for transcription
             self.processor = Wav2Vec2Processor.from_pretrained(
@@ -80,6 +94,7 @@ class Wav2Vec2SpeechModel:
 
             # Set to evaluation mode
             self.model.eval()
+            MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model=model_name)
 
             logger.info("Wav2Vec2 model loaded successfully")
 
@@ -117,10 +132,13 @@ class Wav2Vec2SpeechModel:
     def transcribe(
         self,
         audio: Union[np.ndarray, str],
-        sample_rate: int = 16000
+        sample_rate: int = 16000,
+        cancel_token: Optional[CancellationToken] = None
     ) -> Dict[str, Union[str, float]]:
         """
         Transcribe audio and return text with confidence score.
+        
+        A cancelled `cancel_token` stops the call before the forward pass.
         """
         try:
             audio_tensor = self.preprocess_audio(audio, sample_rate)
@@ -132,7 +150,8 @@ class Wav2Vec2SpeechModel:
                 padding=True
             ).to(self.device)
 
-            with torch.no_grad():
+            raise_if_cancelled(cancel_token)
+            with torch.no_grad(), INFERENCE_SECONDS.time(op="transcribe"):
                 logits = self.model(**inputs).logits
 
             # Get predicted ids
@@ -151,72 +170,143 @@ class Wav2Vec2SpeechModel:
                 "logits": logits # returning raw logits for further analysis if needed
             }
 
+        except AnalysisCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Transcription failed: {e}")
             return {"text": "", "confidence": 0.0}
 
+    def transcribe_batch(
+        self,
+        audios: List[np.ndarray],
+        sample_rate: int = 16000,
+        batch_size: int = 8,
+        cancel_tokens: Optional[List[Optional[CancellationToken]]] = None
+    ) -> List[Optional[Dict[str, Union[str, float]]]]:
+        """
+        Transcribe many clips with padded forward passes.
+        
+        Clips are sorted by length so each batch carries little padding;
+        logits past a clip's own length are ignored when decoding and when
+        computing its confidence. Clips whose token is cancelled are dropped
+        before every forward pass and get None.
+        
+        Returns:
+            One transcribe()-style result per clip, in input order
+        """
+        results: List[Optional[Dict]] = [None] * len(audios)
+        prepared = [self.preprocess_audio(audio, sample_rate).numpy() for audio in audios]
+        order = sorted(range(len(prepared)), key=lambda i: len(prepared[i]))
+        
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            if cancel_tokens is not None:
+                batch = [i for i in batch if not (cancel_tokens[i] is not None and cancel_tokens[i].cancelled)]
+            if not batch:
+                continue
+            
+            try:
+                inputs = self.processor(
+                    [prepared[i] for i in batch],
+                    sampling_rate=16000,
+                    return_tensors="pt",
+                    padding=True
+                ).to(self.device)
+                
+                BATCH_SIZE.observe(len(batch))
+                with torch.no_grad(), INFERENCE_SECONDS.time(op="transcribe_batch"):
+                    logits = self.model(**inputs).logits
+                
+                lengths = torch.tensor([len(prepared[i]) for i in batch])
+                frames = self.model._get_feat_extract_output_lengths(lengths).tolist()
+                probs = torch.nn.functional.softmax(logits, dim=-1)
+                max_probs, predicted_ids = torch.max(probs, dim=-1)
+                
+                for row, i in enumerate(batch):
+                    n = int(frames[row])
+                    transcription = self.processor.batch_decode(predicted_ids[row:row + 1, :n])[0]
+                    results[i] = {
+                        "text": transcription.lower().strip(),
+                        "confidence": float(max_probs[row, :n].mean().item()),
+                        "logits": logits[row:row + 1, :n]
+                    }
+            except Exception as e:
+                logger.error(f"Batch transcription failed: {e}")
+                for i in batch:
+                    results[i] = {"text": "", "confidence": 0.0}
+        
+        return results
+
     def analyze_pronunciation(
         self,
         audio: Union[np.ndarray, str],
         target_text: str,
-        language: str = "english"
+        language: str = "english",
+        prepared_target: Optional[PreparedText] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        transcription_result: Optional[Dict] = None
     ) -> Dict:
         """
         Compare audio against a target text to provide a detailed pronunciation report.
         Highly optimized for speech therapy feedback.
+        
+        `prepared_target` is the pre-normalized, pre-tokenized target stored
+        on the exercise; without it the target is prepared through the
+        in-process cache. `transcription_result` is an already computed
+        transcription (from transcribe_batch); without it the clip is
+        transcribed here.
         """
-        result = self.transcribe(audio)
+        result = transcription_result or self.transcribe(audio, cancel_token=cancel_token)
         transcription = result["text"]
         confidence = result["confidence"]
         
-        # Normalize both strings
-        target_norm = self._normalize_text(target_text, language)
-        trans_norm = self._normalize_text(transcription, language)
-        
-        # Calculate similarity score using SequenceMatcher (Levenshtein-based)
-        matcher = SequenceMatcher(None, target_norm, trans_norm)
-        match_ratio = matcher.ratio()
+        # Normalize both strings (the target is normally already prepared)
+        if prepared_target is None:
+            prepared_target = prepare_text(target_text, language)
+        target_norm = prepared_target.normalized
+        trans_norm = normalize_text(transcription, language)
         
-        # Detailed phoneme/character analysis
-        phoneme_reports = []
-        phonetic_groups = [
-            set(['p', 'b']), set(['t', 'd']), set(['k', 'g']),
-            set(['s', 'z']), set(['f', 'v']), set(['m', 'n']),
-            set(['i', 'e']), set(['o', 'u']), set(['a', 'e'])
-        ]
+        # Weighted edit-distance alignment using the language's phonetic costs
+        cost_table = get_cost_table(prepared_target.language)
+        alignment = cost_table.engine.align(
+            target_norm,
+            trans_norm,
+            ref_ids=np.asarray(prepared_target.token_ids, dtype=np.int64)
+        )
+        match_ratio = alignment.similarity()
         
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            part_expected = target_norm[i1:i2]
-            part_actual = trans_norm[j1:j2]
+        # Detailed phoneme analysis, one report per akshara / grapheme cluster
+        unit_tokens = {}
+        for i, unit in enumerate(prepared_target.unit_index):
+            if unit < 0:
+                continue
             
-            if tag == 'equal':
-                score = 1.0
-                status = "correct"
-            elif tag == 'replace':
-                # Check for phonetic similarity
-                if len(part_expected) == 1 and len(part_actual) == 1:
-                    e, a = part_expected[0], part_actual[0]
-                    is_similar = any(e in g and a in g for g in phonetic_groups)
-                    score = 0.75 if is_similar else 0.4
-                else:
-                    score = 0.4
-                status = "distorted"
-            elif tag == 'delete':
+            if alignment.ref_ops[i] == DELETE:
                 score = 0.0
                 status = "omitted"
-            elif tag == 'insert':
-                continue # insertion handled by general match_ratio
-                
-            if part_expected.strip():
-                # For words with multiple characters, split them up for granular reporting
-                for char in part_expected:
-                    if char.strip():
-                        phoneme_reports.append({
-                            "expected": char,
-                            "actual": part_actual if len(part_expected) == 1 else "?",
-                            "score": score,
-                            "status": status
-                        })
+                actual = ""
+            else:
+                # Partial credit from the substitution-cost table (1.0 for a match);
+                # any produced sound, even an unrelated or unknown one, scores
+                # 1 - UNRELATED_COST, above an omission
+                cost = float(alignment.ref_costs[i])
+                score = 1.0 - min(cost, UNRELATED_COST)
+                status = "correct" if cost <= ACCEPTABLE_SUBSTITUTION_COST else "distorted"
+                actual = trans_norm[alignment.ref_to_hyp[i]]
+            unit_tokens.setdefault(unit, []).append((score, status, actual))
+        
+        phoneme_reports = []
+        for unit, tokens in unit_tokens.items():
+            statuses = {status for _, status, _ in tokens}
+            if len(statuses) > 1:
+                # A cluster that is only partly right counts as distorted
+                statuses = {"distorted"}
+            phoneme_reports.append({
+                "expected": prepared_target.graphemes[unit],
+                "actual": "".join(actual for _, _, actual in tokens),
+                "score": round(sum(score for score, _, _ in tokens) / len(tokens), 2),
+                "status": statuses.pop()
+            })
 
         # Calculate weighted overall score
         # Combination of match ratio and model's acoustic confidence
@@ -237,26 +327,14 @@ class Wav2Vec2SpeechModel:
         """
         Normalize text based on language rules.
         """
-        text = text.lower().strip()
-        
-        if language.lower() == "tamil":
-            # For Tamil, we might want to transliterate to Latin for more robust comparison
-            # if the model outputs Latin or if we want to compare phonetically
-            if HAS_INDIC and any(ord(c) > 127 for c in text): # If contains non-ascii
-                try:
-                    return transliterate(text, SCHEMES[sanscript.TAMIL], SCHEMES[sanscript.ITRANS]).lower()
-                except:
-                    pass
-        
-        # Remove punctuation
-        text = re.sub(r'[^\w\s]', '', text)
-        return text
+        return normalize_text(text, language)
 
     def extract_features(
         self,
         audio: Union[np.ndarray, str],
         sample_rate: int = 16000,
-        layer: int = -1
+        layer: int = -1,
+        cancel_token: Optional[CancellationToken] = None
     ) -> np.ndarray:
         """
         Extract deep acoustic features from the transformer's hidden states.
@@ -265,13 +343,16 @@ class Wav2Vec2SpeechModel:
             audio_tensor = self.preprocess_audio(audio, sample_rate)
             inputs = self.processor(audio_tensor.numpy(), sampling_rate=16000, return_tensors="pt").to(self.device)
             
-            with torch.no_grad():
+            raise_if_cancelled(cancel_token)
+            with torch.no_grad(), INFERENCE_SECONDS.time(op="features"):
                 # Get hidden states and select layer
                 outputs = self.model.wav2vec2(**inputs, output_hidden_states=True)
                 hidden_states = outputs.hidden_states
                 features = hidden_states[layer]
             
             return features.squeeze(0).cpu().numpy()
+        except AnalysisCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Feature extraction failed: {e}")
             return np.array([])
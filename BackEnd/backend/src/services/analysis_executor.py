@@ -0,0 +1,222 @@
+#backend\src\services\analysis_executor.py
+"""
+Bounded execution layer for CPU-bound analysis.
+
+Speech and video analysis (torch, pYIN, librosa) are synchronous and take
+seconds. Running them directly inside `async def` endpoints blocks the
+event loop, so every other request in the worker (logins, /health) waits.
+Endpoints await `analysis_executor.run(...)` instead, which runs the work
+on a bounded thread pool.
+
+A thread pool (not a process pool) is used because the wav2vec2 model is a
+large in-process singleton and torch/NumPy release the GIL while computing.
+
+Workflow:
+1. A request waits for one of `max_workers` slots; at most `max_queue`
+   requests may wait, further ones are rejected (ExecutorOverloadedError)
+2. The work runs on the pool and is awaited with a per-request timeout
+3. A timed-out task keeps its slot until the thread actually finishes, so
+   the pool is never oversubscribed; with a cancellation token the task is
+   also told to stop at its next checkpoint
+"""
+
+import asyncio
+import functools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from src.config import settings
+from src.services.cancellation import CancellationToken, AnalysisCancelledError
+from src.utils.metrics import REGISTRY
+from src.utils.profiler import profiled
+
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "analysis_queue_wait_seconds",
+    "Time analyses wait for an executor slot"
+)
+RUN_SECONDS = REGISTRY.histogram(
+    "analysis_run_seconds",
+    "Time analyses spend running on the executor"
+)
+
+
+class ExecutorOverloadedError(Exception):
+    """Raised when the wait queue is full."""
+
+
+class AnalysisTimeoutError(Exception):
+    """Raised when a task does not finish within its timeout."""
+
+
+class AnalysisExecutor:
+    """
+    Bounded thread pool with queue/active gauges and app-lifecycle hooks.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, default_timeout: Optional[float] = None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._closed = False
+
+        # Gauges
+        self.active = 0
+        self.queued = 0
+        # Counters
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        # End-to-end latency (queue wait + run) of recent successful tasks
+        self._latencies = deque(maxlen=settings.ANALYSIS_LATENCY_WINDOW)
+
+    def start(self):
+        """Create the pool (called on app startup; also done lazily)."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._closed = False
+
+    async def shutdown(self, wait: bool = True):
+        """Stop accepting work and wait for running tasks (called on app shutdown)."""
+        self._closed = True
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.get_running_loop().run_in_executor(None, functools.partial(pool.shutdown, wait=wait))
+            self._slots = None
+
+    async def run(
+        self,
+        fn: Callable,
+        *args,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        timings: Optional[Dict[str, float]] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Run `fn(*args, **kwargs)` on the pool and await its result.
+
+        Args:
+            fn: Synchronous callable
+            timeout: Seconds to wait for the result (defaults to the executor's)
+            cancel_token: Passed on to fn as `cancel_token`; checked before the
+                          task is dispatched and cancelled if it times out
+            timings: Filled with "queue_wait" and "run" seconds
+
+        Returns:
+            Return value of fn
+
+        Raises:
+            ExecutorOverloadedError: The wait queue is full
+            AnalysisTimeoutError: The task took longer than the timeout
+            AnalysisCancelledError: The token was cancelled while queued
+        """
+        if self._closed:
+            raise RuntimeError("Analysis executor is shut down")
+        self.start()
+
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ExecutorOverloadedError("Too many analyses in progress, please retry shortly")
+
+        # Step 1: Wait for a free slot
+        started = time.perf_counter()
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        queue_wait = time.perf_counter() - started
+        QUEUE_WAIT_SECONDS.observe(queue_wait)
+        if timings is not None:
+            timings["queue_wait"] = queue_wait
+
+        # Step 2: Run; the slot is released when the thread finishes
+        slots = self._slots
+        if cancel_token is not None:
+            if cancel_token.cancelled:
+                slots.release()
+                raise AnalysisCancelledError(cancel_token.reason)
+            kwargs["cancel_token"] = cancel_token
+        self.active += 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                self._pool, profiled(functools.partial(fn, *args, **kwargs))
+            )
+        except Exception:
+            self.active -= 1
+            slots.release()
+            raise
+        future.add_done_callback(functools.partial(self._on_done, slots))
+
+        # Step 3: Await with a timeout (shield keeps the slot bookkeeping on the real future)
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+            finished = time.perf_counter()
+            self._latencies.append(finished - started)
+            RUN_SECONDS.observe(finished - started - queue_wait)
+            if timings is not None:
+                timings["run"] = finished - started - queue_wait
+            return result
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            if cancel_token is not None:
+                cancel_token.cancel("timed out")
+            raise AnalysisTimeoutError(f"Analysis did not finish within {timeout:.0f}s")
+
+    def _on_done(self, slots: asyncio.Semaphore, future: asyncio.Future):
+        self.active -= 1
+        if future.cancelled() or future.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+        slots.release()
+
+    def latency_percentile(self, percentile: float = 95) -> Optional[float]:
+        """Percentile of recent end-to-end latencies in seconds (None without samples)."""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self) -> Dict:
+        """Current gauges and counters."""
+        p95 = self.latency_percentile(95)
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "latency_p95": round(p95, 3) if p95 is not None else None,
+        }
+
+
+analysis_executor = AnalysisExecutor(
+    max_workers=settings.ANALYSIS_MAX_WORKERS,
+    max_queue=settings.ANALYSIS_MAX_QUEUE,
+    default_timeout=settings.ANALYSIS_TIMEOUT_SECONDS
+)
+
+
+def _collect_executor():
+    stats = analysis_executor.stats()
+    yield ("analysis_executor_active", "gauge", "Analyses running on the executor", [({}, stats["active"])])
+    yield ("analysis_executor_queued", "gauge", "Analyses waiting for an executor slot", [({}, stats["queued"])])
+    yield ("analysis_executor_tasks_total", "counter", "Finished executor tasks by outcome", [
+        ({"outcome": outcome}, stats[outcome]) for outcome in ("completed", "failed", "timed_out", "rejected")
+    ])
+
+
+REGISTRY.register_collector(_collect_executor)
@@ -0,0 +1,190 @@
+#backend\src\services\analysis_pipeline.py
+"""
+Small DAG runner for the speech analysis pipeline.
+
+The analysis is a set of stages with explicit dependencies. Independent
+branches (model inference, pitch, fluency, formants, feature extraction)
+only need the loaded audio, so they run concurrently on a shared thread
+pool; NumPy, librosa and torch release the GIL while computing. Wall-clock
+latency is then roughly the longest branch instead of the sum.
+
+Stages are either essential or optional. Under load (see load_shedding)
+optional stages are shed: a stage with a cheaper `degraded` variant runs
+that instead, and one without is skipped (its result is None). The run
+records both lists under "degraded_stages" / "skipped_stages".
+
+A cancellation token (see cancellation) is checked before every stage is
+started and exposed to stages as "cancel_token"; once it is cancelled no
+further stages start and the run raises AnalysisCancelledError.
+
+Algorithm:
+1. Plan: pick full / degraded / skipped for every stage
+2. Submit every stage whose dependencies are satisfied
+3. Wait for the first stage to finish, store its result
+4. Repeat until all stages are done; the first failure cancels the rest
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.config import settings
+from src.services.cancellation import CancellationToken, raise_if_cancelled
+from src.utils.profiler import profiled
+
+StageFunction = Callable[[Dict[str, Any]], Any]
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    Attributes:
+        name: Key the stage's result is stored under
+        fn: Called with the results so far (inputs + finished stages)
+        deps: Names of inputs/stages that must be available first
+        essential: Essential stages always run in full
+        degraded: Cheaper variant of an optional stage used when shedding
+                  load (None: the stage is skipped instead)
+    """
+
+    __slots__ = ("name", "fn", "deps", "essential", "degraded")
+
+    def __init__(
+        self,
+        name: str,
+        fn: StageFunction,
+        deps: Iterable[str] = (),
+        essential: bool = True,
+        degraded: Optional[StageFunction] = None
+    ):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.essential = essential
+        self.degraded = degraded
+
+
+_branch_pool: Optional[ThreadPoolExecutor] = None
+_branch_pool_lock = threading.Lock()
+
+
+def get_branch_pool() -> ThreadPoolExecutor:
+    """Shared pool for pipeline branches (created on first use)."""
+    global _branch_pool
+    with _branch_pool_lock:
+        if _branch_pool is None:
+            _branch_pool = ThreadPoolExecutor(
+                max_workers=settings.PIPELINE_BRANCH_WORKERS,
+                thread_name_prefix="analysis-branch"
+            )
+        return _branch_pool
+
+
+def shutdown_branch_pool(wait: bool = True):
+    """Stop the branch pool (called on app shutdown)."""
+    global _branch_pool
+    with _branch_pool_lock:
+        pool, _branch_pool = _branch_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+class AnalysisPipeline:
+    """
+    Executes stages in dependency order, running ready stages concurrently.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate stage names")
+        self.stages = stages
+
+    def run(
+        self,
+        inputs: Dict[str, Any],
+        pool: Optional[ThreadPoolExecutor] = None,
+        shed: bool = False,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Run all stages.
+
+        Args:
+            inputs: Initial values available to every stage
+            pool: Thread pool for branches (defaults to the shared branch pool;
+                  stages run inline when PIPELINE_BRANCH_WORKERS <= 1)
+            shed: Degrade or skip optional stages
+            cancel_token: Stops the run between stages once cancelled
+
+        Returns:
+            (results, timings): results holds the inputs, one entry per stage
+            and the degraded_stages / skipped_stages lists; timings holds each
+            executed stage's duration in seconds
+
+        Raises:
+            AnalysisCancelledError: The token was cancelled
+        """
+        results = dict(inputs)
+        results["cancel_token"] = cancel_token
+        timings: Dict[str, float] = {}
+
+        # Step 1: Plan which variant of each stage runs
+        pending: List[Stage] = []
+        results["degraded_stages"] = []
+        results["skipped_stages"] = []
+        for stage in self.stages:
+            if not shed or stage.essential:
+                pending.append(stage)
+            elif stage.degraded is not None:
+                pending.append(Stage(stage.name, stage.degraded, stage.deps))
+                results["degraded_stages"].append(stage.name)
+            else:
+                results[stage.name] = None
+                results["skipped_stages"].append(stage.name)
+
+        if pool is None and settings.PIPELINE_BRANCH_WORKERS <= 1:
+            # Sequential fallback, in dependency order
+            while pending:
+                ready = self._ready(pending, results)
+                for stage in ready:
+                    results[stage.name], timings[stage.name] = self._timed(stage, results)
+                    pending.remove(stage)
+            return results, timings
+
+        pool = pool or get_branch_pool()
+        running: Dict[Future, Stage] = {}
+        try:
+            while pending or running:
+                # Step 2: Submit every stage whose dependencies are met
+                raise_if_cancelled(cancel_token)
+                for stage in self._ready(pending, results, allow_empty=bool(running)):
+                    running[pool.submit(profiled(self._timed), stage, dict(results))] = stage
+                    pending.remove(stage)
+
+                # Step 3: Collect finished stages
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    results[stage.name], timings[stage.name] = future.result()
+        finally:
+            for future in running:
+                future.cancel()
+
+        return results, timings
+
+    @staticmethod
+    def _ready(pending: List[Stage], results: Dict[str, Any], allow_empty: bool = False) -> List[Stage]:
+        ready = [stage for stage in pending if all(dep in results for dep in stage.deps)]
+        if not ready and pending and not allow_empty:
+            missing = {dep for stage in pending for dep in stage.deps if dep not in results}
+            raise ValueError(f"Unsatisfiable pipeline dependencies: {sorted(missing)}")
+        return ready
+
+    @staticmethod
+    def _timed(stage: Stage, results: Dict[str, Any]) -> Tuple[Any, float]:
+        raise_if_cancelled(results.get("cancel_token"))
+        start = time.perf_counter()
+        value = stage.fn(results)
+        return value, time.perf_counter() - start
@@ -0,0 +1,109 @@
+#backend\src\services\cancellation.py
+"""
+Cooperative cancellation for in-flight analyses.
+
+Analysis runs on worker threads, which cannot be interrupted from outside.
+Instead the request handler owns a CancellationToken: when the client
+disconnects (app closed mid-upload, frontend timed out and retried) the
+token is cancelled, and the analysis checks it between steps - before
+each pipeline stage and right before every model forward pass - and stops
+with AnalysisCancelledError. Abandoned requests therefore stop using CPU
+at the next checkpoint instead of running to completion and writing a
+Session nobody will see.
+
+Workflow:
+1. The endpoint creates a token and passes it down to analyze_audio
+2. run_until_disconnected awaits the analysis while polling the request
+3. On disconnect it cancels the token and the awaiting task
+4. The worker thread raises AnalysisCancelledError at its next checkpoint
+"""
+import asyncio
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Non-standard "client closed request" status; the client never sees it
+CLIENT_CLOSED_REQUEST = 499
+
+
+class AnalysisCancelledError(Exception):
+    """Raised at a checkpoint once the analysis has been cancelled."""
+
+
+class ClientDisconnectedError(Exception):
+    """Raised by run_until_disconnected when the client went away."""
+
+
+class CancellationToken:
+    """
+    Thread-safe, one-way cancellation flag.
+    """
+
+    __slots__ = ("_event", "reason")
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or timeout; True if cancelled."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        """Checkpoint: stop the current analysis if the token was cancelled."""
+        if self._event.is_set():
+            raise AnalysisCancelledError(self.reason)
+
+
+def raise_if_cancelled(token: Optional[CancellationToken]):
+    """Checkpoint for code paths where the token is optional."""
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+async def run_until_disconnected(
+    request,
+    awaitable: Awaitable[T],
+    token: CancellationToken,
+    poll_interval: float = 0.5
+) -> T:
+    """
+    Await `awaitable`, cancelling it if the HTTP client disconnects first.
+
+    Args:
+        request: Starlette request to watch
+        awaitable: The analysis (typically analysis_executor.run(...))
+        token: Token handed to the analysis; cancelled on disconnect
+        poll_interval: Seconds between disconnect checks
+
+    Returns:
+        The awaitable's result
+
+    Raises:
+        ClientDisconnectedError: The client went away before the result
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                token.cancel("client disconnected")
+                task.cancel()
+                raise ClientDisconnectedError("Client disconnected before the analysis finished")
+    finally:
+        # Abandoned for any reason (handler cancelled too): stop the analysis
+        if not task.done():
+            token.cancel("request abandoned")
+            task.cancel()
@@ -0,0 +1,253 @@
+#backend\src\services\idempotency.py
+"""
+Idempotency-Key handling for /api/speech/analyze.
+
+Mobile clients retry uploads on flaky networks. Without a key every retry
+re-runs inference, inserts another Session and counts the practice twice
+in Progress. With a key the first request claims it in the
+`idempotency_keys` collection (unique on user + key, TTL on expires_at):
+
+Workflow:
+1. Insert an in-progress record; the unique index makes this the claim
+2. A repeat of a completed key gets the stored response back
+3. A concurrent duplicate waits for the in-flight result (woken in-process
+   by an event, polling Mongo for requests on other nodes)
+4. While the owner waits for the executor and runs, a heartbeat renews
+   its lock every third of IDEMPOTENCY_LOCK_SECONDS, so a slow but live
+   owner is never taken over; before saving the Session it reserves its
+   id on the record (reserve_session)
+5. The owner stores the response (complete) or, when the request failed
+   transiently, deletes the record (release) so a retry runs again; a
+   record with a reserved session is only unlocked, and the retry records
+   under the same session id, so no second Session appears
+6. An in-flight record whose owner died is taken over once its lock expires
+
+Each owner holds a random nonce and every owner write is filtered on it,
+so a slow original whose key was taken over cannot complete, release or
+record anything for the new owner.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from src.config import settings
+from src.database.models import IdempotencyRecord, IdempotencyStatus
+
+MAX_KEY_LENGTH = 255
+FINGERPRINT_CHUNK_SIZE = 1 << 20
+
+# Wake-ups for duplicates waiting on a request owned by this process
+_local_events: Dict[Tuple[str, str], asyncio.Event] = {}
+
+
+class IdempotencyKeyMismatchError(Exception):
+    """The key was already used for a different request."""
+
+
+class IdempotencyInProgressError(Exception):
+    """The original request is still running after the wait timeout."""
+
+
+def request_fingerprint(*parts) -> str:
+    """
+    Stable hash of the request payload.
+
+    Parts are str / bytes, or binary files (read in chunks from their
+    current position, so uploads are never held in memory); a file hashes
+    like the bytes it contains.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if hasattr(part, "read"):
+            digest.update((os.fstat(part.fileno()).st_size - part.tell()).to_bytes(8, "big"))
+            for chunk in iter(lambda: part.read(FINGERPRINT_CHUNK_SIZE), b""):
+                digest.update(chunk)
+            continue
+        data = part if isinstance(part, bytes) else str(part or "").encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class IdempotencyClaim:
+    """
+    Ownership of an in-flight key; finish with complete() or release().
+    """
+
+    def __init__(self, record: IdempotencyRecord):
+        self.record = record
+        self.finished = False
+        self._event = _local_events.setdefault((record.user_id, record.key), asyncio.Event())
+        self._heartbeat = asyncio.create_task(self._renew_lock())
+
+    def _owned(self) -> Dict:
+        return {"_id": self.record.id, "owner": self.record.owner, "status": IdempotencyStatus.IN_PROGRESS.value}
+
+    async def _renew_lock(self):
+        """Extend the lock every third of its length until finished or taken over."""
+        collection = IdempotencyRecord.get_motor_collection()
+        while True:
+            await asyncio.sleep(settings.IDEMPOTENCY_LOCK_SECONDS / 3)
+            locked_until = datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+            try:
+                result = await collection.update_one(self._owned(), {"$set": {"locked_until": locked_until}})
+            except Exception as e:
+                # Database hiccup: the lock still has two thirds left
+                print(f"⚠️ Idempotency lock renewal failed: {e}")
+                continue
+            if result.matched_count != 1:
+                # Taken over (or finished); reserve_session reports it
+                return
+            self.record.locked_until = locked_until
+
+    async def reserve_session(self) -> str:
+        """
+        Fix the id of the Session about to be recorded and renew the lock.
+
+        Returns:
+            Session id to record under (a previous owner's if it got this far)
+
+        Raises:
+            IdempotencyInProgressError: The key was taken over meanwhile
+        """
+        session_id = self.record.session_id or str(PydanticObjectId())
+        locked_until = datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+        result = await IdempotencyRecord.get_motor_collection().update_one(
+            self._owned(), {"$set": {"session_id": session_id, "locked_until": locked_until}}
+        )
+        if result.matched_count != 1:
+            raise IdempotencyInProgressError("This Idempotency-Key was taken over by a retried request")
+        self.record.session_id, self.record.locked_until = session_id, locked_until
+        return session_id
+
+    async def complete(self, status_code: int, response: Dict):
+        """Store the response for replay until the record expires (if still the owner)."""
+        self._heartbeat.cancel()
+        try:
+            await IdempotencyRecord.get_motor_collection().update_one(self._owned(), {"$set": {
+                "status": IdempotencyStatus.COMPLETED.value,
+                "status_code": status_code,
+                "response": response,
+                "locked_until": None,
+            }})
+        finally:
+            self._finish()
+
+    async def release(self):
+        """
+        Let the next attempt run the request again (if still the owner).
+
+        A key with a reserved session is unlocked rather than deleted: the
+        session may exist, and the retry takes over and reuses its id.
+        """
+        self._heartbeat.cancel()
+        collection = IdempotencyRecord.get_motor_collection()
+        try:
+            if self.record.session_id:
+                await collection.update_one(self._owned(), {"$set": {"locked_until": datetime.utcnow()}})
+            else:
+                await collection.delete_one(self._owned())
+        finally:
+            self._finish()
+
+    def _finish(self):
+        self._heartbeat.cancel()
+        self.finished = True
+        _local_events.pop((self.record.user_id, self.record.key), None)
+        self._event.set()
+
+
+async def claim_key(
+    user_id: str,
+    key: str,
+    fingerprint: str,
+    wait_seconds: Optional[float] = None
+) -> Tuple[Optional[IdempotencyClaim], Optional[IdempotencyRecord]]:
+    """
+    Claim an idempotency key or fetch the response stored under it.
+
+    Args:
+        user_id: Keys are scoped per user
+        key: Client-supplied Idempotency-Key
+        fingerprint: request_fingerprint() of the payload
+        wait_seconds: How long to wait on an in-flight duplicate
+
+    Returns:
+        (claim, None) when this request should run, or
+        (None, record) with the completed record to replay
+
+    Raises:
+        IdempotencyKeyMismatchError: Same key, different payload
+        IdempotencyInProgressError: Still in flight after waiting
+    """
+    user_id = str(user_id)
+    wait_seconds = settings.IDEMPOTENCY_WAIT_SECONDS if wait_seconds is None else wait_seconds
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait_seconds
+
+    while True:
+        now = datetime.utcnow()
+
+        # Step 1: Try to claim
+        record = IdempotencyRecord(
+            user_id=user_id,
+            key=key,
+            fingerprint=fingerprint,
+            owner=uuid.uuid4().hex,
+            locked_until=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        )
+        try:
+            await record.insert()
+            return IdempotencyClaim(record), None
+        except DuplicateKeyError:
+            pass
+
+        existing = await IdempotencyRecord.find_one(
+            IdempotencyRecord.user_id == user_id,
+            IdempotencyRecord.key == key
+        )
+        if existing is None:
+            # Released or expired in between; claim again
+            continue
+        if existing.fingerprint != fingerprint:
+            raise IdempotencyKeyMismatchError("Idempotency-Key was already used for a different request")
+
+        # Step 2: Replay a finished request
+        if existing.status == IdempotencyStatus.COMPLETED:
+            return None, existing
+
+        # Step 5: Take over from an owner that died mid-request
+        if existing.locked_until is not None and existing.locked_until < now:
+            document = await IdempotencyRecord.get_motor_collection().find_one_and_update(
+                {"_id": existing.id, "status": IdempotencyStatus.IN_PROGRESS.value, "locked_until": {"$lt": now}},
+                {"$set": {
+                    "owner": uuid.uuid4().hex,
+                    "locked_until": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+                }},
+                return_document=ReturnDocument.AFTER
+            )
+            if document is not None:
+                return IdempotencyClaim(IdempotencyRecord.model_validate(document)), None
+            continue
+
+        # Step 3: Wait for the in-flight request
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise IdempotencyInProgressError("A request with this Idempotency-Key is still being processed")
+        timeout = min(settings.IDEMPOTENCY_POLL_INTERVAL, remaining)
+        event = _local_events.get((user_id, key))
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(timeout)
@@ -0,0 +1,353 @@
+#backend\src\services\job_queue.py
+"""
+Durable analysis job queue backed by the `analysis_jobs` collection.
+
+Clients submit audio to /api/speech/jobs and get a job id back at once;
+workers claim queued jobs with an atomic find-and-modify, run the analysis
+on the analysis executor and write the Session when it completes. No
+external broker is needed, and API nodes and workers scale independently:
+set JOB_WORKERS=0 on API-only nodes and run workers separately with
+
+    python -m src.services.job_queue
+
+Workflow (per worker):
+1. Claim the oldest queued job that is due, or a running job whose
+   lease expired (its worker died), marking it running with a fresh lease
+2. Run SpeechAnalyzer.analyze_audio on the analysis executor while a
+   heartbeat renews the lease; a worker that loses its lease cancels the
+   analysis
+3. Record the Session / progress and store the response on the job
+4. Delete the stored audio once the job reaches a terminal state
+
+Failed attempts are retried with exponential backoff (the job waits in
+the queue until `not_before`). A full analysis executor is not the job's
+fault: the job is put back for JOB_OVERLOAD_RETRY_SECONDS and the attempt
+is not counted, so a load spike cannot use up JOB_MAX_ATTEMPTS.
+
+Every status change after the claim is a conditional update on the
+claiming worker and claim number, so a stale worker can never overwrite
+the job's new owner. The Session of a job has the job's id as its _id:
+a retried or duplicated job reuses the existing Session instead of
+recording a second one.
+"""
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from src.config import settings
+from src.database.models import AnalysisJob, Exercise, JobStatus
+from src.services.analysis_executor import analysis_executor, ExecutorOverloadedError
+from src.services.cancellation import CancellationToken, AnalysisCancelledError
+from src.services.session_service import record_session, session_response
+
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+
+async def enqueue_job(user_id: str, exercise_id: Optional[str], audio_path: str) -> AnalysisJob:
+    """Create a queued job for an already-stored audio file."""
+    job = AnalysisJob(user_id=str(user_id), exercise_id=exercise_id, audio_path=audio_path)
+    await job.insert()
+    return job
+
+
+async def claim_next_job(worker_id: str) -> Optional[AnalysisJob]:
+    """
+    Atomically claim the next job for a worker.
+
+    Returns:
+        The claimed job (status running, attempts incremented), or None
+    """
+    now = datetime.utcnow()
+    document = await AnalysisJob.get_motor_collection().find_one_and_update(
+        {
+            "$or": [
+                # Missing / null not_before: due at once
+                {"status": JobStatus.QUEUED.value, "not_before": {"$not": {"$gt": now}}},
+                {"status": JobStatus.RUNNING.value, "lease_expires_at": {"$lt": now}},
+            ]
+        },
+        {
+            "$set": {
+                "status": JobStatus.RUNNING.value,
+                "worker_id": worker_id,
+                "started_at": now,
+                "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    if document is None:
+        return None
+    return AnalysisJob.model_validate(document)
+
+
+def _claim_filter(job: AnalysisJob) -> Dict:
+    """Matches the job only while it is still running under this claim."""
+    return {
+        "_id": job.id,
+        "status": JobStatus.RUNNING.value,
+        "worker_id": job.worker_id,
+        "attempts": job.attempts,
+    }
+
+
+async def _update_claimed(job: AnalysisJob, fields: Dict, increments: Optional[Dict] = None) -> bool:
+    """Apply `fields` (and `increments`) if the caller still owns the job; False otherwise."""
+    update = {"$set": fields}
+    if increments:
+        update["$inc"] = increments
+    result = await AnalysisJob.get_motor_collection().update_one(_claim_filter(job), update)
+    if result.matched_count != 1:
+        return False
+    for name, value in fields.items():
+        setattr(job, name, JobStatus(value) if name == "status" else value)
+    for name, amount in (increments or {}).items():
+        setattr(job, name, getattr(job, name) + amount)
+    return True
+
+
+async def renew_lease(job: AnalysisJob) -> bool:
+    """Extend the lease of a running job; False if it was lost."""
+    expires = datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    return await _update_claimed(job, {"lease_expires_at": expires})
+
+
+async def finish_job(job: AnalysisJob, status: JobStatus, result: Optional[Dict] = None,
+                     error: Optional[str] = None, session_id: Optional[str] = None) -> bool:
+    """
+    Move a job to a terminal state and drop its audio.
+
+    Returns:
+        False (and nothing changed) if the worker no longer owns the job
+    """
+    updated = await _update_claimed(job, {
+        "status": status.value,
+        "result": result,
+        "error": error,
+        "session_id": session_id,
+        "finished_at": datetime.utcnow(),
+        "lease_expires_at": None,
+    })
+    if not updated:
+        # The new owner still needs the audio
+        print(f"⚠️ Job {job.id} lease lost; {status.value} result of worker {job.worker_id} dropped")
+        return False
+
+    if os.path.exists(job.audio_path):
+        try:
+            os.unlink(job.audio_path)
+        except OSError:
+            pass
+    return True
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before retrying a job that failed `attempts` times (seconds)."""
+    return min(settings.JOB_RETRY_BACKOFF_MAX, settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** max(0, attempts - 1))
+
+
+async def requeue_job(job: AnalysisJob, error: str, delay: float = 0.0, count_attempt: bool = True) -> bool:
+    """
+    Put a job back in the queue after a transient failure (if still owned).
+
+    Args:
+        delay: Seconds before the job may be claimed again
+        count_attempt: False gives the attempt back (the job never ran)
+    """
+    return await _update_claimed(job, {
+        "status": JobStatus.QUEUED.value,
+        "lease_expires_at": None,
+        "not_before": datetime.utcnow() + timedelta(seconds=delay),
+        "error": error,
+    }, None if count_attempt else {"attempts": -1})
+
+
+async def _heartbeat(job: AnalysisJob, cancel_token: CancellationToken):
+    """Renew the lease every third of its length; cancel the analysis once lost."""
+    while True:
+        await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+        try:
+            owned = await renew_lease(job)
+        except Exception as e:
+            # Database hiccup: the lease still has two thirds left
+            print(f"⚠️ Lease renewal of job {job.id} failed: {e}")
+            continue
+        if not owned:
+            cancel_token.cancel("job lease lost")
+            return
+
+
+async def process_job(job: AnalysisJob, analyzer) -> None:
+    """
+    Run one claimed job to completion, renewing its lease meanwhile.
+
+    Args:
+        job: Job in running state
+        analyzer: SpeechAnalyzer instance
+
+    Raises:
+        AnalysisCancelledError: The lease was lost; another worker owns the job
+    """
+    cancel_token = CancellationToken()
+    heartbeat = asyncio.create_task(_heartbeat(job, cancel_token))
+    try:
+        await _process_claimed(job, analyzer, cancel_token)
+    finally:
+        heartbeat.cancel()
+
+
+async def _process_claimed(job: AnalysisJob, analyzer, cancel_token: CancellationToken):
+    # Step 1: Resolve the exercise target (same defaults as /analyze)
+    target_text = "General Speech Practice"
+    language = None
+    prepared_target = None
+    if job.exercise_id:
+        exercise = await Exercise.get(job.exercise_id)
+        if not exercise:
+            await finish_job(job, JobStatus.FAILED, error="Exercise not found")
+            return
+        target_text = exercise.target_word
+        language = exercise.language
+        prepared_target = exercise.target_prepared
+
+    # Step 2: Analyze off the event loop
+    analysis_result = await analysis_executor.run(
+        analyzer.analyze_audio,
+        job.audio_path,
+        reference_text=target_text,
+        language=language,
+        prepared_target=prepared_target,
+        cancel_token=cancel_token
+    )
+    analysis_result.pop("timings", None)
+
+    if analysis_result.get("needs_rerecord"):
+        await finish_job(job, JobStatus.FAILED, result=analysis_result, error=analysis_result["error"])
+        return
+    if not analysis_result["success"]:
+        await finish_job(job, JobStatus.FAILED, error=analysis_result.get("error", "Analysis failed"))
+        return
+
+    # Step 3: Record the session (once per job) and publish the response
+    cancel_token.raise_if_cancelled()
+    session = await record_session(job.user_id, job.exercise_id, job.audio_path, analysis_result,
+                                   session_id=str(job.id), job_id=str(job.id))
+    await finish_job(
+        job,
+        JobStatus.COMPLETED,
+        result=session_response(session, analysis_result),
+        session_id=str(session.id)
+    )
+
+
+class JobWorker:
+    """
+    Polls the queue and processes jobs one at a time.
+    """
+
+    def __init__(self, analyzer, worker_id: Optional[str] = None):
+        self.analyzer = analyzer
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._stopping = False
+
+    async def run(self):
+        """Work until stop() is called."""
+        while not self._stopping:
+            try:
+                job = await claim_next_job(self.worker_id)
+            except Exception as e:
+                print(f"⚠️ Job queue unavailable: {e}")
+                job = None
+
+            if job is None:
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+
+            try:
+                if job.attempts > settings.JOB_MAX_ATTEMPTS:
+                    await finish_job(job, JobStatus.FAILED, error="Too many attempts")
+                else:
+                    await process_job(job, self.analyzer)
+            except AnalysisCancelledError as e:
+                # The new owner finishes the job
+                print(f"🛑 Job {job.id} abandoned: {e}")
+            except ExecutorOverloadedError as e:
+                # Requests fill the executor: retry later without using up an attempt,
+                # and give the executor a poll interval before claiming the next job
+                print(f"⏳ Job {job.id} deferred: {e}")
+                try:
+                    await requeue_job(job, str(e), settings.JOB_OVERLOAD_RETRY_SECONDS, count_attempt=False)
+                except Exception:
+                    pass
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                try:
+                    if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+                        await finish_job(job, JobStatus.FAILED, error=str(e))
+                    else:
+                        # Transient failure (timeout, database hiccup): retry with backoff
+                        await requeue_job(job, str(e), retry_delay(job.attempts))
+                except Exception:
+                    pass
+
+    def stop(self):
+        self._stopping = True
+
+
+class JobWorkerPool:
+    """
+    In-process job workers, started and stopped with the app lifecycle.
+    """
+
+    def __init__(self):
+        self.workers: List[JobWorker] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self, analyzer, count: int):
+        for _ in range(count):
+            worker = JobWorker(analyzer)
+            self.workers.append(worker)
+            self._tasks.append(asyncio.create_task(worker.run()))
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        # Idle workers are sleeping between polls; don't wait for them
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.workers, self._tasks = [], []
+
+
+job_workers = JobWorkerPool()
+
+
+async def _run_standalone():
+    from src.database.database import connect_to_mongo, close_mongo_connection
+    from src.services.speech_analyzer import SpeechAnalyzer
+
+    await connect_to_mongo()
+    analysis_executor.start()
+    job_workers.start(SpeechAnalyzer(), max(1, settings.JOB_WORKERS))
+    print(f"🛠️ {len(job_workers.workers)} analysis job worker(s) running")
+    try:
+        await asyncio.gather(*job_workers._tasks)
+    finally:
+        await job_workers.stop()
+        await analysis_executor.shutdown()
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_run_standalone())
+    except KeyboardInterrupt:
+        pass
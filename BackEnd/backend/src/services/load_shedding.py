@@ -0,0 +1,69 @@
+#backend\src\services\load_shedding.py
+"""
+Load-shedding controller for the analysis pipeline.
+
+When analyses pile up it is better to return a slightly less detailed
+result quickly than to time out. The controller looks at the analysis
+executor's queue depth and recent p95 latency; while either is over its
+threshold, analyses run with optional stages degraded or skipped (see
+AnalysisPipeline). Essential stages (transcription, pronunciation scoring,
+fluency) always run in full.
+"""
+import threading
+from typing import Dict
+
+from src.config import settings
+from src.services.analysis_executor import AnalysisExecutor, analysis_executor
+from src.utils.metrics import REGISTRY
+
+
+class LoadShedder:
+    """
+    Decides per analysis whether optional stages should be shed.
+
+    should_shed() is called from executor worker threads; the counter is
+    updated under a lock.
+    """
+
+    def __init__(self, executor: AnalysisExecutor, queue_depth: int, latency_slo: float, enabled: bool = True):
+        self.executor = executor
+        self.queue_depth = queue_depth
+        self.latency_slo = latency_slo
+        self.enabled = enabled
+        self.shed_count = 0
+        self._lock = threading.Lock()
+
+    def should_shed(self) -> bool:
+        """True while the queue is deep or recent latency is over the SLO."""
+        if not self.enabled:
+            return False
+        p95 = self.executor.latency_percentile(95)
+        shed = self.executor.queued >= self.queue_depth or (p95 is not None and p95 > self.latency_slo)
+        if shed:
+            with self._lock:
+                self.shed_count += 1
+        return shed
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "queue_depth_threshold": self.queue_depth,
+            "latency_slo": self.latency_slo,
+            "shed_count": self.shed_count,
+        }
+
+
+load_shedder = LoadShedder(
+    analysis_executor,
+    queue_depth=settings.SHED_QUEUE_DEPTH,
+    latency_slo=settings.ANALYSIS_LATENCY_SLO_SECONDS,
+    enabled=settings.SHED_ENABLED
+)
+
+
+def _collect_shedding():
+    yield ("speech_analysis_shed_total", "counter", "Analyses run with optional stages shed",
+           [({}, load_shedder.shed_count)])
+
+
+REGISTRY.register_collector(_collect_shedding)
@@ -0,0 +1,258 @@
+#backend\src\services\resumable_uploads.py
+"""
+Resumable chunked uploads (tus-style) on local disk.
+
+Large session videos and story recordings fail half-way on home Wi-Fi;
+a plain multipart upload then starts again from zero. Here an upload is
+created with its total length, the bytes are appended by PATCH requests
+that state the offset they start at, and a client that lost its
+connection asks for the current offset (HEAD) and continues from there.
+
+Workflow:
+1. create(): reserve an id; metadata and data live side by side in
+   RESUMABLE_UPLOAD_DIR as <id>.json and <id>.part
+2. append(): the PATCH offset must equal the stored offset (409 otherwise);
+   the stored offset is what was written, even when the client drops
+   mid-chunk, so nothing received is sent twice
+3. complete uploads are finalized by the API (analysis / job queue) and
+   removed; unfinished ones expire after RESUMABLE_UPLOAD_TTL_SECONDS
+
+File I/O of appends runs on the default thread pool, so writing a large
+chunk to a slow disk does not stall the event loop.
+
+The directory is separate from AudioProcessor.upload_dir: partial files
+never show up among finished recordings.
+"""
+import asyncio
+import contextlib
+import json
+import os
+import re
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+
+from src.config import settings
+
+UPLOAD_KINDS = ("video", "audio")
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadNotFoundError(Exception):
+    """Unknown, expired or foreign upload id."""
+
+
+class UploadOffsetMismatchError(Exception):
+    """PATCH did not start at the stored offset."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Upload-Offset must be {expected}")
+        self.expected = expected
+
+
+class UploadTooLargeError(Exception):
+    """More bytes than the declared (or allowed) length."""
+
+
+class ResumableUpload:
+    """Metadata of one upload, stored as <id>.json."""
+
+    FIELDS = ("upload_id", "user_id", "kind", "length", "offset", "filename",
+              "exercise_id", "created_at", "expires_at")
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name))
+
+    @property
+    def complete(self) -> bool:
+        return self.offset >= self.length
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+class UploadStore:
+    """
+    Upload metadata and data files in one directory.
+
+    Appends, finalize and delete of the same upload are serialized by a
+    per-upload lock (one process); the offset check rejects overlapping
+    PATCHes from retries.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def root(self) -> str:
+        # Read lazily so settings overrides (tests, env) apply
+        return self._root or settings.RESUMABLE_UPLOAD_DIR
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.root, f"{upload_id}.json")
+
+    def data_path(self, upload: ResumableUpload) -> str:
+        return os.path.join(self.root, f"{upload.upload_id}.part")
+
+    @contextlib.asynccontextmanager
+    async def locked(self, upload_id: str):
+        """
+        Hold the upload's lock; re-read the upload with get() inside.
+
+        The lock is forgotten on exit once the upload is gone, so finished,
+        deleted or unknown ids leave nothing behind.
+        """
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        try:
+            async with lock:
+                yield
+        finally:
+            if not os.path.exists(self._meta_path(upload_id)) and self._locks.get(upload_id) is lock:
+                del self._locks[upload_id]
+
+    def _save(self, upload: ResumableUpload):
+        # Write-then-rename: a crash never leaves half a metadata file
+        path = self._meta_path(upload.upload_id)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(upload.to_dict(), f)
+        os.replace(path + ".tmp", path)
+
+    def _open_at_offset(self, upload: ResumableUpload):
+        f = open(self.data_path(upload), "r+b")
+        # Drop bytes past the stored offset (a crash between write and save)
+        f.truncate(upload.offset)
+        f.seek(upload.offset)
+        return f
+
+    def _close_and_save(self, f, upload: ResumableUpload):
+        f.close()
+        self._save(upload)
+
+    def create(self, user_id: str, kind: str, length: int, filename: str,
+               exercise_id: Optional[str] = None) -> ResumableUpload:
+        """Reserve a new upload of `length` bytes."""
+        if kind not in UPLOAD_KINDS:
+            raise ValueError(f"Unknown upload kind {kind!r}")
+        if length <= 0:
+            raise ValueError("Upload-Length must be positive")
+        if length > settings.RESUMABLE_MAX_UPLOAD_SIZE:
+            raise UploadTooLargeError(f"Uploads are limited to {settings.RESUMABLE_MAX_UPLOAD_SIZE} bytes")
+
+        os.makedirs(self.root, exist_ok=True)
+        now = time.time()
+        upload = ResumableUpload(
+            upload_id=uuid.uuid4().hex,
+            user_id=str(user_id),
+            kind=kind,
+            length=length,
+            offset=0,
+            filename=os.path.basename(filename or "") or "upload",
+            exercise_id=exercise_id,
+            created_at=now,
+            expires_at=now + settings.RESUMABLE_UPLOAD_TTL_SECONDS
+        )
+        open(self.data_path(upload), "wb").close()
+        self._save(upload)
+        return upload
+
+    def get(self, upload_id: str, user_id: str) -> ResumableUpload:
+        """The caller's upload (UploadNotFoundError for others' or expired ones)."""
+        if not _UPLOAD_ID.match(upload_id or ""):
+            raise UploadNotFoundError(upload_id)
+        try:
+            with open(self._meta_path(upload_id), encoding="utf-8") as f:
+                upload = ResumableUpload(**json.load(f))
+        except (OSError, ValueError):
+            raise UploadNotFoundError(upload_id)
+        if upload.user_id != str(user_id) or upload.expires_at < time.time():
+            raise UploadNotFoundError(upload_id)
+        return upload
+
+    async def append(self, upload: ResumableUpload, offset: int, chunks: AsyncIterator[bytes]) -> ResumableUpload:
+        """
+        Append a PATCH body at `offset`.
+
+        Args:
+            upload: Upload from get()
+            offset: Client's Upload-Offset header
+            chunks: Request body stream
+
+        Returns:
+            The upload with its new offset (stored even if the body broke off)
+        """
+        loop = asyncio.get_running_loop()
+        async with self.locked(upload.upload_id):
+            # Re-read: another request may have appended while we waited
+            upload = self.get(upload.upload_id, upload.user_id)
+            if offset != upload.offset:
+                raise UploadOffsetMismatchError(upload.offset)
+
+            f = await loop.run_in_executor(None, self._open_at_offset, upload)
+            try:
+                async for chunk in chunks:
+                    if upload.offset + len(chunk) > upload.length:
+                        raise UploadTooLargeError(f"Upload-Length is {upload.length} bytes")
+                    await loop.run_in_executor(None, f.write, chunk)
+                    upload.offset += len(chunk)
+            finally:
+                await loop.run_in_executor(None, self._close_and_save, f, upload)
+        return upload
+
+    def delete(self, upload: ResumableUpload, keep_data: bool = False):
+        """Remove the upload (the data file too unless it was moved / is kept)."""
+        paths = [self._meta_path(upload.upload_id)]
+        if not keep_data:
+            paths.append(self.data_path(upload))
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._locks.pop(upload.upload_id, None)
+
+    def prune_expired(self) -> List[str]:
+        """
+        Delete expired uploads (blocking; run it on a thread pool).
+
+        Uploads whose lock is held in this process are left for the next
+        prune.
+
+        Returns:
+            Ids of the removed uploads
+        """
+        if not os.path.isdir(self.root):
+            return []
+        removed = []
+        now = time.time()
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.root, name), encoding="utf-8") as f:
+                    upload = ResumableUpload(**json.load(f))
+            except (OSError, ValueError):
+                continue
+            lock = self._locks.get(upload.upload_id)
+            if upload.expires_at < now and not (lock is not None and lock.locked()):
+                self.delete(upload)
+                removed.append(upload.upload_id)
+        return removed
+
+    def list_for_user(self, user_id: str) -> List[ResumableUpload]:
+        """The user's unfinished uploads (for resuming after an app restart)."""
+        if not os.path.isdir(self.root):
+            return []
+        uploads = []
+        for name in os.listdir(self.root):
+            if name.endswith(".json"):
+                try:
+                    uploads.append(self.get(name[:-len(".json")], user_id))
+                except UploadNotFoundError:
+                    continue
+        return sorted(uploads, key=lambda upload: upload.created_at)
+
+
+upload_store = UploadStore()
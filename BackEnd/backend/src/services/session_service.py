@@ -0,0 +1,220 @@
+#backend\src\services\session_service.py
+"""
+Persisting speech analysis results as practice sessions.
+
+Shared by the synchronous /analyze endpoint and the analysis job workers,
+so both write identical Session documents and progress updates.
+"""
+import asyncio
+import os
+import random
+import shutil
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+try:
+    import librosa
+    HAS_LIBROSA = True
+except ImportError:
+    HAS_LIBROSA = False
+
+from src.config import settings
+from src.database.models import Session, Progress
+from src.utils.series_codec import pack_pitch_analysis
+from src.utils.metrics import REGISTRY
+
+WRITE_SECONDS = REGISTRY.histogram(
+    "session_write_seconds",
+    "MongoDB write time when recording sessions",
+    ["op"]
+)
+
+
+def clip_duration(audio_path: str, analysis_result: Dict) -> float:
+    """Clip duration in seconds (from the quality metrics when available)."""
+    duration = (analysis_result.get("signal_quality") or {}).get("duration", 0)
+    if not duration and HAS_LIBROSA:
+        try:
+            duration = librosa.get_duration(path=audio_path)
+        except Exception:
+            pass
+
+    if not duration:
+        # Fallback duration for mock mode or failure
+        duration = random.randint(5, 15)
+    return duration
+
+
+def store_session_audio(audio_path: str) -> str:
+    """
+    Keep a copy of the clip for later re-analysis (KEEP_SESSION_AUDIO).
+
+    Returns:
+        Path of the stored copy, named like the session's audio_url
+    """
+    os.makedirs(settings.SESSION_AUDIO_DIR, exist_ok=True)
+    suffix = os.path.splitext(audio_path)[1] or ".wav"
+    stored_path = os.path.join(settings.SESSION_AUDIO_DIR, f"{uuid.uuid4().hex}{suffix}")
+    shutil.copyfile(audio_path, stored_path)
+    return stored_path
+
+
+def session_scores(analysis_result: Dict) -> Dict:
+    """Session fields derived from the analysis (shared with bulk re-analysis)."""
+    return {
+        "pronunciation_score": analysis_result["overall_score"],
+        "pitch_score": analysis_result["pitch_analysis"]["score"],
+        "fluency_score": analysis_result["fluency_score"],
+        "confidence_score": analysis_result.get("acoustic_confidence", 0) * 100, # Use actual model confidence
+        "overall_score": analysis_result["overall_score"],
+        "mispronounced_phonemes": analysis_result["mispronounced_phonemes"],
+        "pitch_contour": pack_pitch_analysis(analysis_result["pitch_analysis"]),
+        "formant_data": analysis_result.get("formant_analysis"),
+        "ai_feedback": analysis_result["feedback"],
+        "suggestions": analysis_result["suggestions"],
+        "strengths": analysis_result.get("strengths", []),
+        "areas_to_improve": analysis_result.get("areas_to_improve", []),
+    }
+
+
+async def build_session(user_id: str, exercise_id: Optional[str], audio_path: str, analysis_result: Dict,
+                        session_id: Optional[str] = None, job_id: Optional[str] = None) -> Session:
+    """
+    Map an analysis result onto a Session document (not yet inserted).
+
+    A fixed `session_id` (a job's or idempotency key's) means the session
+    can only be inserted once.
+    """
+    if settings.KEEP_SESSION_AUDIO:
+        # Copying the clip is blocking file I/O: keep it off the event loop
+        audio_path = await asyncio.get_running_loop().run_in_executor(None, store_session_audio, audio_path)
+    return Session(
+        id=PydanticObjectId(session_id) if session_id else None,
+        job_id=job_id,
+        user_id=str(user_id),
+        exercise_id=exercise_id,
+        audio_url=f"/uploads/{os.path.basename(audio_path)}", # Placeholder URL
+        duration=clip_duration(audio_path, analysis_result),
+        points_earned=10 if analysis_result["pronunciation_score"] > 60 else 5,
+        is_completed=True,
+        **session_scores(analysis_result)
+    )
+
+
+def session_response(session: Session, analysis_result: Dict) -> Dict:
+    """Client response for a recorded analysis."""
+    return {
+        "session_id": str(session.id),
+        "analysis": analysis_result,
+        "feedback": analysis_result["feedback"],
+        "suggestions": analysis_result["suggestions"],
+        "points_earned": session.points_earned
+    }
+
+
+async def record_session(user_id: str, exercise_id: Optional[str], audio_path: str, analysis_result: Dict,
+                         session_id: Optional[str] = None, job_id: Optional[str] = None) -> Session:
+    """
+    Save an analysis as a Session and update the user's daily progress.
+
+    Workflow:
+    1. Build the Session document from the analysis result
+    2. Insert it; when a session with the fixed `session_id` already
+       exists (a retried job or request) return that one instead
+    3. Update today's Progress document
+
+    Args:
+        session_id: Fixed session id, making the insert idempotent
+        job_id: AnalysisJob the analysis belongs to (None for direct requests)
+    """
+    session = await build_session(user_id, exercise_id, audio_path, analysis_result, session_id, job_id)
+    try:
+        with WRITE_SECONDS.time(op="insert"):
+            await session.insert()
+    except DuplicateKeyError:
+        if not session_id:
+            raise
+        return await Session.get(PydanticObjectId(session_id))
+
+    # Update User Progress (Async/Background simplified)
+    await update_user_progress(user_id, session)
+    return session
+
+
+async def record_sessions(user_id: str, entries: List[Tuple[Optional[str], str, Dict]]) -> List[Session]:
+    """
+    Save several analyses at once (batch uploads).
+
+    Workflow:
+    1. Build all Session documents (ids assigned up front)
+    2. Insert them with one insert_many
+    3. Apply a single aggregated Progress update
+
+    Args:
+        user_id: Owner of the sessions
+        entries: (exercise_id, audio_path, analysis_result) per clip
+
+    Returns:
+        The inserted sessions, in entry order
+    """
+    sessions = list(await asyncio.gather(*(
+        build_session(user_id, exercise_id, audio_path, analysis_result)
+        for exercise_id, audio_path, analysis_result in entries
+    )))
+    if not sessions:
+        return sessions
+    for session in sessions:
+        session.id = PydanticObjectId()
+    with WRITE_SECONDS.time(op="insert_many"):
+        await Session.insert_many(sessions)
+
+    await update_user_progress_many(user_id, sessions)
+    return sessions
+
+
+async def update_user_progress(user_id: str, session: Session):
+    """Update user's daily progress stats"""
+    await update_user_progress_many(user_id, [session])
+
+
+async def update_user_progress_many(user_id: str, sessions: List[Session]):
+    """Update user's daily progress stats for one or more new sessions"""
+    if not sessions:
+        return
+    with WRITE_SECONDS.time(op="progress"):
+        await _apply_progress(user_id, sessions)
+
+
+async def _apply_progress(user_id: str, sessions: List[Session]):
+    user_id_str = str(user_id)
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # specific query for Beanie might need adjustment depending on datetime storage,
+    # but basic find should work.
+    # Note: Querying by date range is safer.
+
+    progress = await Progress.find_one(
+        Progress.user_id == user_id_str,
+        Progress.date >= today
+    )
+
+    if not progress:
+        progress = Progress(user_id=user_id_str, date=today)
+        await progress.insert()
+
+    previous_count = progress.sessions_completed
+    progress.sessions_completed += len(sessions)
+    progress.total_points += sum(session.points_earned for session in sessions)
+    progress.total_duration += sum(session.duration for session in sessions if session.duration) / 60
+
+    # Update average score (simplified running average)
+    current_total_score = (progress.average_score * previous_count) + sum(
+        session.pronunciation_score for session in sessions
+    )
+    progress.average_score = current_total_score / progress.sessions_completed
+
+    await progress.save()
@@ -0,0 +1,117 @@
+#backend\src\services\synthetic_load.py
+"""
+Deterministic synthetic analysis for capacity testing (LOAD_TEST_MODE).
+
+Load tests need the API, queue, executor, shedding and database paths to
+behave like production while the models stay out of the picture: real
+inference makes runs slow to set up and impossible to compare, and the
+mock fallback is random and instant. In load-test mode every analysis
+instead runs a synthetic copy of the analysis DAG whose stages sleep for a
+sampled latency and whose scores come from the seeded mock generator.
+
+Everything is drawn from one random.Random seeded with LOAD_TEST_SEED and
+a fingerprint of the request (clip bytes + reference text), so the same
+request always gets the same result and the same latencies, regardless of
+concurrency or arrival order. Changing the seed gives a different but
+equally repeatable run.
+
+Stage latencies are lognormal, configured per stage as (median seconds,
+sigma); sigma sets the tail, e.g. 0.35 puts p99 at roughly 2.3x the
+median. Degraded stages (load shedding) take DEGRADED_LATENCY_FACTOR of
+their full latency and skipped stages take none, so shedding relieves a
+synthetic run the way it relieves a real one.
+"""
+import hashlib
+import random
+import time
+from typing import Dict, Optional, Tuple
+
+from src.services.cancellation import CancellationToken, raise_if_cancelled
+
+# stage -> (median seconds, sigma); rough CPU figures for a 3 s clip
+DEFAULT_STAGE_LATENCIES: Dict[str, Tuple[float, float]] = {
+    "decode": (0.03, 0.3),
+    "quality_gate": (0.005, 0.3),
+    "pronunciation": (0.9, 0.35),
+    "pitch": (0.6, 0.3),
+    "fluency": (0.02, 0.3),
+    "formants": (0.05, 0.3),
+    "features": (0.9, 0.35),
+    "scoring": (0.005, 0.2),
+}
+
+DEGRADED_LATENCY_FACTOR = 0.25
+
+# Synthetic clip durations (seconds), uniform
+CLIP_DURATION_RANGE = (1.5, 6.0)
+
+
+def parse_stage_latencies(overrides: Optional[Dict] = None) -> Dict[str, Tuple[float, float]]:
+    """
+    Merge LOAD_TEST_STAGE_LATENCIES overrides into the defaults.
+
+    Args:
+        overrides: {stage: [median_seconds, sigma]} (a bare number is a
+                   median with no spread)
+
+    Returns:
+        {stage: (median, sigma)} for every known and overridden stage
+    """
+    latencies = dict(DEFAULT_STAGE_LATENCIES)
+    for stage, spec in (overrides or {}).items():
+        if isinstance(spec, (int, float)):
+            median, sigma = float(spec), 0.0
+        else:
+            median, sigma = (float(value) for value in spec)
+        if median < 0 or sigma < 0:
+            raise ValueError(f"Invalid synthetic latency for stage {stage}: {spec}")
+        latencies[stage] = (median, sigma)
+    return latencies
+
+
+class SyntheticLoad:
+    """
+    Seeded source of synthetic results and stage latencies.
+
+    Attributes:
+        seed: Base seed (LOAD_TEST_SEED)
+        latencies: {stage: (median seconds, sigma)}
+        scale: Multiplier on every latency (0 disables the sleeps)
+    """
+
+    def __init__(self, seed: int, latencies: Optional[Dict] = None, scale: float = 1.0):
+        self.seed = seed
+        self.latencies = parse_stage_latencies(latencies)
+        self.scale = scale
+
+    def rng_for(self, audio_bytes: bytes, reference_text: str) -> random.Random:
+        """Generator seeded by the base seed and the request content."""
+        digest = hashlib.sha256()
+        digest.update(str(self.seed).encode("utf-8"))
+        digest.update(hashlib.sha256(audio_bytes).digest())
+        digest.update((reference_text or "").encode("utf-8"))
+        return random.Random(int.from_bytes(digest.digest()[:8], "big"))
+
+    def sample_latencies(self, rng: random.Random) -> Dict[str, float]:
+        """One latency per configured stage, drawn in a fixed order."""
+        sampled = {}
+        for stage, (median, sigma) in self.latencies.items():
+            # median * e^(sigma * N(0, 1)); always drawn so zero medians
+            # do not shift the sequence for later stages
+            sampled[stage] = median * rng.lognormvariate(0.0, sigma) * self.scale
+        return sampled
+
+    @staticmethod
+    def sample_duration(rng: random.Random) -> float:
+        return round(rng.uniform(*CLIP_DURATION_RANGE), 2)
+
+
+def synthetic_sleep(seconds: float, cancel_token: Optional[CancellationToken] = None):
+    """Sleep for a synthetic stage, waking early when the token is cancelled."""
+    if seconds <= 0:
+        raise_if_cancelled(cancel_token)
+    elif cancel_token is None:
+        time.sleep(seconds)
+    else:
+        cancel_token.wait(seconds)
+        cancel_token.raise_if_cancelled()
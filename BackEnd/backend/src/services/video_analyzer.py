@@ -1,54 +1,572 @@
 #backend\src\services\video_analyzer.py
-import random
+import multiprocessing
+import threading
 import time
-from src.utils.scoring_algorithms import MockScoringGenerator
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.config import settings
+from src.services.cancellation import CancellationToken, AnalysisCancelledError, raise_if_cancelled
+from src.services.speech_analyzer import SpeechAnalyzer
+from src.utils.profiler import profiled
+from src.utils.video_decoder import (
+    HAS_VIDEO_DECODER, VideoInfo, VideoDecodeError, probe_video, iter_sampled_frames, decode_audio_track
+)
+from src.utils.frame_features import HAS_FACE_DETECTOR, analyze_frame_batch
+from src.utils.av_sync import summarize_sync
+
+# Face centre must lie in this part of the frame to count as facing the camera
+CENTER_X_RANGE = (0.2, 0.8)
+CENTER_Y_RANGE = (0.1, 0.7)
+
+# Median frame-difference energy (0-255 scale) separating low / moderate / high motion
+LOW_MOTION = 3.0
+HIGH_MOTION = 12.0
+
+ATTENTION_WINDOW_SECONDS = 5.0
+MAX_TREND_POINTS = 10
+
+# Early scoring of a partly received file: utterances must end this long
+# before the received audio does (otherwise they may still be going on)
+RECEIVED_EDGE_SECONDS = 1.0
+
+_frame_pool: Optional[ProcessPoolExecutor] = None
+_frame_pool_lock = threading.Lock()
+
+
+def get_frame_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared process pool for frame analysis (None: analyze inline)."""
+    global _frame_pool
+    if settings.VIDEO_FRAME_WORKERS <= 0:
+        return None
+    with _frame_pool_lock:
+        if _frame_pool is None:
+            # spawn: never fork a process holding torch / executor threads
+            _frame_pool = ProcessPoolExecutor(
+                max_workers=settings.VIDEO_FRAME_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _frame_pool
+
+
+def shutdown_frame_pool(wait: bool = True):
+    """Stop the frame pool (called on app shutdown)."""
+    global _frame_pool
+    with _frame_pool_lock:
+        pool, _frame_pool = _frame_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+class FrameStats:
+    """
+    Per-frame features accumulated batch by batch, in time order.
+    """
+
+    def __init__(self):
+        self.timestamps: List[float] = []
+        self._features: Dict[str, List[np.ndarray]] = {}
+
+    def add(self, timestamps: List[float], features: Dict[str, np.ndarray]):
+        self.timestamps.extend(timestamps)
+        for name, values in features.items():
+            self._features.setdefault(name, []).append(values)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def feature(self, name: str) -> np.ndarray:
+        return np.concatenate(self._features[name]) if name in self._features else np.array([])
+
+
+def summarize_frames(stats: FrameStats, frame_size, duration: float, faces_available: bool = True) -> Dict:
+    """
+    Visual engagement metrics from per-frame features.
+    
+    Algorithm:
+    1. Presence: share of sampled frames with a frontal face
+    2. Eye contact: share of frames with a face near the frame centre
+    3. Posture: steadiness and height of the face centre over time
+    4. Attention: presence level, "Fluctuating" when it swings between
+       5 s windows
+    5. Activity: several faces -> social, high motion -> physical,
+       face mostly present -> speaking practice
+    
+    Args:
+        stats: Accumulated frame features
+        frame_size: (width, height) of the analyzed frames
+        duration: Video duration in seconds
+        faces_available: False without a face detector; face-based
+                         scores are then None
+    
+    Returns:
+        Dict with activity, emotion, attention, interaction_score,
+        posture_score, eye_contact_score and the engagement timeline
+    """
+    width, height = frame_size
+    timestamps = np.array(stats.timestamps)
+    motion = stats.feature("motion")
+    faces = stats.feature("faces")
+    boxes = stats.feature("face_box").reshape(-1, 4)
+    present = faces > 0
+
+    median_motion = float(np.median(motion[1:])) if len(motion) > 1 else 0.0
+    if median_motion >= HIGH_MOTION:
+        motion_level, motion_engagement = "high", 50
+    elif median_motion >= LOW_MOTION:
+        motion_level, motion_engagement = "moderate", 100
+    else:
+        motion_level, motion_engagement = "low", 70
+
+    eye_contact_score = posture_score = None
+    presence = float(present.mean()) if len(present) else 0.0
+    windows = _windowed_mean(timestamps, present.astype(float), ATTENTION_WINDOW_SECONDS)
+    if faces_available:
+        center_x = (boxes[:, 0] + boxes[:, 2] / 2) / width
+        center_y = (boxes[:, 1] + boxes[:, 3] / 2) / height
+        centered = (
+            present
+            & (center_x >= CENTER_X_RANGE[0]) & (center_x <= CENTER_X_RANGE[1])
+            & (center_y >= CENTER_Y_RANGE[0]) & (center_y <= CENTER_Y_RANGE[1])
+        )
+        eye_contact_score = int(round(100 * centered.mean())) if len(centered) else 0
+
+        if present.sum() >= 3:
+            steadiness = 1 - min(1.0, float(np.std(center_y[present])) * 4)
+            upright = 1 - min(1.0, max(0.0, float(np.mean(center_y[present])) - 0.55) * 2.5)
+            posture_score = int(round(100 * (0.6 * steadiness + 0.4 * upright)))
+
+        if len(windows) > 1 and np.std(windows) > 0.3:
+            attention = "Fluctuating"
+        elif presence >= 0.75:
+            attention = "High"
+        elif presence >= 0.45:
+            attention = "Medium"
+        else:
+            attention = "Low"
+        interaction_score = int(round(0.5 * eye_contact_score + 0.3 * presence * 100 + 0.2 * motion_engagement))
+    else:
+        attention = "Medium"
+        interaction_score = motion_engagement
+
+    if faces_available and len(faces) and np.mean(faces >= 2) >= 0.2:
+        activity = "Social interaction with peers"
+    elif motion_level == "high":
+        activity = "Physical exercise (Jump/Run)"
+    elif presence >= 0.5 or not faces_available:
+        activity = "Speaking practice"
+    else:
+        activity = "Focused table activity"
+
+    # Timeline: face presence (or motion engagement without faces) per segment
+    segment_seconds = trend_segment_seconds(duration)
+    values = present.astype(float) * 100 if faces_available else np.minimum(motion * 8, 100)
+    segments = _windowed_mean(timestamps, values, segment_seconds)
+    timeline = [
+        {"time_segment": _format_time((i + 1) * segment_seconds), "accuracy": int(round(value))}
+        for i, value in enumerate(segments)
+    ]
+
+    return {
+        "activity": activity,
+        # No facial-expression model: expression is not assessed
+        "emotion": "Neutral",
+        "attention": attention,
+        "interaction_score": interaction_score,
+        "posture_score": posture_score,
+        "eye_contact_score": eye_contact_score,
+        "face_presence": round(presence, 3),
+        "motion_level": motion_level,
+        "timeline": timeline,
+    }
+
+
+def trend_segment_seconds(duration: float) -> float:
+    """Timeline segment length: 5 s, longer for videos over MAX_TREND_POINTS segments."""
+    return duration / MAX_TREND_POINTS if duration > MAX_TREND_POINTS * 5 else 5.0
+
+
+def summarize_speech(utterances: List[Dict], duration: float) -> Dict:
+    """
+    Accuracy trend and phoneme mastery from per-utterance speech scores.
+    
+    Algorithm:
+    1. Trend: mean overall score of the utterances starting in each
+       timeline segment (segments without speech are left out)
+    2. Mastery: mean score per target phoneme over all utterances, in
+       target order
+    
+    Args:
+        utterances: SpeechAnalyzer.analyze_utterances() entries
+        duration: Video duration in seconds
+    
+    Returns:
+        Dict with timeline, phoneme_mastery, overall_score and the
+        per-utterance summary
+    """
+    if not utterances:
+        return {"timeline": [], "phoneme_mastery": [], "overall_score": None, "utterances": []}
+
+    segment_seconds = trend_segment_seconds(duration)
+    starts = np.array([u["start"] for u in utterances])
+    scores = np.array([u["result"]["overall_score"] for u in utterances], dtype=float)
+    buckets = (starts // segment_seconds).astype(int)
+    sums = np.bincount(buckets, weights=scores)
+    counts = np.bincount(buckets)
+    timeline = [
+        {"time_segment": _format_time((bucket + 1) * segment_seconds), "accuracy": int(round(sums[bucket] / counts[bucket]))}
+        for bucket in np.flatnonzero(counts)
+    ]
+
+    phoneme_scores: Dict[str, List[float]] = {}
+    for utterance in utterances:
+        for phoneme, entry in utterance["result"].get("phoneme_scores", {}).items():
+            phoneme_scores.setdefault(phoneme, []).append(entry["score"])
+    phoneme_mastery = []
+    for phoneme, values in phoneme_scores.items():
+        score = int(round(float(np.mean(values))))
+        phoneme_mastery.append({"phoneme": f"/{phoneme}/", "score": score, "status": _mastery_status(score)})
+
+    return {
+        "timeline": timeline,
+        "phoneme_mastery": phoneme_mastery,
+        "overall_score": int(round(float(scores.mean()))),
+        "utterances": [
+            {
+                "start": round(u["start"], 2),
+                "end": round(u["end"], 2),
+                "score": u["result"]["overall_score"],
+                "transcription": u["result"].get("transcription", "")
+            }
+            for u in utterances
+        ]
+    }
+
+
+def _mastery_status(score: float) -> str:
+    if score >= 80:
+        return "Mastered"
+    elif score >= 60:
+        return "Developing"
+    return "Needs Practice"
+
+
+def _windowed_mean(timestamps: np.ndarray, values: np.ndarray, window: float) -> np.ndarray:
+    """Mean of `values` per consecutive `window`-second bucket (empty buckets dropped)."""
+    if not len(values):
+        return np.array([])
+    buckets = (timestamps // window).astype(int)
+    sums = np.bincount(buckets, weights=values)
+    counts = np.bincount(buckets)
+    return sums[counts > 0] / counts[counts > 0]
+
+
+def _format_time(seconds: float) -> str:
+    seconds = int(round(seconds))
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
 
 class VideoAnalyzer:
     """
-    Mock service to analyze child activities from video.
-    In a real application, this would use Computer Vision models like OpenPose, YOLO, or specialized action recognition models.
+    Analyzes child activity and engagement from video.
     
-    Uses centralized scoring algorithms for consistent analysis.
+    Frames are sampled at VIDEO_SAMPLE_FPS, decoded small and grayscale,
+    and analyzed in batches on a process pool (face detection, motion
+    energy); the batch results are folded into the engagement metrics as
+    they arrive. The audio track is scored utterance by utterance with the
+    speech pipeline at the same time. A file that cannot be decoded raises
+    VideoDecodeError; any other failure propagates as is.
     """
     
-    def __init__(self):
-        """Initialize video analyzer with mock score generator"""
-        self.mock_generator = MockScoringGenerator()
+    def __init__(self, speech_analyzer: Optional[SpeechAnalyzer] = None):
+        """Initialize video analyzer with its speech analyzer"""
+        self.speech_analyzer = speech_analyzer or SpeechAnalyzer()
     
-    def analyze_video(self, file_path: str) -> dict:
+    def analyze_video(
+        self,
+        file_path: str,
+        reference_text: str = "General Speech Practice",
+        language: Optional[str] = None,
+        prepared_target: Optional[Dict] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        prescored: Optional[Dict] = None
+    ) -> dict:
         """
-        Simulate video analysis with detailed reporting using algorithmic workflow.
+        Analyze a recorded session video.
         
         Workflow:
-        1. Generate activity detection metrics
-        2. Calculate engagement scores using scoring algorithms
-        3. Analyze phoneme mastery patterns
-        4. Generate temporal accuracy trends
-        5. Compile comprehensive feedback
+        1. Probe the container; start scoring the audio track on a
+           separate thread
+        2. Sample frames on a fixed time grid (oversampled for lip motion
+           when there is audio) and analyze the batches on the process
+           pool as they are decoded
+        3. Summarize presence, eye contact, posture, motion and attention
+        4. Take accuracy trend and phoneme mastery from the speech scores
+           (visual engagement timeline when there is no scorable speech)
+        5. Correlate lip motion with the audio envelope (sync, articulation)
+        6. Derive improvement areas and the narrative report
+        
+        Args:
+            file_path: Uploaded video
+            reference_text: Target word/sentence practiced in the video
+            language: Exercise language (guessed from the script if omitted)
+            prepared_target: Pre-normalized target stored on the exercise
+            cancel_token: Checked between frame batches and utterances
+            prescored: prescore_speech() state from while the file was
+                       uploading; only utterances after it are scored
+        
+        Returns: Video analysis result
+
+        Raises:
+            VideoDecodeError: The file is not a readable video
+            RuntimeError: No video decoder is installed
+        """
+        if not HAS_VIDEO_DECODER:
+            raise RuntimeError("No video decoder available (install av or opencv-python-headless)")
+
+        # A failed frame analysis cancels the token to stop the speech thread too
+        token = cancel_token or CancellationToken()
+        try:
+            started = time.perf_counter()
+            info = probe_video(file_path)
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="video-speech") as speech_pool:
+                speech_future = speech_pool.submit(
+                    profiled(self._analyze_speech),
+                    file_path, info, reference_text, language, prepared_target, token, prescored
+                )
+                try:
+                    stats, mouth, frame_size = self._analyze_frames(file_path, info, token)
+                except BaseException:
+                    token.cancel("video analysis failed")
+                    raise
+                speech_analysis = speech_future.result()
+            if not len(stats):
+                raise VideoDecodeError("No frames could be decoded")
+
+            metrics = summarize_frames(stats, frame_size, info.duration, HAS_FACE_DETECTOR)
+            speech = summarize_speech(speech_analysis["utterances"], info.duration)
+            sync = summarize_sync(
+                np.array(mouth.timestamps), mouth.feature("mouth_motion"),
+                speech_analysis.get("audio"), self.speech_analyzer.sample_rate
+            )
+            metrics.update(sync)
+            result = self._build_result(
+                metrics,
+                speech["timeline"] or metrics["timeline"],
+                speech["phoneme_mastery"]
+            )
+            result["speech"] = {
+                "overall_score": speech["overall_score"],
+                "utterances": speech["utterances"],
+                "utterances_rejected": speech_analysis["rejected"],
+                "utterances_prescored": len(prescored["utterances"]) if prescored else 0,
+                "audio_seconds": speech_analysis["audio_seconds"]
+            }
+            result["articulation"] = sync
+            result["video"] = {
+                **info.to_dict(),
+                "frames_analyzed": len(stats),
+                "face_detection": HAS_FACE_DETECTOR,
+                "processing_seconds": round(time.perf_counter() - started, 3)
+            }
+            result["is_mock"] = False
+            return result
+        except BrokenProcessPool:
+            # A worker died; the next analysis starts a fresh pool
+            shutdown_frame_pool(wait=False)
+            raise
+
+    def _analyze_speech(
+        self,
+        file_path: str,
+        info: VideoInfo,
+        reference_text: str,
+        language: Optional[str],
+        prepared_target: Optional[Dict],
+        cancel_token: CancellationToken,
+        prescored: Optional[Dict] = None
+    ) -> Dict:
         """
-        # Simulate processing time
-        time.sleep(2)
+        Score the audio track (speech thread).
         
-        # Step 1: Activity Detection (using algorithm generator)
-        metrics = self.mock_generator.generate_video_analysis_metrics()
+        The track is demuxed straight into an in-memory buffer at the
+        model rate; speech is optional, so failures only leave it out.
+        Utterances already scored during the upload are reused.
+        """
+        prescored = prescored or {"utterances": [], "rejected": 0, "scored_until": 0.0}
+        empty = {"utterances": list(prescored["utterances"]), "rejected": prescored["rejected"], "audio_seconds": 0.0}
+        if not info.has_audio:
+            return empty
+        try:
+            audio = decode_audio_track(file_path, self.speech_analyzer.sample_rate)
+            if audio is None or not len(audio):
+                return empty
+            raise_if_cancelled(cancel_token)
+            analysis = self.speech_analyzer.analyze_utterances(
+                audio,
+                reference_text,
+                language=language,
+                prepared_target=prepared_target,
+                cancel_token=cancel_token,
+                max_utterances=settings.VIDEO_MAX_UTTERANCES - len(prescored["utterances"]),
+                after=prescored["scored_until"]
+            )
+            analysis["utterances"] = prescored["utterances"] + analysis["utterances"]
+            analysis["rejected"] += prescored["rejected"]
+            analysis["audio_seconds"] = round(len(audio) / self.speech_analyzer.sample_rate, 2)
+            analysis["audio"] = audio  # for lip sync; not part of the response
+            return analysis
+        except AnalysisCancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Video speech analysis failed: {e}")
+            return empty
+
+    def prescore_speech(
+        self,
+        file_path: str,
+        state: Optional[Dict] = None,
+        reference_text: str = "General Speech Practice",
+        language: Optional[str] = None,
+        prepared_target: Optional[Dict] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Dict:
+        """
+        Score the utterances of a video that is still being uploaded.
+        
+        Workflow:
+        1. Decode the audio received so far (streamable containers only)
+        2. Score the utterances that ended before the received edge,
+           splitting from where the previous pass stopped (its region
+           boundaries stay fixed, so the final pass leaves no gap)
+        3. Extend the state; analyze_video(prescored=state) then only
+           scores what came after
         
-        # Step 2: Generate detailed report using algorithmic template selection
+        Args:
+            file_path: Partial upload
+            state: Result of the previous pass (None for the first)
+        
+        Returns:
+            {"utterances", "rejected", "scored_until" (seconds), "passes"}
+        """
+        state = dict(state or {"utterances": [], "rejected": 0, "scored_until": 0.0, "passes": 0})
+        audio = decode_audio_track(file_path, self.speech_analyzer.sample_rate, partial=True)
+        if audio is None:
+            return state
+        received = len(audio) / self.speech_analyzer.sample_rate
+        remaining = settings.VIDEO_MAX_UTTERANCES - len(state["utterances"])
+        if received - RECEIVED_EDGE_SECONDS <= state["scored_until"] or remaining <= 0:
+            return state
+
+        analysis = self.speech_analyzer.analyze_utterances(
+            audio,
+            reference_text,
+            language=language,
+            prepared_target=prepared_target,
+            cancel_token=cancel_token,
+            max_utterances=remaining,
+            after=state["scored_until"],
+            until=received - RECEIVED_EDGE_SECONDS
+        )
+        state["utterances"] = state["utterances"] + analysis["utterances"]
+        state["rejected"] += analysis["rejected"]
+        state["scored_until"] = analysis["handled_until"]
+        state["passes"] += 1
+        return state
+
+    @staticmethod
+    def _oversample(info: VideoInfo) -> int:
+        """Lip-motion sampling factor: only worth it with audio to sync to and faces to find."""
+        if info.has_audio and HAS_FACE_DETECTOR:
+            return max(1, settings.VIDEO_MOUTH_OVERSAMPLE)
+        return 1
+
+    def _analyze_frames(self, file_path: str, info: VideoInfo, cancel_token: Optional[CancellationToken]):
+        """
+        Decode sampled frames and analyze them batch by batch.
+        
+        Decoding (this thread) overlaps with analysis (process pool); at most
+        two batches per worker are in flight, so memory stays bounded for
+        long videos. Results are folded in time order.
+        
+        With oversampling the grid is VIDEO_MOUTH_OVERSAMPLE times denser;
+        batches stay a multiple of that factor so that every batch starts
+        on an engagement frame.
+        
+        Returns:
+            (engagement FrameStats, lip-motion FrameStats, frame size)
+        """
+        pool = get_frame_pool()
+        oversample = self._oversample(info)
+        batch_size = settings.VIDEO_FRAME_BATCH * oversample
+        window = deque()
+        stats = FrameStats()
+        mouth = FrameStats()
+        frame_size = None
+        previous = None
+
+        def collect(item):
+            timestamps, pending = item
+            features = dict(pending.result() if pool is not None else pending)
+            mouth.add(timestamps, {"mouth_motion": features.pop("mouth_motion")})
+            stats.add(timestamps[::oversample], features)
+
+        batch_times, batch_frames = [], []
+        frames = iter_sampled_frames(
+            file_path,
+            fps=settings.VIDEO_SAMPLE_FPS * oversample,
+            max_side=settings.VIDEO_FRAME_MAX_SIDE,
+            max_frames=settings.VIDEO_MAX_FRAMES * oversample,
+            seek_gap=settings.VIDEO_SEEK_GAP_SECONDS,
+            info=info
+        )
+        for timestamp, frame in frames:
+            batch_times.append(timestamp)
+            batch_frames.append(frame)
+            if len(batch_frames) < batch_size:
+                continue
+            raise_if_cancelled(cancel_token)
+            previous = self._submit(pool, window, batch_times, batch_frames, previous, oversample)
+            frame_size = (batch_frames[0].shape[1], batch_frames[0].shape[0])
+            batch_times, batch_frames = [], []
+            while len(window) > 2 * max(1, settings.VIDEO_FRAME_WORKERS):
+                collect(window.popleft())
+
+        if batch_frames:
+            self._submit(pool, window, batch_times, batch_frames, previous, oversample)
+            frame_size = (batch_frames[0].shape[1], batch_frames[0].shape[0])
+        while window:
+            raise_if_cancelled(cancel_token)
+            collect(window.popleft())
+        return stats, mouth, frame_size
+
+    @staticmethod
+    def _submit(pool, window: deque, timestamps: List[float], frames: List[np.ndarray], previous, oversample: int):
+        stack = np.stack(frames)
+        if pool is not None:
+            window.append((timestamps, pool.submit(analyze_frame_batch, stack, previous, oversample)))
+        else:
+            window.append((timestamps, analyze_frame_batch(stack, previous, oversample)))
+        # The next batch continues from the last engagement frame and the last frame
+        return stack[-oversample:]
+
+    def _build_result(self, metrics: Dict, accuracy_trend: list, phoneme_mastery: list) -> dict:
+        """Response fields derived from the engagement metrics."""
+        # Step 1: Generate detailed report using algorithmic template selection
         detailed_report = self._generate_contextual_report(
             metrics["activity"],
             metrics["emotion"],
             metrics["attention"]
         )
         
-        # Step 3: Identify improvement areas algorithmically
+        # Step 2: Identify improvement areas algorithmically
         needs_improvement = self._analyze_improvement_areas(metrics)
         
-        # Step 4: Phoneme Mastery Analysis (using scoring algorithm)
-        phoneme_mastery = self._calculate_phoneme_mastery()
-        
-        # Step 5: Generate accuracy trend timeline
-        accuracy_trend = self._generate_accuracy_timeline()
-        
-        # Step 6: Calculate posture and eye contact scores
+        # Step 3: Calculate posture and eye contact scores
         posture_analysis = self._analyze_posture(metrics["posture_score"])
         eye_contact_analysis = self._analyze_eye_contact(metrics["eye_contact_score"])
         
@@ -70,7 +588,7 @@ class VideoAnalyzer:
             "posture_score": metrics["posture_score"],
             "eye_contact_score": metrics["eye_contact_score"]
         }
-    
+
     def _generate_contextual_report(
         self,
         activity: str,
@@ -115,13 +633,14 @@ class VideoAnalyzer:
             "pacing": "Completing sentences without rushing",
             "articulation": "Lip rounding for 'o' and 'u' sounds",
             "rhythm": "Pacing of speech",
-            "clarity": "Clarity of consonant clusters"
+            "clarity": "Clarity of consonant clusters",
+            "lip_sync": "Moving the lips together with the sounds"
         }
         
         needs_improvement = []
         
-        # Algorithm: Select based on scores
-        if metrics["eye_contact_score"] < 70:
+        # Algorithm: Select based on scores (None: not assessed)
+        if metrics["eye_contact_score"] is not None and metrics["eye_contact_score"] < 70:
             needs_improvement.append(improvement_pool["eye_contact"])
         
         if metrics["interaction_score"] < 75:
@@ -130,74 +649,31 @@ class VideoAnalyzer:
         if metrics["attention"] in ["Low", "Fluctuating"]:
             needs_improvement.append(improvement_pool["rhythm"])
         
-        # Ensure at least 2-3 items
-        while len(needs_improvement) < 2:
-            remaining = [v for k, v in improvement_pool.items() if v not in needs_improvement]
-            if remaining:
-                needs_improvement.append(random.choice(remaining))
-            else:
-                break
-        
-        return needs_improvement[:3]
-    
-    def _calculate_phoneme_mastery(self) -> list:
-        """
-        Calculate phoneme mastery scores using algorithmic distribution.
-        
-        Algorithm: Normal distribution with controlled variance
-        """
-        phonemes = ['b', 'd', 'g', 'p', 't', 'k', 'm', 'n', 's', 'z', 'l', 'r']
-        phoneme_mastery = []
-        
-        for p in phonemes:
-            # Use normal distribution for more realistic scoring
-            # Mean: 75, Std: 15
-            score = int(random.gauss(75, 15))
-            score = max(40, min(100, score))  # Clamp to range
-            
-            # Status determination algorithm
-            if score >= 80:
-                status = "Mastered"
-            elif score >= 60:
-                status = "Developing"
-            else:
-                status = "Needs Practice"
-            
-            phoneme_mastery.append({
-                "phoneme": f"/{p}/",
-                "score": score,
-                "status": status
-            })
-        
-        return phoneme_mastery
-    
-    def _generate_accuracy_timeline(self, num_points: int = 10) -> list:
-        """
-        Generate accuracy trend with realistic progression algorithm.
+        # Lip motion vs. speech energy (only with a visible face and audio)
+        articulation_score = metrics.get("articulation_score")
+        if articulation_score is not None and articulation_score < 50:
+            needs_improvement.insert(0, improvement_pool["articulation"])
         
-        Algorithm: Random walk with slight upward bias
-        """
-        accuracy_trend = []
-        base_score = random.randint(50, 80)
+        av_sync_score = metrics.get("av_sync_score")
+        if av_sync_score is not None and av_sync_score < 40:
+            needs_improvement.append(improvement_pool["lip_sync"])
         
-        for i in range(1, num_points + 1):
-            # Random walk with slight positive bias for improvement
-            change = random.randint(-3, 7)  # Slight upward bias
-            base_score = max(0, min(100, base_score + change))
-            
-            accuracy_trend.append({
-                "time_segment": f"{i}m",
-                "accuracy": base_score
-            })
+        # Ensure at least 2-3 items: general practice tips, in a fixed order
+        for key in ("clarity", "pacing", "volume"):
+            if len(needs_improvement) >= 2:
+                break
+            needs_improvement.append(improvement_pool[key])
         
-        return accuracy_trend
+        return needs_improvement[:3]
     
-    def _analyze_posture(self, posture_score: int) -> str:
+    def _analyze_posture(self, posture_score: Optional[int]) -> str:
         """
         Analyze posture based on algorithmic thresholds.
         
         Algorithm: Threshold-based categorization
         """
+        if posture_score is None:
+            return "Not assessed"
         if posture_score >= 80:
             return "Excellent sitting posture"
         elif posture_score >= 65:
@@ -205,12 +681,14 @@ class VideoAnalyzer:
         else:
             return "Needs posture correction"
     
-    def _analyze_eye_contact(self, eye_contact_score: int) -> str:
+    def _analyze_eye_contact(self, eye_contact_score: Optional[int]) -> str:
         """
         Analyze eye contact based on algorithmic thresholds.
         
         Algorithm: Threshold-based categorization
         """
+        if eye_contact_score is None:
+            return "Not assessed"
         if eye_contact_score >= 75:
             return "Consistent"
         elif eye_contact_score >= 50:
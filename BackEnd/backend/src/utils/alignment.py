@@ -0,0 +1,227 @@
+"""
+backend/src/utils/alignment.py
+
+Weighted edit-distance alignment between a reference and a hypothesis.
+
+The alignment is computed once per (reference, hypothesis) pair with a
+row-vectorized NumPy dynamic program, then a single backtrace maps every
+reference position to its aligned hypothesis position. Scoring code reads
+the per-position operation codes directly instead of re-scanning
+SequenceMatcher opcodes for every reference character.
+
+Substitution costs are pluggable: by default any mismatch costs 1.0, and a
+dense cost matrix indexed by token id can be supplied per language.
+Token ids <= 0 are outside the matrix's inventory (an encoder's negated
+code point); two of them cost 0 when equal and 1 otherwise, the same
+equality the exact-match trim at both ends uses.
+"""
+
+import numpy as np
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+# Operation codes for each reference position
+MATCH = 0
+SUBSTITUTE = 1
+DELETE = 2
+INSERT = 3
+
+OPERATION_NAMES = {
+    MATCH: "equal",
+    SUBSTITUTE: "replace",
+    DELETE: "delete",
+    INSERT: "insert",
+}
+
+TokenEncoder = Callable[[str], np.ndarray]
+
+
+class Alignment:
+    """
+    Result of aligning a reference against a hypothesis.
+
+    Attributes:
+        reference: Reference sequence that was aligned
+        hypothesis: Hypothesis sequence that was aligned
+        ref_to_hyp: Aligned hypothesis index per reference position (-1 if deleted)
+        ref_ops: Operation code per reference position (MATCH/SUBSTITUTE/DELETE)
+        ref_costs: Cost paid at each reference position (0.0 to 1.0 for substitutions)
+        insertions: Hypothesis positions that were inserted
+        distance: Total weighted edit distance
+    """
+
+    __slots__ = ("reference", "hypothesis", "ref_to_hyp", "ref_ops", "ref_costs", "insertions", "distance")
+
+    def __init__(self, reference, hypothesis, ref_to_hyp, ref_ops, ref_costs, insertions, distance):
+        self.reference = reference
+        self.hypothesis = hypothesis
+        self.ref_to_hyp = ref_to_hyp
+        self.ref_ops = ref_ops
+        self.ref_costs = ref_costs
+        self.insertions = insertions
+        self.distance = distance
+
+    def similarity(self) -> float:
+        """Normalized similarity (1.0 = identical), comparable to SequenceMatcher.ratio()."""
+        total = len(self.reference) + len(self.hypothesis)
+        if total == 0:
+            return 1.0
+        return max(0.0, 1.0 - (2.0 * self.distance) / total)
+
+    def operation(self, ref_index: int) -> str:
+        """Name of the operation applied to a reference position."""
+        return OPERATION_NAMES[int(self.ref_ops[ref_index])]
+
+
+def _default_encode(reference: str, hypothesis: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode two strings as code point arrays."""
+    ref_ids = np.frombuffer(reference.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    hyp_ids = np.frombuffer(hypothesis.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    return ref_ids, hyp_ids
+
+
+class AlignmentEngine:
+    """
+    Weighted edit-distance aligner.
+
+    Algorithm:
+    1. Encode reference and hypothesis as token id arrays
+    2. Strip the common prefix and suffix (exact matches)
+    3. Fill the DP matrix one row at a time; the horizontal (insertion)
+       dependency is resolved with a running minimum so each row is a
+       handful of NumPy operations
+    4. Backtrace once, recording the operation for every reference position
+    """
+
+    def __init__(
+        self,
+        substitution_costs: Optional[np.ndarray] = None,
+        encoder: Optional[TokenEncoder] = None,
+        insertion_cost: float = 1.0,
+        deletion_cost: float = 1.0
+    ):
+        """
+        Args:
+            substitution_costs: Optional dense (V x V) cost matrix indexed by token id
+            encoder: Maps a string to token ids; required with substitution_costs
+            insertion_cost: Cost of an extra hypothesis token
+            deletion_cost: Cost of a missing reference token
+        """
+        if substitution_costs is not None and encoder is None:
+            raise ValueError("A token encoder is required with a substitution cost matrix")
+        self.substitution_costs = substitution_costs
+        self.encoder = encoder
+        self.insertion_cost = float(insertion_cost)
+        self.deletion_cost = float(deletion_cost)
+
+    def substitution_matrix(self, ref_ids: np.ndarray, hyp_ids: np.ndarray) -> np.ndarray:
+        """(len(ref_ids) x len(hyp_ids)) substitution costs."""
+        different = ref_ids[:, None] != hyp_ids[None, :]
+        if self.substitution_costs is None:
+            return different.astype(np.float64)
+        # Unknown ids share the matrix's row/column 0 ...
+        costs = self.substitution_costs[np.maximum(ref_ids, 0)[:, None], np.maximum(hyp_ids, 0)[None, :]]
+        # ... but two unknowns are compared by identity
+        both_unknown = (ref_ids[:, None] <= 0) & (hyp_ids[None, :] <= 0)
+        return np.where(both_unknown, different, costs)
+
+    def encode(self, reference: Union[str, np.ndarray], hypothesis: Union[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode a pair of sequences into token id arrays (already-encoded arrays pass through)."""
+        if isinstance(reference, np.ndarray) and isinstance(hypothesis, np.ndarray):
+            return reference, hypothesis
+        if self.encoder is None:
+            return _default_encode(reference, hypothesis)
+        return self.encoder(reference), self.encoder(hypothesis)
+
+    def align(
+        self,
+        reference: Union[str, Sequence],
+        hypothesis: Union[str, Sequence],
+        ref_ids: Optional[np.ndarray] = None,
+        hyp_ids: Optional[np.ndarray] = None
+    ) -> Alignment:
+        """
+        Align a hypothesis against a reference.
+
+        Args:
+            reference: Reference text (e.g. normalized target word)
+            hypothesis: Hypothesis text (e.g. normalized transcription)
+            ref_ids: Optional pre-encoded reference token ids
+            hyp_ids: Optional pre-encoded hypothesis token ids
+
+        Returns:
+            Alignment with per-reference-position operations
+        """
+        if ref_ids is None or hyp_ids is None:
+            enc_ref, enc_hyp = self.encode(reference, hypothesis)
+            ref_ids = enc_ref if ref_ids is None else ref_ids
+            hyp_ids = enc_hyp if hyp_ids is None else hyp_ids
+
+        n, m = len(ref_ids), len(hyp_ids)
+        ins, dele = self.insertion_cost, self.deletion_cost
+        ref_to_hyp = np.full(n, -1, dtype=np.int64)
+        ref_ops = np.full(n, DELETE, dtype=np.int8)
+        ref_costs = np.full(n, dele)
+        insertions: List[int] = []
+
+        # Step 1: Exact matches at both ends never need the DP
+        shortest = min(n, m)
+        mismatch = np.flatnonzero(ref_ids[:shortest] != hyp_ids[:shortest])
+        prefix = int(mismatch[0]) if len(mismatch) else shortest
+        rest = shortest - prefix
+        mismatch = np.flatnonzero(ref_ids[n - rest:][::-1] != hyp_ids[m - rest:][::-1]) if rest else mismatch[:0]
+        suffix = int(mismatch[0]) if len(mismatch) else rest
+
+        ref_to_hyp[:prefix] = np.arange(prefix)
+        ref_to_hyp[n - suffix:] = np.arange(m - suffix, m)
+        ref_ops[:prefix] = MATCH
+        ref_ops[n - suffix:] = MATCH
+        ref_costs[:prefix] = 0.0
+        ref_costs[n - suffix:] = 0.0
+
+        core_ref = ref_ids[prefix:n - suffix]
+        core_hyp = hyp_ids[prefix:m - suffix]
+        cn, cm = len(core_ref), len(core_hyp)
+        sub = self.substitution_matrix(core_ref, core_hyp)
+
+        # Step 2: Row-vectorized DP over the differing middle
+        ramp = np.arange(cm + 1) * ins
+        dp = np.empty((cn + 1, cm + 1))
+        dp[0] = ramp
+        for i in range(1, cn + 1):
+            prev = dp[i - 1]
+            row = dp[i]
+            row[0] = prev[0] + dele
+            np.minimum(prev[:-1] + sub[i - 1], prev[1:] + dele, out=row[1:])
+            # Insertions chain left to right: row[j] = min_k(row[k] + (j - k) * ins)
+            np.minimum.accumulate(row - ramp, out=row)
+            row += ramp
+
+        # Step 3: Single backtrace (item() keeps the comparisons on Python floats)
+        i, j = cn, cm
+        while i > 0 or j > 0:
+            current = dp.item(i, j)
+            if i > 0 and j > 0:
+                cost = sub.item(i - 1, j - 1)
+                if abs(current - (dp.item(i - 1, j - 1) + cost)) < 1e-9:
+                    ref_to_hyp[prefix + i - 1] = prefix + j - 1
+                    ref_ops[prefix + i - 1] = MATCH if cost == 0 else SUBSTITUTE
+                    ref_costs[prefix + i - 1] = cost
+                    i, j = i - 1, j - 1
+                    continue
+            if i > 0 and abs(current - (dp.item(i - 1, j) + dele)) < 1e-9:
+                i -= 1
+            else:
+                insertions.append(prefix + j - 1)
+                j -= 1
+
+        insertions.reverse()
+        return Alignment(reference, hypothesis, ref_to_hyp, ref_ops, ref_costs, insertions, dp.item(cn, cm))
+
+
+# Shared engine with unit costs for callers without a language table
+_default_engine = AlignmentEngine()
+
+
+def align(reference: str, hypothesis: str) -> Alignment:
+    """Align two strings with unit substitution costs."""
+    return _default_engine.align(reference, hypothesis)
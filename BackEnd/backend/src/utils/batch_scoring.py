@@ -0,0 +1,379 @@
+"""
+backend/src/utils/batch_scoring.py
+
+Vectorized batch versions of the centralized scoring algorithms.
+
+Every method here mirrors one method of `ScoringAlgorithms` but scores many
+clips at once from columnar arrays instead of one clip at a time.
+Ragged per-clip series (pitch values, phoneme scores) are passed as a flat
+`values` array plus an `offsets` array of length n_clips + 1, so clip i is
+`values[offsets[i]:offsets[i + 1]]`. Frame matrices (RMS energy) are passed
+as a 2D array padded on the right plus a `lengths` array.
+
+The arithmetic follows the scalar path operation by operation so that the
+batch results are identical to calling the scalar methods in a loop.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.utils.scoring_algorithms import DEFAULT_OVERALL_WEIGHTS
+
+
+def pack_ragged(series: Sequence[Sequence[float]], dtype=np.float64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pack a list of per-clip series into flat values plus offsets.
+
+    Args:
+        series: One sequence of values per clip
+        dtype: dtype of the packed values
+
+    Returns:
+        Tuple of (values, offsets)
+    """
+    lengths = np.fromiter((len(s) for s in series), dtype=np.int64, count=len(series))
+    offsets = np.zeros(len(series) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if offsets[-1] == 0:
+        return np.zeros(0, dtype=dtype), offsets
+    values = np.concatenate([np.asarray(s, dtype=dtype) for s in series])
+    return values, offsets
+
+
+def pack_frames(series: Sequence[Sequence[float]], dtype=np.float64, fill: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pack a list of per-clip frame series into a right-padded matrix.
+
+    Args:
+        series: One sequence of frame values per clip
+        dtype: dtype of the matrix
+        fill: Value used for padding
+
+    Returns:
+        Tuple of (matrix, lengths)
+    """
+    lengths = np.fromiter((len(s) for s in series), dtype=np.int64, count=len(series))
+    width = int(lengths.max()) if len(lengths) else 0
+    matrix = np.full((len(series), width), fill, dtype=dtype)
+    for row, values in enumerate(series):
+        matrix[row, :len(values)] = values
+    return matrix, lengths
+
+
+def _ragged_to_matrix(values: np.ndarray, offsets: np.ndarray, fill: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Scatter flat ragged values into a padded matrix and its validity mask."""
+    counts = np.diff(offsets)
+    width = int(counts.max()) if len(counts) else 0
+    columns = np.arange(width)
+    mask = columns[None, :] < counts[:, None]
+    matrix = np.full(mask.shape, fill, dtype=values.dtype)
+    matrix[mask] = values[offsets[0]:offsets[-1]]
+    return matrix, mask
+
+
+def _python_round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    Round like the builtin `round`, which the scalar path uses.
+
+    np.round scales by 10**ndigits before rounding and can disagree with
+    the builtin on values like 2.675, so the final display rounding is
+    done element-wise on the (already reduced) per-clip values.
+    """
+    return np.array([round(v, ndigits) for v in values.tolist()], dtype=np.float64)
+
+
+def _percentile_rows(sorted_rows: np.ndarray, lengths: np.ndarray, q: float) -> np.ndarray:
+    """
+    Per-row linear percentile over the first `lengths[i]` sorted values.
+
+    Reproduces numpy's default ("linear") method, including its
+    interpolation formula and its dtype handling, so each row matches
+    `np.percentile(row[:length], q)` exactly.
+    """
+    dtype = sorted_rows.dtype
+    quantile = np.asarray(q, dtype=dtype) / np.asarray(100, dtype=dtype)
+    virtual = (lengths - 1).astype(dtype) * quantile
+    previous = np.floor(virtual)
+    gamma = virtual - previous
+
+    previous_idx = previous.astype(np.intp)
+    next_idx = previous_idx + 1
+    above = virtual >= (lengths - 1)
+    previous_idx[above] = lengths[above] - 1
+    next_idx[above] = lengths[above] - 1
+    previous_idx = np.clip(previous_idx, 0, None)
+    next_idx = np.clip(next_idx, 0, None)
+
+    rows = np.arange(len(sorted_rows))
+    a = sorted_rows[rows, previous_idx]
+    b = sorted_rows[rows, next_idx]
+
+    diff_b_a = b - a
+    result = a + diff_b_a * gamma
+    upper = gamma >= 0.5
+    result[upper] = (b - diff_b_a * (1 - gamma))[upper]
+    return result
+
+
+class BatchScoringAlgorithms:
+    """
+    Batch scoring algorithms over columnar arrays.
+    Each method is the vectorized counterpart of a `ScoringAlgorithms` method.
+    """
+
+    @staticmethod
+    def calculate_pronunciation_scores(
+        scores: np.ndarray,
+        offsets: np.ndarray,
+        acoustic_confidence: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Calculate pronunciation scores for many clips.
+
+        Args:
+            scores: Flat phoneme-level scores of all clips
+            offsets: Clip boundaries into `scores` (length n_clips + 1)
+            acoustic_confidence: Per-clip model confidence (0.0 to 1.0)
+
+        Returns:
+            Array of pronunciation scores (0-100)
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        scores = np.asarray(scores, dtype=np.float64)
+        n_clips = len(offsets) - 1
+        if acoustic_confidence is None:
+            acoustic_confidence = np.zeros(n_clips)
+        acoustic_confidence = np.broadcast_to(np.asarray(acoustic_confidence, dtype=np.float64), (n_clips,))
+
+        matrix, mask = _ragged_to_matrix(scores, offsets, 0.0)
+        counts = mask.sum(axis=1)
+        has_scores = counts > 0
+
+        avg_score = np.zeros(n_clips)
+        avg_score[has_scores] = matrix[has_scores].sum(axis=1) / counts[has_scores]
+
+        weighted = (avg_score * 0.7) + (acoustic_confidence * 100 * 0.3)
+        final_score = np.where(acoustic_confidence > 0, weighted, avg_score)
+
+        result = np.trunc(np.clip(final_score, 0, 100)).astype(np.int64)
+        result[~has_scores] = 0
+        return result
+
+    @staticmethod
+    def calculate_pitch_scores(
+        pitch_values: np.ndarray,
+        offsets: np.ndarray,
+        voiced_ratios: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Calculate pitch scores for many clips.
+
+        Args:
+            pitch_values: Flat pitch values of all clips (Hz, NaN = unvoiced)
+            offsets: Clip boundaries into `pitch_values` (length n_clips + 1)
+            voiced_ratios: Per-clip ratio of voiced segments
+
+        Returns:
+            Tuple of (scores, analysis arrays keyed like the scalar dict)
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        pitch_values = np.asarray(pitch_values, dtype=np.float64)
+        n_clips = len(offsets) - 1
+        if voiced_ratios is None:
+            voiced_ratios = np.ones(n_clips)
+        voiced_ratios = np.broadcast_to(np.asarray(voiced_ratios, dtype=np.float64), (n_clips,))
+
+        matrix, mask = _ragged_to_matrix(pitch_values, offsets, np.nan)
+        raw_counts = np.diff(offsets)
+        valid = mask & ~np.isnan(matrix)
+        counts = valid.sum(axis=1)
+        scorable = (raw_counts >= 5) & (counts >= 5)
+
+        safe_counts = np.where(scorable, counts, 1)
+        filled = np.where(valid, matrix, 0.0)
+        mean_pitch = filled.sum(axis=1) / safe_counts
+        deviations = np.where(valid, matrix - mean_pitch[:, None], 0.0)
+        std_pitch = np.sqrt((deviations * deviations).sum(axis=1) / safe_counts)
+
+        # Same rule cascade as ScoringAlgorithms.calculate_pitch_score
+        pitch_score = np.full(n_clips, 90)
+        pitch_score -= np.select(
+            [std_pitch < 12, std_pitch > 70, (std_pitch < 20) | (std_pitch > 40)],
+            [30, 20, 5],
+            default=0
+        )
+        pitch_score -= np.select(
+            [voiced_ratios < 0.2, voiced_ratios < 0.4],
+            [15, 5],
+            default=0
+        )
+        pitch_score = np.clip(pitch_score, 0, 100)
+        stability = (1.0 - np.minimum(std_pitch / 100, 1.0)) * 100
+
+        pitch_score = np.where(scorable, pitch_score, 50)
+        mean_pitch = np.where(scorable, mean_pitch, 0.0)
+        std_pitch = np.where(scorable, std_pitch, 0.0)
+        stability = np.where(scorable, stability, 0.0)
+
+        return pitch_score.astype(np.int64), {
+            "mean_pitch": _python_round(mean_pitch, 2),
+            "std_pitch": _python_round(std_pitch, 2),
+            "stability": _python_round(stability, 2)
+        }
+
+    @staticmethod
+    def calculate_fluency_scores(
+        audio_energy: np.ndarray,
+        lengths: np.ndarray,
+        sample_rate: int,
+        adaptive_threshold: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Calculate fluency scores for many clips.
+
+        Args:
+            audio_energy: RMS energy matrix (n_clips x max_frames), right-padded
+            lengths: Number of valid frames per clip
+            sample_rate: Audio sample rate
+            adaptive_threshold: Optional per-clip silence thresholds
+
+        Returns:
+            Tuple of (scores, analysis arrays keyed like the scalar dict)
+        """
+        audio_energy = np.asarray(audio_energy)
+        if audio_energy.dtype not in (np.float32, np.float64):
+            audio_energy = audio_energy.astype(np.float64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        n_clips, width = audio_energy.shape
+        columns = np.arange(width)
+        mask = columns[None, :] < lengths[:, None]
+
+        total_seconds = lengths * (512 / sample_rate)
+        scorable = total_seconds >= 0.5
+
+        if adaptive_threshold is None:
+            # Adaptive threshold: 15th percentile + bias (padding sorts last)
+            padded = np.where(mask, audio_energy, np.inf).astype(audio_energy.dtype)
+            padded.sort(axis=1)
+            percentile = _percentile_rows(padded, np.maximum(lengths, 1), 15)
+            adaptive_threshold = percentile + audio_energy.dtype.type(0.005)
+        threshold = np.broadcast_to(np.asarray(adaptive_threshold), (n_clips,))
+
+        # Padding counts as silence so that a trailing silent run is never
+        # closed by a padded frame, exactly like the scalar loop.
+        is_silence = (audio_energy < threshold[:, None]) | ~mask
+        silence_duration = (is_silence & mask).sum(axis=1)
+
+        # Length of the silent run ending at each frame
+        last_voiced = np.maximum.accumulate(
+            np.where(~is_silence, columns[None, :], -1), axis=1
+        )
+        run_length = columns[None, :] - last_voiced
+        min_pause_frames = 8
+        pause_ends = ~is_silence[:, 1:] & (run_length[:, :-1] >= min_pause_frames)
+        pause_count = pause_ends.sum(axis=1)
+
+        safe_lengths = np.where(scorable, lengths, 1)
+        safe_seconds = np.where(scorable, total_seconds, 1.0)
+        silence_ratio = silence_duration / safe_lengths
+        pauses_per_second = pause_count / safe_seconds
+
+        fluency_score = np.full(n_clips, 100.0)
+        fluency_score = np.where(silence_ratio > 0.35, fluency_score - (silence_ratio - 0.35) * 120, fluency_score)
+        fluency_score = np.where(pauses_per_second > 1.2, fluency_score - (pauses_per_second - 1.2) * 30, fluency_score)
+        fluency_score = np.where(silence_ratio < 0.05, fluency_score - 15, fluency_score)
+        fluency_score = np.clip(np.trunc(fluency_score), 0, 100).astype(np.int64)
+
+        fluency_score = np.where(scorable, fluency_score, 100)
+        pause_count = np.where(scorable, pause_count, 0)
+        silence_ratio = np.where(scorable, silence_ratio, 0.0)
+        pauses_per_second = np.where(scorable, pauses_per_second, 0.0)
+
+        return fluency_score, {
+            "pause_count": pause_count,
+            "silence_ratio": _python_round(silence_ratio, 3),
+            "pauses_per_second": _python_round(pauses_per_second, 2)
+        }
+
+    @staticmethod
+    def calculate_overall_scores(
+        pronunciation_scores: np.ndarray,
+        pitch_scores: np.ndarray,
+        fluency_scores: np.ndarray,
+        acoustic_confidence: np.ndarray = 0.0,
+        weights: Optional[Dict[str, float]] = None
+    ) -> np.ndarray:
+        """
+        Calculate overall scores for many clips using a weighted combination.
+
+        Args:
+            pronunciation_scores: Pronunciation scores (0-100)
+            pitch_scores: Pitch scores (0-100)
+            fluency_scores: Fluency scores (0-100)
+            acoustic_confidence: Model confidence (0.0-1.0), scalar or per clip
+            weights: Optional custom weights
+
+        Returns:
+            Array of overall scores (0-100)
+        """
+        if weights is None:
+            weights = DEFAULT_OVERALL_WEIGHTS
+
+        pronunciation_scores = np.asarray(pronunciation_scores, dtype=np.float64)
+        pitch_scores = np.asarray(pitch_scores, dtype=np.float64)
+        fluency_scores = np.asarray(fluency_scores, dtype=np.float64)
+        acoustic_confidence = np.asarray(acoustic_confidence, dtype=np.float64)
+
+        overall = (
+            (pronunciation_scores * weights["pronunciation"]) +
+            (acoustic_confidence * 100 * weights["acoustic"]) +
+            (fluency_scores * weights["fluency"]) +
+            (pitch_scores * weights["pitch"])
+        )
+
+        return np.trunc(np.clip(overall, 0, 100)).astype(np.int64)
+
+    @staticmethod
+    def sweep_overall_weights(
+        pronunciation_scores: np.ndarray,
+        pitch_scores: np.ndarray,
+        fluency_scores: np.ndarray,
+        acoustic_confidence: np.ndarray,
+        weight_grid: List[Dict[str, float]]
+    ) -> np.ndarray:
+        """
+        Re-score every clip under several candidate weightings.
+
+        Args:
+            pronunciation_scores: Pronunciation scores (0-100)
+            pitch_scores: Pitch scores (0-100)
+            fluency_scores: Fluency scores (0-100)
+            acoustic_confidence: Model confidence (0.0-1.0)
+            weight_grid: Candidate weight dicts
+
+        Returns:
+            Matrix of overall scores (n_weightings x n_clips)
+        """
+        columns = ("pronunciation", "acoustic", "fluency", "pitch")
+        grid = np.array([[w[c] for c in columns] for w in weight_grid], dtype=np.float64)
+        overall = (
+            (np.asarray(pronunciation_scores, dtype=np.float64)[None, :] * grid[:, 0:1]) +
+            (np.asarray(acoustic_confidence, dtype=np.float64)[None, :] * 100 * grid[:, 1:2]) +
+            (np.asarray(fluency_scores, dtype=np.float64)[None, :] * grid[:, 2:3]) +
+            (np.asarray(pitch_scores, dtype=np.float64)[None, :] * grid[:, 3:4])
+        )
+        return np.trunc(np.clip(overall, 0, 100)).astype(np.int64)
+
+
+# Convenience functions mirroring the scalar module
+def calculate_pronunciation_scores(*args, **kwargs):
+    return BatchScoringAlgorithms.calculate_pronunciation_scores(*args, **kwargs)
+
+def calculate_pitch_scores(*args, **kwargs):
+    return BatchScoringAlgorithms.calculate_pitch_scores(*args, **kwargs)
+
+def calculate_fluency_scores(*args, **kwargs):
+    return BatchScoringAlgorithms.calculate_fluency_scores(*args, **kwargs)
+
+def calculate_overall_scores(*args, **kwargs):
+    return BatchScoringAlgorithms.calculate_overall_scores(*args, **kwargs)
@@ -1 +1,219 @@
-#backend\src\utils\feature_extractor.py
\ No newline at end of file
+#backend\src\utils\feature_extractor.py
+"""
+Acoustic feature extraction on the per-clip audio buffer.
+
+Formants (vocal-tract resonances) are estimated with linear prediction:
+every frame is fitted with an all-pole LPC filter and the filter poles give
+the resonance frequencies. All frames of a clip are processed together, so
+the cost is a handful of NumPy calls rather than a Python loop per frame.
+"""
+
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Framing (seconds) and LPC settings
+FORMANT_FRAME_LENGTH = 0.025
+FORMANT_HOP_LENGTH = 0.010
+PRE_EMPHASIS = 0.97
+
+# Formant candidate limits (Hz)
+MIN_FORMANT_FREQUENCY = 90.0
+MAX_FORMANT_BANDWIDTH = 400.0
+NUM_FORMANTS = 3
+
+# Voiced-frame detection: energy relative to the loudest frame, and a
+# zero-crossing rate ceiling (fricatives and noise cross zero far more often)
+VOICED_ENERGY_RATIO = 0.1
+VOICED_MAX_ZCR = 0.25
+
+
+def frame_signal(audio: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """
+    Split a signal into overlapping frames without copying.
+
+    Args:
+        audio: 1-D signal
+        frame_length: Samples per frame
+        hop_length: Samples between frame starts
+
+    Returns:
+        Read-only (num_frames x frame_length) view
+    """
+    audio = np.ascontiguousarray(audio, dtype=np.float64)
+    if len(audio) < frame_length:
+        return np.empty((0, frame_length))
+    return np.lib.stride_tricks.sliding_window_view(audio, frame_length)[::hop_length]
+
+
+def levinson_durbin(autocorr: np.ndarray, order: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Solve the LPC normal equations for many frames at once.
+
+    Algorithm:
+    Levinson-Durbin recursion, vectorized across frames: each of the
+    `order` steps updates the coefficients of every frame with one set of
+    array operations.
+
+    Args:
+        autocorr: (num_frames x order+1) autocorrelation lags 0..order
+        order: LPC order
+
+    Returns:
+        (coefficients, prediction_error): coefficients is (num_frames x order+1)
+        with a[:, 0] == 1, so that the prediction filter is A(z) = sum(a_k z^-k)
+    """
+    num_frames = autocorr.shape[0]
+    coeffs = np.zeros((num_frames, order + 1))
+    coeffs[:, 0] = 1.0
+    error = autocorr[:, 0].copy()
+
+    for i in range(1, order + 1):
+        # Reflection coefficient for step i
+        acc = autocorr[:, i] + np.einsum("fj,fj->f", coeffs[:, 1:i], autocorr[:, i - 1:0:-1])
+        k = -acc / error
+        coeffs[:, 1:i] += k[:, None] * coeffs[:, i - 1:0:-1]
+        coeffs[:, i] = k
+        error *= 1.0 - k * k
+
+    return coeffs, error
+
+
+def lpc_roots(coeffs: np.ndarray) -> np.ndarray:
+    """
+    Roots of every frame's prediction polynomial.
+
+    Eigenvalues of the batched companion matrices, so all frames are solved
+    in a single LAPACK call.
+
+    Args:
+        coeffs: (num_frames x order+1) LPC coefficients with a[:, 0] == 1
+
+    Returns:
+        (num_frames x order) complex roots
+    """
+    num_frames, order = coeffs.shape[0], coeffs.shape[1] - 1
+    companion = np.zeros((num_frames, order, order))
+    companion[:, 0, :] = -coeffs[:, 1:]
+    companion[:, np.arange(1, order), np.arange(order - 1)] = 1.0
+    return np.linalg.eigvals(companion)
+
+
+def voiced_frame_mask(frames: np.ndarray) -> np.ndarray:
+    """
+    Flag frames that carry voiced speech (enough energy, low zero-crossing rate).
+
+    Args:
+        frames: (num_frames x frame_length) raw frames
+
+    Returns:
+        Boolean mask per frame
+    """
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return (energy > energy.max() * VOICED_ENERGY_RATIO) & (zcr < VOICED_MAX_ZCR) & (energy > 0)
+
+
+def extract_formants(
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    order: Optional[int] = None
+) -> Dict:
+    """
+    Estimate F1/F2/F3 tracks on the voiced frames of a clip.
+
+    Workflow:
+    1. Frame the signal (25 ms windows, 10 ms hop) and keep voiced frames
+    2. Framewise pre-emphasis and Hamming window
+    3. Autocorrelation of all frames via one batched FFT
+    4. Batched Levinson-Durbin -> LPC coefficients
+    5. Batched root finding; poles above 90 Hz with narrow bandwidth are
+       formant candidates, the lowest three per frame are F1-F3
+
+    Args:
+        audio: Audio signal (mono)
+        sample_rate: Sample rate in Hz
+        order: LPC order (defaults to 2 + sample_rate / 1000)
+
+    Returns:
+        Dictionary with frame times and f1/f2/f3 tracks (NaN where a
+        formant was not found)
+    """
+    frame_length = int(FORMANT_FRAME_LENGTH * sample_rate)
+    hop_length = int(FORMANT_HOP_LENGTH * sample_rate)
+    if order is None:
+        order = 2 + sample_rate // 1000
+
+    # Step 1: Frame and keep voiced frames only
+    frames = frame_signal(audio, frame_length, hop_length)
+    voiced = np.flatnonzero(voiced_frame_mask(frames))
+    times = voiced * (hop_length / sample_rate)
+    frames = frames[voiced]
+    if len(frames) == 0:
+        empty = np.empty(0)
+        return {"times": empty, "f1": empty, "f2": empty, "f3": empty}
+
+    # Step 2: Framewise pre-emphasis and window
+    emphasized = np.empty_like(frames)
+    emphasized[:, 0] = frames[:, 0]
+    emphasized[:, 1:] = frames[:, 1:] - PRE_EMPHASIS * frames[:, :-1]
+    emphasized *= np.hamming(frame_length)
+
+    # Step 3: Autocorrelation (zero-padded FFT avoids circular wrap-around)
+    n_fft = 1 << int(np.ceil(np.log2(2 * frame_length - 1)))
+    spectrum = np.fft.rfft(emphasized, n=n_fft, axis=1)
+    autocorr = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=n_fft, axis=1)[:, :order + 1]
+    autocorr[:, 0] *= 1.0 + 1e-9  # Tiny white-noise floor keeps the recursion stable
+
+    # Step 4: LPC coefficients
+    coeffs, _ = levinson_durbin(autocorr, order)
+
+    # Step 5: Poles -> frequencies and bandwidths
+    roots = lpc_roots(coeffs)
+    frequencies = np.angle(roots) * (sample_rate / (2 * np.pi))
+    bandwidths = -np.log(np.maximum(np.abs(roots), 1e-12)) * (sample_rate / np.pi)
+    candidate = (
+        (roots.imag > 0)
+        & (frequencies > MIN_FORMANT_FREQUENCY)
+        & (bandwidths < MAX_FORMANT_BANDWIDTH)
+    )
+    candidates = np.sort(np.where(candidate, frequencies, np.inf), axis=1)[:, :NUM_FORMANTS]
+    candidates[np.isinf(candidates)] = np.nan
+
+    return {
+        "times": times,
+        "f1": candidates[:, 0],
+        "f2": candidates[:, 1],
+        "f3": candidates[:, 2],
+    }
+
+
+def summarize_formants(tracks: Dict) -> Optional[Dict]:
+    """
+    Compact per-clip summary of formant tracks for storage.
+
+    Args:
+        tracks: Output of extract_formants
+
+    Returns:
+        {"voiced_frames": n, "f1": {"mean", "median", "std"}, ...} with values
+        in Hz, or None if no voiced frames were found
+    """
+    voiced_frames = len(tracks["times"])
+    if voiced_frames == 0:
+        return None
+
+    summary = {"voiced_frames": voiced_frames}
+    for name in ("f1", "f2", "f3"):
+        track = tracks[name][~np.isnan(tracks[name])]
+        if len(track) == 0:
+            summary[name] = None
+            continue
+        summary[name] = {
+            "mean": round(float(np.mean(track)), 1),
+            "median": round(float(np.median(track)), 1),
+            "std": round(float(np.std(track)), 1),
+        }
+    return summary
@@ -0,0 +1,165 @@
+#backend\src\utils\frame_features.py
+"""
+Per-frame visual features for video analysis.
+
+Runs in the video frame process pool, so it only depends on NumPy and
+(optionally) OpenCV. A batch is a (frames x height x width) uint8 stack of
+consecutive sampled grayscale frames; everything that can be computed on
+the whole stack at once is (motion energy, brightness), only face
+detection runs per frame.
+
+A batch may be oversampled for lip motion: faces are then only detected
+on every `detect_every`-th frame (the engagement grid) and their boxes
+reused for the frames in between.
+
+Features per engagement frame (frames[::detect_every]):
+- motion: mean absolute difference to the previous engagement frame (0-255)
+- brightness: mean intensity
+- faces: number of frontal faces found
+- face_box: largest face as (x, y, w, h), NaN without a face
+
+Per frame:
+- mouth_motion: frame difference inside the mouth region of the face box
+  minus that of the upper face (head movement), NaN without a face
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+try:
+    import cv2
+    # Haar cascades are not part of OpenCV 5 builds
+    HAS_FACE_DETECTOR = hasattr(cv2, "CascadeClassifier")
+except ImportError:
+    HAS_FACE_DETECTOR = False
+
+# Smallest face searched for, relative to the shorter frame side
+MIN_FACE_RATIO = 0.12
+
+# Regions relative to the face box (x range, y range as fractions of w / h)
+MOUTH_REGION = ((0.25, 0.75), (0.65, 0.95))
+UPPER_FACE_REGION = ((0.2, 0.8), (0.15, 0.45))
+
+_face_cascade = None
+
+
+def _get_face_cascade():
+    """Haar cascade, loaded once per worker process."""
+    global _face_cascade
+    if _face_cascade is None:
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    return _face_cascade
+
+
+def detect_faces(frame: np.ndarray):
+    """Frontal face boxes (x, y, w, h) in one grayscale frame."""
+    if not HAS_FACE_DETECTOR:
+        return []
+    min_side = max(12, int(min(frame.shape) * MIN_FACE_RATIO))
+    faces = _get_face_cascade().detectMultiScale(frame, scaleFactor=1.15, minNeighbors=4, minSize=(min_side, min_side))
+    return [tuple(int(v) for v in face) for face in faces]
+
+
+def motion_energy(frames: np.ndarray, previous: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Mean absolute frame difference per frame, vectorized over the stack.
+
+    Args:
+        frames: (n, h, w) uint8 stack
+        previous: Frame before the stack (continuity across batches);
+                  without it the first frame has zero motion
+
+    Returns:
+        (n,) float array
+    """
+    stack = frames.astype(np.int16)
+    if previous is not None:
+        stack = np.concatenate([previous[None].astype(np.int16), stack])
+        return np.abs(np.diff(stack, axis=0)).mean(axis=(1, 2))
+    motion = np.zeros(len(frames))
+    if len(frames) > 1:
+        motion[1:] = np.abs(np.diff(stack, axis=0)).mean(axis=(1, 2))
+    return motion
+
+
+def mouth_motion(frames: np.ndarray, boxes: np.ndarray, previous: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Lip motion per frame, vectorized over the stack.
+
+    The absolute frame differences of the whole stack are turned into one
+    summed-area table, so the mean difference inside any box is four
+    lookups; the mouth and upper-face means of all frames are gathered at
+    once. Subtracting the upper-face motion removes most head movement.
+
+    Args:
+        frames: (n, h, w) uint8 stack
+        boxes: (n, 4) face box per frame (NaN rows: no face)
+        previous: Frame before the stack (the first frame has no motion without it)
+
+    Returns:
+        (n,) float array, NaN where there is no face
+    """
+    n, height, width = frames.shape
+    result = np.full(n, np.nan)
+    rows = np.flatnonzero(~np.isnan(boxes[:, 0]))
+    if not len(rows):
+        return result
+
+    stack = frames.astype(np.int16)
+    before = previous[None].astype(np.int16) if previous is not None else stack[:1]
+    diff = np.abs(np.diff(np.concatenate([before, stack]), axis=0)).astype(np.int32)
+    table = np.zeros((n, height + 1, width + 1), dtype=np.int32)  # 255 * w * h fits
+    table[:, 1:, 1:] = diff.cumsum(axis=1).cumsum(axis=2)
+
+    x, y, w, h = boxes[rows].T
+
+    def region_mean(region):
+        (left, right), (top, bottom) = region
+        x0 = np.clip(x + left * w, 0, width).astype(int)
+        x1 = np.clip(x + right * w, 0, width).astype(int)
+        y0 = np.clip(y + top * h, 0, height).astype(int)
+        y1 = np.clip(y + bottom * h, 0, height).astype(int)
+        total = table[rows, y1, x1] - table[rows, y0, x1] - table[rows, y1, x0] + table[rows, y0, x0]
+        return total / np.maximum((x1 - x0) * (y1 - y0), 1)
+
+    result[rows] = np.maximum(region_mean(MOUTH_REGION) - region_mean(UPPER_FACE_REGION), 0.0)
+    return result
+
+
+def analyze_frame_batch(
+    frames: np.ndarray,
+    previous: Optional[np.ndarray] = None,
+    detect_every: int = 1
+) -> Dict[str, np.ndarray]:
+    """
+    Features for a batch of consecutive sampled frames (process pool task).
+
+    Args:
+        frames: (n, h, w) uint8 grayscale stack
+        previous: The preceding batch's last `detect_every` frames
+        detect_every: Oversampling factor; faces are detected on
+                      frames[::detect_every] only
+
+    Returns:
+        Dict of engagement-frame arrays (motion, brightness, faces,
+        face_box (m x 4)) and the per-frame mouth_motion array
+    """
+    engagement = frames[::detect_every]
+    face_counts = np.zeros(len(engagement), dtype=np.int32)
+    face_boxes = np.full((len(engagement), 4), np.nan)
+    for i, frame in enumerate(engagement):
+        faces = detect_faces(frame)
+        face_counts[i] = len(faces)
+        if faces:
+            face_boxes[i] = max(faces, key=lambda box: box[2] * box[3])
+
+    # Frames between detections keep the last detected box
+    frame_boxes = np.repeat(face_boxes, detect_every, axis=0)[:len(frames)]
+    return {
+        "motion": motion_energy(engagement, previous[0] if previous is not None else None),
+        "brightness": engagement.mean(axis=(1, 2)),
+        "faces": face_counts,
+        "face_box": face_boxes,
+        "mouth_motion": mouth_motion(frames, frame_boxes, previous[-1] if previous is not None else None),
+    }
@@ -0,0 +1,159 @@
+"""
+backend/src/utils/grapheme_segmenter.py
+
+Akshara / grapheme-cluster segmentation for scoring units.
+
+Iterating code points splits Indic syllables apart: a Tamil vowel sign or
+pulli (virama) becomes its own "phoneme". This module segments text into
+the units a therapist would point at instead:
+
+- Devanagari, Telugu, Kannada (and other Brahmic scripts): consonant
+  clusters joined by a virama form one conjunct akshara together with
+  their vowel sign and modifiers (e.g. "स्ते").
+- Tamil: the pulli ends the unit, so "ம்" and "மா" stay separate, matching
+  how Tamil letters are taught.
+- Everything else: a base character plus any combining marks.
+
+Algorithm:
+1. A class table over Unicode properties (built once at import) maps each
+   code point to a one-letter class; str.translate applies it in C
+2. A regex compiled once over the class string finds cluster spans
+3. Results are memoized per string
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Tuple
+
+from src.utils.metrics import register_cache
+
+SEGMENT_CACHE_SIZE = 4096
+
+# Character classes
+CONSONANT = "C"         # Consonant that forms conjuncts across a virama
+TAMIL_CONSONANT = "T"   # Tamil consonant; the pulli closes the unit
+VIRAMA = "V"
+MARK = "M"              # Vowel signs, nukta, anusvara, visarga, combining marks
+JOINER = "J"            # ZWJ / ZWNJ
+VOWEL = "I"             # Independent vowel
+SPACE = "S"
+OTHER = "O"
+
+_BRAHMIC_RANGE = range(0x0900, 0x0E00)
+_TAMIL_BLOCK = range(0x0B80, 0x0C00)
+# Block offsets of independent vowels in the shared ISCII-derived layout
+_VOWEL_OFFSETS = set(range(0x04, 0x15)) | {0x60, 0x61}
+
+
+def _classify(code_point: int) -> str:
+    char = chr(code_point)
+    category = unicodedata.category(char)
+    if char.isspace():
+        return SPACE
+    if code_point in (0x200C, 0x200D):
+        return JOINER
+    if unicodedata.combining(char) == 9:
+        return VIRAMA
+    if category in ("Mn", "Mc", "Me"):
+        return MARK
+    if code_point in _BRAHMIC_RANGE and category == "Lo":
+        if (code_point & 0x7F) in _VOWEL_OFFSETS:
+            return VOWEL
+        return TAMIL_CONSONANT if code_point in _TAMIL_BLOCK else CONSONANT
+    return OTHER
+
+
+def _build_class_table() -> dict:
+    table = {}
+    for code_point in list(range(0x80)) + list(range(0x0300, 0x0370)) + list(_BRAHMIC_RANGE) + [0x200C, 0x200D]:
+        table[code_point] = _classify(code_point)
+    # Other combining marks (not in the ranges above) are found lazily
+    return table
+
+
+_CLASS_TABLE = _build_class_table()
+_CLASS_LETTERS = set("CTVMJIS")
+
+# One alternative per unit shape, tried in order
+_CLUSTER_PATTERN = re.compile(
+    r"C M*(?:V J? C M*)* (?:V J?)? M*"   # Brahmic conjunct akshara
+    r"|T M* V? M*"                       # Tamil letter (pulli ends it)
+    r"|I M*"                             # Independent vowel
+    r"|[VMJ]+"                           # Stray signs at the start of text
+    r"|[^CTVMJIS] M*",                   # Base character + combining marks
+    re.VERBOSE,
+)
+
+
+def _class_string(text: str) -> str:
+    classes = text.translate(_CLASS_TABLE)
+    # Characters outside the table keep their own value; classify the
+    # ones that would collide with a class letter or are combining marks
+    if not _CLASS_LETTERS.issuperset(classes):
+        classes = "".join(
+            c if c in _CLASS_LETTERS else (MARK if unicodedata.combining(c) else OTHER)
+            for c in classes
+        )
+    return classes
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def segment_spans(text: str) -> Tuple[Tuple[int, int], ...]:
+    """
+    Find grapheme-cluster spans, skipping whitespace.
+
+    Args:
+        text: Text to segment
+
+    Returns:
+        Tuple of (start, end) character offsets, one per cluster
+    """
+    classes = _class_string(text)
+    return tuple(
+        match.span()
+        for match in _CLUSTER_PATTERN.finditer(classes)
+        if match.group()[0] != SPACE
+    )
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def segment(text: str) -> Tuple[str, ...]:
+    """
+    Split text into scoring units (aksharas / grapheme clusters).
+
+    Args:
+        text: Text to segment
+
+    Returns:
+        Tuple of cluster strings, whitespace removed
+    """
+    return tuple(text[start:end] for start, end in segment_spans(text))
+
+
+def is_scorable(unit: str) -> bool:
+    """Whether a unit carries a letter or digit (punctuation is skipped)."""
+    return unit[:1].isalnum()
+
+
+def group_scores(text: str, position_scores: List[float]) -> List[Tuple[str, float]]:
+    """
+    Average per-character scores over the clusters of `text`.
+
+    Args:
+        text: Text the scores were computed for
+        position_scores: One score per character of `text`
+
+    Returns:
+        List of (unit, mean score) for every scorable unit
+    """
+    units = []
+    for start, end in segment_spans(text):
+        unit = text[start:end]
+        if is_scorable(unit):
+            units.append((unit, sum(position_scores[start:end]) / (end - start)))
+    return units
+
+
+register_cache("grapheme_spans", segment_spans.cache_info)
+register_cache("grapheme_units", segment.cache_info)
@@ -0,0 +1,314 @@
+"""
+backend/src/utils/phonetic_costs.py
+
+Per-language phonetic substitution-cost tables.
+
+Each table maps the characters a language is scored on to dense token ids
+and holds a (V x V) matrix of substitution costs between 0.0 (same sound)
+and 1.0 (unrelated). Tables are built once at import, so scoring a
+substitution is a single array lookup and the alignment engine can read a
+whole block of costs with fancy indexing.
+
+Coverage follows `LanguageCode`:
+- en: English letters
+- ta: Tamil, scored on its ITRANS transliteration (plus the Tamil block
+  as a fallback when transliteration is unavailable)
+- hi / te / kn: Devanagari, Telugu and Kannada blocks
+
+The Indic blocks share the ISCII-derived Unicode layout, so one feature
+table over block offsets describes all of them.
+"""
+
+import string
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.alignment import AlignmentEngine
+
+# Cost of substituting two sounds with no phonetic relation
+UNRELATED_COST = 0.6
+# Cost of substituting a vowel for a consonant (or vice versa)
+CLASS_MISMATCH_COST = 0.8
+# Substitutions at or below this cost are treated as correct productions
+ACCEPTABLE_SUBSTITUTION_COST = 0.1
+
+# Id 0 is the cost-matrix row/column for characters outside a table's
+# inventory; encode() gives them the negated code point so two unknown
+# characters can still be told apart (equal ones cost 0, others 1)
+UNKNOWN_TOKEN_ID = 0
+
+LANGUAGE_ALIASES = {
+    "english": "en",
+    "tamil": "ta",
+    "hindi": "hi",
+    "telugu": "te",
+    "kannada": "kn",
+}
+
+# --- Latin-script (English and ITRANS) pair costs -------------------------
+
+_LATIN_VOWELS = set("aeiou")
+
+_ENGLISH_PAIR_COSTS = {
+    # Voicing pairs
+    ("p", "b"): 0.25, ("t", "d"): 0.25, ("k", "g"): 0.25,
+    ("s", "z"): 0.25, ("f", "v"): 0.25,
+    # Nasals
+    ("m", "n"): 0.25,
+    # Spelling variants of the same sound
+    ("c", "k"): 0.1, ("q", "k"): 0.1, ("c", "q"): 0.1, ("c", "s"): 0.2,
+    ("x", "z"): 0.35, ("j", "g"): 0.3,
+    # Common developmental substitutions
+    ("r", "w"): 0.3, ("l", "w"): 0.4, ("r", "l"): 0.35, ("v", "w"): 0.35,
+    ("s", "t"): 0.45, ("k", "t"): 0.45, ("g", "d"): 0.45,
+    ("f", "p"): 0.45, ("v", "b"): 0.45, ("s", "f"): 0.45,
+    # Glides and vowels
+    ("y", "i"): 0.2, ("w", "u"): 0.3, ("y", "j"): 0.45,
+    # Vowel neighbours
+    ("i", "e"): 0.25, ("o", "u"): 0.25, ("a", "e"): 0.25,
+    ("a", "o"): 0.35, ("a", "u"): 0.4,
+}
+
+# Tamil has no phonemic voicing or aspiration contrast, and ITRANS is
+# lowercased during normalization, so ழ (zh), ள (L) and ல (l) collapse
+# onto z/l and ற (R) onto r.
+_TAMIL_ITRANS_PAIR_COSTS = dict(_ENGLISH_PAIR_COSTS)
+_TAMIL_ITRANS_PAIR_COSTS.update({
+    ("p", "b"): 0.05, ("t", "d"): 0.05, ("k", "g"): 0.05, ("k", "h"): 0.15,
+    ("c", "s"): 0.1, ("c", "j"): 0.1, ("s", "j"): 0.15, ("s", "h"): 0.3,
+    ("z", "l"): 0.2, ("z", "r"): 0.3, ("r", "l"): 0.3,
+    ("m", "n"): 0.3, ("y", "i"): 0.15, ("v", "w"): 0.05, ("v", "b"): 0.3,
+})
+
+
+def _latin_cost(a: str, b: str, pair_costs: Dict[Tuple[str, str], float]) -> float:
+    if a == b:
+        return 0.0
+    if (a, b) in pair_costs:
+        return pair_costs[(a, b)]
+    if (b, a) in pair_costs:
+        return pair_costs[(b, a)]
+    if a.isdigit() or b.isdigit():
+        return 1.0
+    a_vowel, b_vowel = a in _LATIN_VOWELS, b in _LATIN_VOWELS
+    if a_vowel and b_vowel:
+        return 0.45
+    if a_vowel != b_vowel:
+        return CLASS_MISMATCH_COST
+    return UNRELATED_COST
+
+
+# --- Brahmic block features -----------------------------------------------
+# Block offsets shared by Devanagari (U+0900), Tamil (U+0B80),
+# Telugu (U+0C00) and Kannada (U+0C80).
+
+BLOCK_STARTS = {
+    "hi": 0x0900,
+    "ta": 0x0B80,
+    "te": 0x0C00,
+    "kn": 0x0C80,
+}
+
+# Vowel qualities: independent vowel offsets and their dependent signs
+_VOWEL_QUALITY = {
+    0x05: ("a", 0), 0x06: ("a", 1), 0x3E: ("a", 1),
+    0x07: ("i", 0), 0x3F: ("i", 0), 0x08: ("i", 1), 0x40: ("i", 1),
+    0x09: ("u", 0), 0x41: ("u", 0), 0x0A: ("u", 1), 0x42: ("u", 1),
+    0x0B: ("r", 0), 0x43: ("r", 0), 0x60: ("r", 1), 0x44: ("r", 1),
+    0x0C: ("l", 0), 0x62: ("l", 0),
+    0x0D: ("e", 0), 0x45: ("e", 0), 0x0E: ("e", 0), 0x46: ("e", 0),
+    0x0F: ("e", 1), 0x47: ("e", 1), 0x10: ("ai", 1), 0x48: ("ai", 1),
+    0x11: ("o", 0), 0x49: ("o", 0), 0x12: ("o", 0), 0x4A: ("o", 0),
+    0x13: ("o", 1), 0x4B: ("o", 1), 0x14: ("au", 1), 0x4C: ("au", 1),
+}
+_DEPENDENT_SIGNS = set(range(0x3E, 0x4D)) | {0x62, 0x63}
+_NEAR_VOWELS = {
+    frozenset(("a", "e")), frozenset(("i", "e")), frozenset(("u", "o")),
+    frozenset(("ai", "e")), frozenset(("au", "o")), frozenset(("r", "i")),
+}
+
+# Stop/nasal grid: place row x manner column
+# manner: 0 voiceless, 1 voiceless aspirated, 2 voiced, 3 voiced aspirated, 4 nasal
+_PLACES = ("velar", "palatal", "retroflex", "dental", "labial")
+_STOPS = {}
+for _place_idx, _row_start in enumerate((0x15, 0x1A, 0x1F, 0x24, 0x2A)):
+    for _manner in range(5):
+        _STOPS[_row_start + _manner] = (_place_idx, _manner)
+_STOPS[0x29] = (3, 4)  # Tamil alveolar NNNA, scored as a dental nasal
+
+_SIBILANTS = {0x36, 0x37, 0x38}
+_RHOTICS = {0x30, 0x31}
+_LATERALS = {0x32, 0x33, 0x34}
+_GLIDES = {0x2F, 0x35}
+_H = 0x39
+_NASAL_MODIFIERS = {0x01, 0x02}
+_VISARGA = 0x03
+_VIRAMA = 0x4D
+_NUKTA = 0x3C
+
+
+def _stop_cost(a: Tuple[int, int], b: Tuple[int, int]) -> float:
+    (place_a, manner_a), (place_b, manner_b) = a, b
+    nasal_a, nasal_b = manner_a == 4, manner_b == 4
+    if nasal_a and nasal_b:
+        return 0.3
+    if nasal_a != nasal_b:
+        return 0.5 if place_a == place_b else UNRELATED_COST
+    voiced_a, voiced_b = manner_a >= 2, manner_b >= 2
+    aspirated_a, aspirated_b = manner_a in (1, 3), manner_b in (1, 3)
+    feature_diffs = (voiced_a != voiced_b) * 0.25 + (aspirated_a != aspirated_b) * 0.15
+    if place_a == place_b:
+        return min(feature_diffs, 0.35)
+    # Retroflex/dental confusion is the most common place error
+    if {place_a, place_b} == {2, 3}:
+        return min(0.2 + feature_diffs, 0.45)
+    return min(0.45 + feature_diffs, UNRELATED_COST)
+
+
+def _brahmic_cost(a: int, b: int) -> float:
+    """Substitution cost between two block offsets of the same script."""
+    if a == b:
+        return 0.0
+    if a in _VOWEL_QUALITY and b in _VOWEL_QUALITY:
+        quality_a, long_a = _VOWEL_QUALITY[a]
+        quality_b, long_b = _VOWEL_QUALITY[b]
+        if quality_a == quality_b:
+            if long_a == long_b:
+                # Same vowel written as a letter vs a sign, or candra/short forms
+                return 0.05
+            return 0.15
+        if frozenset((quality_a, quality_b)) in _NEAR_VOWELS:
+            return 0.3
+        return 0.45
+    if a in _STOPS and b in _STOPS:
+        return _stop_cost(_STOPS[a], _STOPS[b])
+    for group, cost in ((_SIBILANTS, 0.2), (_RHOTICS, 0.15), (_LATERALS, 0.15)):
+        if a in group and b in group:
+            return cost
+    pair = {a, b}
+    if pair & _RHOTICS and pair & _LATERALS:
+        # ழ (llla) sits between r and l
+        return 0.2 if 0x34 in pair else 0.35
+    if pair <= _GLIDES:
+        return 0.45
+    if pair & _SIBILANTS and (pair & {0x1A, 0x1B, 0x1C}):
+        return 0.35
+    if pair & _NASAL_MODIFIERS:
+        # Anusvara/candrabindu against each other or a nasal consonant
+        other = next(iter(pair - _NASAL_MODIFIERS), None)
+        if other is None or _STOPS.get(other, (None, None))[1] == 4:
+            return 0.2
+    if _H in pair and _VISARGA in pair:
+        return 0.2
+    if _VIRAMA in pair or _NUKTA in pair:
+        return 0.5
+    vowel_a = a in _VOWEL_QUALITY or a in _DEPENDENT_SIGNS
+    vowel_b = b in _VOWEL_QUALITY or b in _DEPENDENT_SIGNS
+    if vowel_a != vowel_b:
+        return CLASS_MISMATCH_COST
+    return UNRELATED_COST
+
+
+def _build_block_costs() -> np.ndarray:
+    """Cost matrix over the 128 block offsets, shared by every Indic script."""
+    block = np.zeros((0x80, 0x80), dtype=np.float64)
+    for a in range(0x80):
+        for b in range(a + 1, 0x80):
+            block[a, b] = block[b, a] = _brahmic_cost(a, b)
+    return block
+
+
+_BRAHMIC_BLOCK_COSTS = _build_block_costs()
+
+
+# --- Tables ---------------------------------------------------------------
+
+_LATIN_TOKENS = string.ascii_lowercase + string.digits + " "
+
+
+class PhoneticCostTable:
+    """
+    Dense substitution-cost table for one language.
+
+    Attributes:
+        language: LanguageCode value ("en", "ta", ...)
+        tokens: Token inventory; position i + 1 is the token id
+        costs: (V x V) substitution costs indexed by token id
+        engine: AlignmentEngine using this table
+    """
+
+    def __init__(self, language: str, latin_pair_costs: Dict[Tuple[str, str], float], block_start: Optional[int] = None):
+        self.language = language
+        tokens: List[str] = list(_LATIN_TOKENS)
+        if block_start is not None:
+            tokens.extend(chr(block_start + offset) for offset in range(0x80))
+        self.tokens = tokens
+
+        # Code point -> token id lookup (uppercase Latin shares the lowercase id)
+        size = max(ord(t) for t in tokens) + 1
+        self._lookup = np.zeros(size, dtype=np.int64)
+        for token_id, token in enumerate(tokens, start=1):
+            self._lookup[ord(token)] = token_id
+        for letter in string.ascii_uppercase:
+            self._lookup[ord(letter)] = self._lookup[ord(letter.lower())]
+
+        vocab = len(tokens) + 1
+        costs = np.ones((vocab, vocab), dtype=np.float64)
+        n_latin = len(_LATIN_TOKENS)
+        for i, a in enumerate(_LATIN_TOKENS, start=1):
+            for j, b in enumerate(_LATIN_TOKENS, start=1):
+                if a == " " or b == " ":
+                    costs[i, j] = 0.0 if a == b else 1.0
+                else:
+                    costs[i, j] = _latin_cost(a, b, latin_pair_costs)
+        if block_start is not None:
+            costs[n_latin + 1:, n_latin + 1:] = _BRAHMIC_BLOCK_COSTS
+        # Unknown vs. unknown is decided by code point (AlignmentEngine)
+        costs[UNKNOWN_TOKEN_ID, :] = 1.0
+        costs[:, UNKNOWN_TOKEN_ID] = 1.0
+        costs.setflags(write=False)
+        self.costs = costs
+
+        self.engine = AlignmentEngine(substitution_costs=costs, encoder=self.encode)
+
+    def encode(self, text: str) -> np.ndarray:
+        """Map a string to token ids (unknown characters map to their negated code point)."""
+        code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+        in_range = code_points < len(self._lookup)
+        ids = -code_points
+        ids[in_range] = self._lookup[code_points[in_range]]
+        unknown = ids == UNKNOWN_TOKEN_ID
+        ids[unknown] = -code_points[unknown]
+        return ids
+
+    def cost(self, a: str, b: str) -> float:
+        """Substitution cost between two single characters."""
+        return float(self.engine.substitution_matrix(self.encode(a)[:1], self.encode(b)[:1])[0, 0])
+
+    def credit(self, a: str, b: str) -> float:
+        """Partial credit (1.0 = same sound) for producing `b` in place of `a`."""
+        return 1.0 - self.cost(a, b)
+
+
+COST_TABLES: Dict[str, PhoneticCostTable] = {
+    "en": PhoneticCostTable("en", _ENGLISH_PAIR_COSTS),
+    "ta": PhoneticCostTable("ta", _TAMIL_ITRANS_PAIR_COSTS, BLOCK_STARTS["ta"]),
+    "hi": PhoneticCostTable("hi", _ENGLISH_PAIR_COSTS, BLOCK_STARTS["hi"]),
+    "te": PhoneticCostTable("te", _ENGLISH_PAIR_COSTS, BLOCK_STARTS["te"]),
+    "kn": PhoneticCostTable("kn", _ENGLISH_PAIR_COSTS, BLOCK_STARTS["kn"]),
+}
+
+
+def resolve_language(language: Optional[str]) -> str:
+    """
+    Resolve a language code, name or LanguageCode to a table key.
+    Unknown languages fall back to English.
+    """
+    key = getattr(language, "value", language) or "en"
+    key = LANGUAGE_ALIASES.get(key.lower(), key.lower())
+    return key if key in COST_TABLES else "en"
+
+
+def get_cost_table(language: Optional[str]) -> PhoneticCostTable:
+    """Look up the cost table for a language code or name."""
+    return COST_TABLES[resolve_language(language)]
@@ -0,0 +1,382 @@
+"""
+backend/src/utils/profiler.py
+
+On-demand profiling of single requests.
+
+A request is profiled when it carries a valid signed X-Profile header
+(minted for admins by POST /api/admin/profiles/token) or is picked by
+PROFILE_SAMPLE_RATE. The profile is written to PROFILE_DIR under the
+request id and downloaded through the admin endpoint, so a slow request
+in production can be diagnosed without a redeploy or restart.
+
+A header is bound to the admin who minted it (it only triggers on
+requests authenticated as that admin) and carries a nonce, so it
+profiles a single request. Nonces are remembered per process until they
+expire.
+
+Two modes:
+- "sample": a background thread snapshots every thread's Python stack
+  every PROFILE_SAMPLE_INTERVAL seconds, so event loop, executor and
+  pipeline branch threads are all covered; time inside torch / librosa C
+  code is attributed to the Python frame that called it. Output is the
+  collapsed-stack format read by flamegraph.pl and speedscope. Other
+  requests running at the same time show up too; idle threads do not.
+- "cprofile": deterministic cProfile of the request's event-loop thread
+  plus every analysis task it hands to the executor and the pipeline
+  branch pool (see profiled()). Output is a pstats file (snakeviz,
+  `python -m pstats`). Much higher overhead than sampling. Up to Python
+  3.11 each thread gets its own profiler; from 3.12 on cProfile runs on
+  sys.monitoring, which is interpreter-wide, so the session's one
+  profiler covers all threads (and other requests running meanwhile).
+  When another tool holds the profiling hook, the thread is simply not
+  profiled: profiling never fails a request.
+"""
+
+import cProfile
+import contextvars
+import hashlib
+import hmac
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from src.config import settings
+
+MODES = ("sample", "cprofile")
+PROFILE_HEADER = "x-profile"
+REQUEST_ID_HEADER = "x-request-id"
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_EXTENSIONS = {"sample": ".folded", "cprofile": ".prof"}
+
+# Waiting frames: a thread blocked in these on behalf of a pool worker
+# loop or the event loop's selector is idle, not working for a request
+_WAIT_FILES = ("threading.py", "queue.py")
+
+_current: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar("profile_session", default=None)
+
+# One cProfile session at a time: the event loop thread is shared, and from
+# Python 3.12 on only one profiler can be active in the whole interpreter
+_loop_profiler_lock = threading.Lock()
+_INTERPRETER_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+
+def _enabled_profile() -> Optional[cProfile.Profile]:
+    """A running cProfile.Profile, or None if another profiler holds the hook."""
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError as e:
+        # "Another profiling tool is already active" (debugger, coverage, ...)
+        print(f"⚠️ cProfile unavailable, thread not profiled: {e}")
+        return None
+    return profile
+
+
+# ===== Signed trigger header =====
+
+_used_nonces: Dict[str, int] = {}
+_nonce_lock = threading.Lock()
+
+
+def _signature(mode: str, expires: int, nonce: str, subject: str) -> str:
+    message = f"{mode}:{expires}:{nonce}:{subject}".encode("utf-8")
+    return hmac.new(settings.PROFILING_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def sign_profile_header(subject: str, mode: str = "sample", ttl_seconds: int = 300) -> str:
+    """
+    Single-use X-Profile header value valid for `ttl_seconds`.
+
+    Args:
+        subject: Token subject (email) of the admin who sends the request
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode {mode!r}")
+    if not settings.PROFILING_SECRET:
+        raise ValueError("PROFILING_SECRET is not configured")
+    expires = int(time.time()) + ttl_seconds
+    nonce = uuid.uuid4().hex
+    return f"{mode}:{expires}:{nonce}:{_signature(mode, expires, nonce, subject)}"
+
+
+def verify_profile_header(value: str, subject: Optional[str]) -> Optional[str]:
+    """
+    Profile mode for a valid, unexpired, unused header value sent by
+    `subject` (the request's authenticated user), else None.
+    """
+    if not settings.PROFILING_SECRET or not subject:
+        return None
+    try:
+        mode, expires, nonce, signature = value.split(":")
+        expires = int(expires)
+    except ValueError:
+        return None
+    now = time.time()
+    if mode not in MODES or expires < now:
+        return None
+    if not hmac.compare_digest(signature, _signature(mode, expires, nonce, subject)):
+        return None
+    with _nonce_lock:
+        for used, used_expires in list(_used_nonces.items()):
+            if used_expires < now:
+                del _used_nonces[used]
+        if nonce in _used_nonces:
+            return None
+        _used_nonces[nonce] = expires
+    return mode
+
+
+def request_id_from(value: Optional[str]) -> str:
+    """
+    Profile id of a request: the client's X-Request-ID (when safe as a
+    file name) with a server-generated suffix, so a client can never name
+    an existing profile.
+    """
+    suffix = uuid.uuid4().hex
+    if value and _REQUEST_ID.match(value):
+        return f"{value[:55]}-{suffix[:8]}"
+    return suffix
+
+
+# ===== Sampling =====
+
+def _is_idle(frame) -> bool:
+    """Pool worker waiting for a task or event loop waiting in select()."""
+    while frame is not None:
+        filename = os.path.basename(frame.f_code.co_filename)
+        if filename == "selectors.py":
+            return True
+        if filename not in _WAIT_FILES:
+            return filename == "thread.py" and frame.f_code.co_name == "_worker"
+        frame = frame.f_back
+    return False
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of all threads on a background thread.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one "frame;frame;frame count" line each."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# ===== Sessions =====
+
+class ProfileSession:
+    """
+    Profile of one request; stored under its request id when finished.
+    """
+
+    def __init__(self, mode: str, request_id: str):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}")
+        self.mode = mode
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self._sampler: Optional[StackSampler] = None
+        self._loop_profile: Optional[cProfile.Profile] = None
+        self._profiles: List[cProfile.Profile] = []
+        self._threads_profiled = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.mode == "sample":
+            self._sampler = StackSampler(settings.PROFILE_SAMPLE_INTERVAL)
+            self._sampler.start()
+        elif _loop_profiler_lock.acquire(blocking=False):
+            self._loop_profile = _enabled_profile()
+            if self._loop_profile is None:
+                _loop_profiler_lock.release()
+            else:
+                self._threads_profiled += 1
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._loop_profile is not None:
+            self._loop_profile.disable()
+            self._add(self._loop_profile)
+            self._loop_profile = None
+            _loop_profiler_lock.release()
+
+    def _add(self, profile: cProfile.Profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def _count_thread(self):
+        with self._lock:
+            self._threads_profiled += 1
+
+    def run_profiled(self, fn: Callable, *args, **kwargs):
+        """Run fn on the current (worker) thread under this session."""
+        token = _current.set(self)
+        profile = None
+        if self.mode == "cprofile":
+            if _INTERPRETER_WIDE_CPROFILE:
+                # The session's profiler already records this thread
+                if self._loop_profile is not None:
+                    self._count_thread()
+            else:
+                profile = _enabled_profile()
+                if profile is not None:
+                    self._count_thread()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._add(profile)
+            _current.reset(token)
+
+    def save(self, metadata: Dict) -> Dict:
+        """
+        Write the profile and its metadata to PROFILE_DIR.
+
+        Returns:
+            The stored metadata
+        """
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        filename = self.request_id + _EXTENSIONS[self.mode]
+        path = os.path.join(settings.PROFILE_DIR, filename)
+
+        if self.mode == "sample":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._sampler.collapsed() if self._sampler else "")
+            extra = {"samples": self._sampler.samples if self._sampler else 0}
+        else:
+            with self._lock:
+                profiles = list(self._profiles)
+            if profiles:
+                stats = pstats.Stats(profiles[0])
+                for profile in profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(path)
+            else:
+                open(path, "wb").close()
+            extra = {"threads_profiled": self._threads_profiled}
+
+        metadata = {
+            "request_id": self.request_id,
+            "mode": self.mode,
+            "file": filename,
+            "duration_seconds": round(self.duration, 4),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **extra,
+            **metadata
+        }
+        with open(os.path.join(settings.PROFILE_DIR, self.request_id + ".json"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        prune_profiles(settings.PROFILE_MAX_STORED)
+        return metadata
+
+
+def activate(session: ProfileSession):
+    """Make `session` the profile of the current context (returns a reset token)."""
+    return _current.set(session)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Bind fn to the current request's profile before handing it to a thread.
+
+    Worker threads do not inherit the request's context, so callables
+    submitted to a pool are wrapped at submission time; without an active
+    session fn is returned unchanged.
+    """
+    session = _current.get()
+    if session is None:
+        return fn
+
+    def run(*args, **kwargs):
+        return session.run_profiled(fn, *args, **kwargs)
+    return run
+
+
+# ===== Storage =====
+
+def list_profiles() -> List[Dict]:
+    """Metadata of stored profiles, newest first."""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(settings.PROFILE_DIR):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(settings.PROFILE_DIR, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(profiles, key=lambda profile: profile.get("created_at", ""), reverse=True)
+
+
+def profile_path(request_id: str) -> Optional[str]:
+    """Path of the stored profile for `request_id` (None if unknown)."""
+    if not _REQUEST_ID.match(request_id):
+        return None
+    for extension in _EXTENSIONS.values():
+        path = os.path.join(settings.PROFILE_DIR, request_id + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def prune_profiles(keep: int):
+    """Delete all but the `keep` most recent profiles."""
+    metadata_files = sorted(
+        (os.path.join(settings.PROFILE_DIR, name) for name in os.listdir(settings.PROFILE_DIR) if name.endswith(".json")),
+        key=os.path.getmtime,
+        reverse=True
+    )
+    for metadata_path in metadata_files[keep:]:
+        stem = metadata_path[:-len(".json")]
+        for path in [metadata_path] + [stem + extension for extension in _EXTENSIONS.values()]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
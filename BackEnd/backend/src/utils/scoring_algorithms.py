@@ -9,7 +9,19 @@ and make the analysis workflow transparent and maintainable.
 import random
 import numpy as np
 from typing import Dict, List, Tuple, Optional
-from difflib import SequenceMatcher
+
+from src.utils.alignment import align, MATCH, DELETE
+from src.utils.phonetic_costs import get_cost_table, UNRELATED_COST
+from src.utils.grapheme_segmenter import segment, is_scorable, group_scores
+
+
+# Default weighting scheme for the overall score
+DEFAULT_OVERALL_WEIGHTS = {
+    "pronunciation": 0.50,
+    "acoustic": 0.20,
+    "fluency": 0.20,
+    "pitch": 0.10
+}
 
 
 class ScoringAlgorithms:
@@ -208,13 +220,7 @@ class ScoringAlgorithms:
             Overall score (0-100)
         """
         if weights is None:
-            # Default weighting scheme
-            weights = {
-                "pronunciation": 0.50,
-                "acoustic": 0.20,
-                "fluency": 0.20,
-                "pitch": 0.10
-            }
+            weights = DEFAULT_OVERALL_WEIGHTS
         
         # Calculate weighted score
         overall = (
@@ -226,58 +232,88 @@ class ScoringAlgorithms:
         
         return int(max(0, min(100, overall)))
     
+    @staticmethod
+    def calculate_position_scores(
+        reference: str,
+        hypothesis: str,
+        language: Optional[str] = None
+    ) -> List[float]:
+        """
+        Score every reference character against its aligned hypothesis character.
+        
+        Algorithm: 95 for a match, 20 for an omission; substitutions are
+        graded from 95 (same sound) down to 40 (unrelated) by the language's
+        phonetic substitution cost. Without a language every substitution
+        is unrelated.
+        
+        Args:
+            reference: Reference text
+            hypothesis: Hypothesis text
+            language: Optional language code or name for the cost table
+            
+        Returns:
+            List of scores, one per reference character
+        """
+        if language is None:
+            alignment = align(reference, hypothesis)
+        else:
+            alignment = get_cost_table(language).engine.align(reference, hypothesis)
+        
+        substitution = 95 - 55 * np.minimum(1.0, alignment.ref_costs / UNRELATED_COST)
+        scores = np.where(alignment.ref_ops == MATCH, 95.0, substitution)
+        scores = np.where(alignment.ref_ops == DELETE, 20.0, scores)
+        return scores.tolist()
+    
     @staticmethod
     def calculate_phoneme_similarity(
         transcription: str,
-        reference: str
+        reference: str,
+        language: Optional[str] = None
     ) -> Dict[str, Dict]:
         """
-        Calculate character-level similarity as phoneme proxy.
+        Calculate grapheme-cluster-level similarity as phoneme proxy.
         
         Args:
             transcription: Transcribed text
             reference: Reference text
+            language: Optional language code or name for partial credit
             
         Returns:
-            Dictionary of character scores
+            Dictionary of scores keyed by akshara / grapheme cluster
         """
         ref_norm = reference.lower()
         trans_norm = transcription.lower()
         
-        matcher = SequenceMatcher(None, ref_norm, trans_norm)
-        scores = {}
+        # Align once, then read the score at every reference position
+        position_scores = ScoringAlgorithms.calculate_position_scores(ref_norm, trans_norm, language)
+        totals = {}
         
-        for i, char in enumerate(ref_norm):
-            if not char.isalnum():
-                continue
-            
-            char_score = 0
-            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-                if i1 <= i < i2:
-                    if tag == 'equal':
-                        char_score = 95
-                    elif tag == 'replace':
-                        char_score = 40
-                    elif tag == 'delete':
-                        char_score = 20
-                    break
-            
-            if char in scores:
-                scores[char]["score"] = (scores[char]["score"] + char_score) / 2
-            else:
-                scores[char] = {"score": round(char_score, 1)}
+        # Score whole aksharas / grapheme clusters, not individual code points
+        for unit, unit_score in group_scores(ref_norm, position_scores):
+            total, count = totals.get(unit, (0, 0))
+            totals[unit] = (total + unit_score, count + 1)
         
-        return scores
+        # Average over every occurrence of a repeated unit
+        return {
+            unit: {"score": round(total / count, 1)}
+            for unit, (total, count) in totals.items()
+        }
 
 
 class MockScoringGenerator:
     """
     Generates realistic mock scores for testing and fallback scenarios.
     Uses controlled randomness to simulate realistic variation.
+    
+    Pass a seeded `random.Random` as `rng` for reproducible output (load-test
+    mode); by default the module-level generator is used.
     """
     
-    @staticmethod
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random
+    
     def generate_pronunciation_score(
+        self,
         difficulty_level: str = "medium",
         base_range: Tuple[int, int] = (75, 95)
     ) -> int:
@@ -299,10 +335,10 @@ class MockScoringGenerator:
         elif difficulty_level == "hard":
             max_score = min(max_score, 85)
         
-        return random.randint(min_score, max_score)
+        return self.rng.randint(min_score, max_score)
     
-    @staticmethod
     def generate_phoneme_scores(
+        self,
         reference_text: str,
         error_rate: float = 0.15
     ) -> Dict:
@@ -316,27 +352,27 @@ class MockScoringGenerator:
         Returns:
             Dictionary with phoneme scores
         """
-        chars = [c for c in reference_text.lower() if c.isalnum()]
+        units = [u for u in segment(reference_text.lower()) if is_scorable(u)]
         phoneme_map = {}
         detailed = []
         
-        for char in chars:
+        for unit in units:
             # Introduce controlled errors
-            has_error = random.random() < error_rate
+            has_error = self.rng.random() < error_rate
             
             if has_error:
-                char_score = random.randint(30, 60)
+                unit_score = self.rng.randint(30, 60)
                 status = "distorted"
             else:
-                char_score = random.randint(80, 100)
+                unit_score = self.rng.randint(80, 100)
                 status = "correct"
             
-            phoneme_map[char] = {"score": char_score, "status": status}
+            phoneme_map[unit] = {"score": unit_score, "status": status}
             detailed.append({
-                "phoneme": char,
-                "score": char_score,
+                "phoneme": unit,
+                "score": unit_score,
                 "status": status,
-                "actual": char if status == "correct" else "?"
+                "actual": unit if status == "correct" else "?"
             })
         
         return {
@@ -344,8 +380,8 @@ class MockScoringGenerator:
             "detailed": detailed
         }
     
-    @staticmethod
     def generate_pitch_contour(
+        self,
         duration_seconds: float = 5.0,
         base_pitch: int = 140,
         variation: int = 30
@@ -367,7 +403,7 @@ class MockScoringGenerator:
         current_pitch = base_pitch
         for _ in range(num_points):
             # Natural pitch variation with trending
-            change = random.randint(-variation // 2, variation // 2)
+            change = self.rng.randint(-variation // 2, variation // 2)
             current_pitch = max(
                 base_pitch - variation,
                 min(base_pitch + variation, current_pitch + change)
@@ -376,8 +412,7 @@ class MockScoringGenerator:
         
         return contour
     
-    @staticmethod
-    def generate_video_analysis_metrics() -> Dict:
+    def generate_video_analysis_metrics(self) -> Dict:
         """
         Generate mock metrics for video analysis.
         
@@ -398,12 +433,12 @@ class MockScoringGenerator:
         attention_spans = ["High", "Medium", "Low", "Fluctuating"]
         
         return {
-            "activity": random.choice(activities),
-            "emotion": random.choice(emotions),
-            "attention": random.choice(attention_spans),
-            "interaction_score": random.randint(65, 95),
-            "posture_score": random.randint(60, 95),
-            "eye_contact_score": random.randint(50, 90)
+            "activity": self.rng.choice(activities),
+            "emotion": self.rng.choice(emotions),
+            "attention": self.rng.choice(attention_spans),
+            "interaction_score": self.rng.randint(65, 95),
+            "posture_score": self.rng.randint(60, 95),
+            "eye_contact_score": self.rng.randint(50, 90)
         }
 
 
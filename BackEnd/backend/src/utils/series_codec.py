@@ -0,0 +1,182 @@
+"""
+backend/src/utils/series_codec.py
+
+Compact binary encoding for per-frame series (pitch contours).
+
+A contour is stored as a list of floats with 0 for unvoiced frames, which
+BSON writes as ~11 bytes per frame (type byte, index key, double). Sessions
+store it as one binary blob instead:
+
+    version byte | varint frame count | varint run count
+    | voicing run lengths (unvoiced, voiced, unvoiced, ...)
+    | zigzag deltas of the voiced values in quantized cents
+
+Voiced values are quantized to whole cents (0.06% of the frequency) above
+REFERENCE_HZ and delta-encoded, so a smooth contour costs ~1 byte per voiced
+frame. Varints are packed and unpacked with NumPy for the whole blob at once.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Union
+
+SERIES_CODEC_VERSION = 1
+
+# Cents are measured above this frequency (keeps every pitch value positive)
+REFERENCE_HZ = 10.0
+CENTS_PER_OCTAVE = 1200.0
+
+# Decoded frequencies are rounded to this many decimals
+DECODE_DECIMALS = 2
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.uint64)
+    return ((values >> np.uint64(1)).astype(np.int64)) ^ -((values & np.uint64(1)).astype(np.int64))
+
+
+def pack_varints(values: np.ndarray) -> bytes:
+    """
+    LEB128-encode unsigned integers.
+
+    Args:
+        values: Non-negative integers
+
+    Returns:
+        Concatenated varint bytes
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return b""
+    # Bytes needed per value (7 payload bits each)
+    bit_length = np.floor(np.log2(np.maximum(values, 1).astype(np.float64))).astype(np.int64) + 1
+    num_bytes = np.maximum(1, (bit_length + 6) // 7)
+    width = int(num_bytes.max())
+
+    shifts = np.arange(width, dtype=np.uint64) * np.uint64(7)
+    groups = ((values[:, None] >> shifts[None, :]) & np.uint64(0x7F)).astype(np.uint8)
+    position = np.arange(width)[None, :]
+    groups[position < (num_bytes[:, None] - 1)] |= 0x80
+    return groups[position < num_bytes[:, None]].tobytes()
+
+
+def unpack_varints(data: Union[bytes, memoryview]) -> np.ndarray:
+    """
+    Decode a stream of LEB128 varints.
+
+    Args:
+        data: Concatenated varint bytes
+
+    Returns:
+        uint64 array of decoded values
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if len(raw) == 0:
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(raw < 0x80)
+    if len(ends) == 0 or ends[-1] != len(raw) - 1:
+        raise ValueError("Truncated varint stream")
+
+    # Position of every byte within its varint
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    value_index = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    position = np.arange(len(raw)) - starts[value_index]
+
+    payload = (raw & 0x7F).astype(np.uint64) << (position.astype(np.uint64) * np.uint64(7))
+    return np.bitwise_or.reduceat(payload, starts)
+
+
+def encode_series(values: Sequence[float]) -> bytes:
+    """
+    Encode a per-frame frequency series; 0 / NaN / negative mark unvoiced frames.
+
+    Args:
+        values: Frame values in Hz
+
+    Returns:
+        Versioned binary blob
+    """
+    values = np.asarray(values, dtype=np.float64)
+    voiced = np.isfinite(values) & (values > 0)
+
+    # Voicing run lengths, always starting with an (possibly empty) unvoiced run
+    changes = np.flatnonzero(np.diff(voiced.astype(np.int8))) + 1
+    boundaries = np.concatenate(([0], changes, [len(values)]))
+    runs = np.diff(boundaries)
+    if len(values) and voiced[0]:
+        runs = np.concatenate(([0], runs))
+
+    cents = np.rint(CENTS_PER_OCTAVE * np.log2(values[voiced] / REFERENCE_HZ)).astype(np.int64)
+    deltas = np.diff(cents, prepend=0)
+
+    header = np.array([len(values), len(runs)], dtype=np.uint64)
+    body = np.concatenate((header, runs.astype(np.uint64), _zigzag(deltas)))
+    return bytes([SERIES_CODEC_VERSION]) + pack_varints(body)
+
+
+def decode_series(blob: Union[bytes, Sequence[float], None]) -> Optional[List[float]]:
+    """
+    Decode a blob from encode_series.
+
+    Plain lists (sessions stored before the codec) are passed through.
+
+    Args:
+        blob: Encoded series
+
+    Returns:
+        List of frame values in Hz with 0.0 for unvoiced frames
+    """
+    if blob is None or not isinstance(blob, (bytes, bytearray, memoryview)):
+        return blob
+    blob = memoryview(blob)
+    if len(blob) == 0 or blob[0] != SERIES_CODEC_VERSION:
+        raise ValueError(f"Unsupported series encoding version: {blob[0] if len(blob) else None}")
+
+    ints = unpack_varints(blob[1:])
+    num_frames, num_runs = int(ints[0]), int(ints[1])
+    runs = ints[2:2 + num_runs].astype(np.int64)
+    cents = np.cumsum(_unzigzag(ints[2 + num_runs:]))
+
+    # Odd-numbered runs are voiced
+    voiced = np.repeat(np.arange(num_runs) % 2 == 1, runs)
+    values = np.zeros(num_frames)
+    values[voiced] = np.round(REFERENCE_HZ * np.exp2(cents / CENTS_PER_OCTAVE), DECODE_DECIMALS)
+    return values.tolist()
+
+
+def pack_pitch_analysis(pitch_analysis: Optional[Dict]) -> Optional[Dict]:
+    """
+    Storage form of a pitch analysis: the contour is replaced by its blob.
+
+    Args:
+        pitch_analysis: Pitch analysis dict from the speech analyzer
+
+    Returns:
+        Copy with "pitch_contour" encoded
+    """
+    if not pitch_analysis or not isinstance(pitch_analysis.get("pitch_contour"), (list, tuple, np.ndarray)):
+        return pitch_analysis
+    packed = dict(pitch_analysis)
+    packed["pitch_contour"] = encode_series(pitch_analysis["pitch_contour"])
+    return packed
+
+
+def unpack_pitch_analysis(pitch_analysis: Optional[Dict]) -> Optional[Dict]:
+    """
+    Inverse of pack_pitch_analysis (also accepts unencoded documents).
+
+    Args:
+        pitch_analysis: Stored pitch analysis
+
+    Returns:
+        Copy with "pitch_contour" as a list of floats
+    """
+    if not pitch_analysis or "pitch_contour" not in pitch_analysis:
+        return pitch_analysis
+    unpacked = dict(pitch_analysis)
+    unpacked["pitch_contour"] = decode_series(pitch_analysis["pitch_contour"])
+    return unpacked
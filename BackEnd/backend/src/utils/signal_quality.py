@@ -0,0 +1,210 @@
+"""
+backend/src/utils/signal_quality.py
+
+Pre-analysis signal-quality gate.
+
+Clipped, near-silent or very noisy recordings cannot be scored
+meaningfully, so they are rejected before the transformer, pYIN and
+feature extraction run. All metrics come from one framing of the clip:
+
+- SNR estimate: loud-frame power (90th percentile) over noise-floor power
+  (10th percentile) of 20 ms frame energies. A tightly trimmed clip can be
+  speech from end to end; its quietest frames are then voiced (harmonic,
+  low spectral flatness) rather than noise, no noise floor is observable
+  and SILENCE_LEVEL_DB stands in for it, so the SNR check does not apply
+- Clipping ratio: fraction of samples at or near full scale
+- Speech duration: frames clearly above the noise floor
+- DC offset: mean sample value
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+QUALITY_FRAME_LENGTH = 0.020  # seconds
+CLIPPING_LEVEL = 0.999        # |sample| at or above this counts as clipped
+SPEECH_ABOVE_FLOOR_DB = 6.0   # Frames this far above the noise floor are speech
+SILENCE_LEVEL_DB = -50.0      # Frames below this (dBFS) are never speech
+NOISE_MIN_FLATNESS = 0.1      # Floor frames less flat than this are voiced (white noise ~0.56)
+
+# Default thresholds (overridable from settings)
+DEFAULT_MIN_SNR_DB = 10.0
+DEFAULT_MAX_CLIPPING_RATIO = 0.01
+DEFAULT_MIN_SPEECH_DURATION = 0.3
+DEFAULT_MAX_DC_OFFSET = 0.1
+
+ISSUE_MESSAGES = {
+    "too_short": "We could barely hear any speech. Please say the word clearly and try again.",
+    "too_noisy": "There is too much background noise. Please move to a quieter place and record again.",
+    "clipped": "The recording is too loud and distorted. Please hold the microphone a little further away.",
+    "dc_offset": "The microphone signal looks faulty. Please check the microphone and record again.",
+}
+
+
+def _frame_power_db(audio: np.ndarray, sample_rate: int, dc_offset: float) -> Tuple[np.ndarray, int, np.ndarray]:
+    """
+    Frame energies (dB) of the DC-free signal; a trailing partial frame is dropped.
+
+    Returns:
+        (power_db, frame_length, frames) with frames as (n x frame_length)
+    """
+    frame_length = max(1, int(QUALITY_FRAME_LENGTH * sample_rate))
+    num_frames = max(1, len(audio) // frame_length)
+    centered = audio[:num_frames * frame_length] - dc_offset
+    if len(centered) < frame_length:
+        centered = np.pad(centered, (0, frame_length - len(centered)))
+    frames = centered.reshape(num_frames, frame_length)
+    power = np.mean(frames ** 2, axis=1)
+    return 10 * np.log10(np.maximum(power, 1e-12)), frame_length, frames
+
+
+def _noise_floor_db(power_db: np.ndarray, frames: np.ndarray) -> float:
+    """
+    Noise floor (dBFS): the 10th percentile of frame energies, or
+    SILENCE_LEVEL_DB when the frames at that level are voiced speech.
+
+    Only the floor frames are transformed (spectral flatness: geometric over
+    arithmetic mean of the power spectrum), so the check stays cheap.
+    """
+    noise_db = float(np.percentile(power_db, 10))
+    if noise_db <= SILENCE_LEVEL_DB:
+        return noise_db
+    floor = frames[power_db <= noise_db]
+    spectrum = np.abs(np.fft.rfft(floor * np.hanning(frames.shape[1]), axis=1))[:, 1:] ** 2 + 1e-20
+    flatness = np.exp(np.mean(np.log(spectrum), axis=1)) / np.mean(spectrum, axis=1)
+    if np.median(flatness) < NOISE_MIN_FLATNESS:
+        # Speech from end to end: the real floor is below its quietest frame
+        return SILENCE_LEVEL_DB
+    return noise_db
+
+
+def measure_signal_quality(audio: np.ndarray, sample_rate: int = 16000) -> Dict:
+    """
+    Compute quality metrics for a clip.
+
+    Args:
+        audio: Audio signal (mono, float in [-1, 1])
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Dictionary with snr_db, noise_floor_db (dBFS), clipping_ratio,
+        speech_duration, dc_offset and duration (seconds)
+    """
+    audio = np.asarray(audio, dtype=np.float64)
+    duration = len(audio) / sample_rate
+    if len(audio) == 0:
+        return {"snr_db": 0.0, "noise_floor_db": -120.0, "clipping_ratio": 0.0,
+                "speech_duration": 0.0, "dc_offset": 0.0, "duration": 0.0}
+
+    dc_offset = float(np.mean(audio))
+    clipping_ratio = float(np.count_nonzero(np.abs(audio) >= CLIPPING_LEVEL)) / len(audio)
+
+    power_db, frame_length, frames = _frame_power_db(audio, sample_rate, dc_offset)
+    noise_db = _noise_floor_db(power_db, frames)
+    snr_db = float(np.percentile(power_db, 90) - noise_db)
+
+    speech = (power_db > noise_db + SPEECH_ABOVE_FLOOR_DB) & (power_db > SILENCE_LEVEL_DB)
+    speech_duration = float(np.count_nonzero(speech)) * frame_length / sample_rate
+
+    return {
+        "snr_db": round(snr_db, 1),
+        "noise_floor_db": round(float(noise_db), 1),
+        "clipping_ratio": round(clipping_ratio, 4),
+        "speech_duration": round(speech_duration, 2),
+        "dc_offset": round(dc_offset, 4),
+        "duration": round(duration, 2),
+    }
+
+
+def assess_signal_quality(
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    min_snr_db: float = DEFAULT_MIN_SNR_DB,
+    max_clipping_ratio: float = DEFAULT_MAX_CLIPPING_RATIO,
+    min_speech_duration: float = DEFAULT_MIN_SPEECH_DURATION,
+    max_dc_offset: float = DEFAULT_MAX_DC_OFFSET
+) -> Dict:
+    """
+    Decide whether a clip is good enough to analyze.
+
+    Workflow:
+    1. Measure SNR, clipping, speech duration and DC offset
+    2. Compare against thresholds; every failed check is an issue
+    3. Build a user-facing message from the first issue
+
+    Returns:
+        {"passed": bool, "issues": [codes], "message": str, "metrics": {...}}
+    """
+    metrics = measure_signal_quality(audio, sample_rate)
+
+    issues: List[str] = []
+    if metrics["snr_db"] < min_snr_db and metrics["noise_floor_db"] > SILENCE_LEVEL_DB:
+        issues.append("too_noisy")
+    elif metrics["speech_duration"] < min_speech_duration:
+        # A silent floor with little on top of it: nothing was said
+        issues.append("too_short")
+    if metrics["clipping_ratio"] > max_clipping_ratio:
+        issues.append("clipped")
+    if abs(metrics["dc_offset"]) > max_dc_offset:
+        issues.append("dc_offset")
+
+    message: Optional[str] = ISSUE_MESSAGES[issues[0]] if issues else None
+    return {
+        "passed": not issues,
+        "issues": issues,
+        "message": message,
+        "metrics": metrics,
+    }
+
+
+def split_utterances(
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    min_gap: float = 0.5,
+    max_length: float = 10.0,
+    padding: float = 0.15
+) -> List[Tuple[int, int]]:
+    """
+    Speech regions of a long recording, as (start, end) sample indices.
+
+    Uses the gate's framing and speech threshold, so every region holds
+    speech the gate would count. Pauses shorter than `min_gap` seconds do
+    not split a region; regions longer than `max_length` are cut evenly.
+    Each region keeps `padding` seconds of context on both sides, which the
+    gate needs to estimate the noise floor.
+
+    Args:
+        audio: Audio signal (mono, float in [-1, 1])
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Regions in time order
+    """
+    audio = np.asarray(audio, dtype=np.float64)
+    if len(audio) == 0:
+        return []
+    power_db, frame_length, frames = _frame_power_db(audio, sample_rate, float(np.mean(audio)))
+    noise_db = _noise_floor_db(power_db, frames)
+    speech = (power_db > noise_db + SPEECH_ABOVE_FLOOR_DB) & (power_db > SILENCE_LEVEL_DB)
+
+    # Runs of speech frames: [start, end) frame indices
+    edges = np.diff(np.concatenate([[0], speech.astype(np.int8), [0]]))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    if not len(starts):
+        return []
+
+    # Close short pauses
+    frame_seconds = frame_length / sample_rate
+    keep = np.concatenate([[True], (starts[1:] - ends[:-1]) * frame_seconds >= min_gap])
+    starts, ends = starts[keep], np.concatenate([ends[:-1][keep[1:]], ends[-1:]])
+
+    max_frames = max(1, int(max_length / frame_seconds))
+    pad = int(padding * sample_rate)
+    regions = []
+    for start, end in zip(starts, ends):
+        pieces = int(np.ceil((end - start) / max_frames))
+        for bounds in np.array_split(np.arange(start, end), pieces):
+            regions.append((
+                max(0, int(bounds[0]) * frame_length - pad),
+                min(len(audio), (int(bounds[-1]) + 1) * frame_length + pad)
+            ))
+    return regions
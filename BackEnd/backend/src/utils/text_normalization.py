@@ -0,0 +1,183 @@
+"""
+backend/src/utils/text_normalization.py
+
+Target-text normalization and tokenization for pronunciation scoring.
+
+Exercise targets almost never change, so they are prepared once (when an
+exercise is created or updated) and stored on the exercise document,
+together with a hash of the text and language they were prepared from; a
+stored target that no longer matches its exercise (edited outside the
+API) is prepared again. Ad-hoc texts go through an in-process LRU cache.
+Either way the regex clean-up and the Tamil ITRANS transliteration stay
+off the request path.
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from src.utils.phonetic_costs import get_cost_table, resolve_language
+from src.utils.grapheme_segmenter import segment_spans
+from src.utils.metrics import register_cache
+
+# Optional: for cleaner Tamil comparison if installed
+try:
+    from indic_transliteration import sanscript
+    from indic_transliteration.sanscript import transliterate
+    HAS_INDIC = True
+except ImportError:
+    HAS_INDIC = False
+
+# Bump whenever normalization, token ids or segmentation change so that
+# targets stored on exercise documents are recomputed.
+PREPARED_TEXT_VERSION = 3
+
+PREPARED_TEXT_CACHE_SIZE = 4096
+
+# \w does not cover combining marks, so Indic vowel signs, viramas and
+# other combining marks are kept explicitly (dandas are still removed)
+_PUNCTUATION = re.compile(r'[^\w\s\u0300-\u036F\u0900-\u0963\u0966-\u0DFF]')
+
+
+def normalize_text(text: str, language: Optional[str]) -> str:
+    """
+    Normalize text based on language rules.
+
+    Workflow:
+    1. Lowercase and strip
+    2. Tamil: transliterate to ITRANS for phonetic comparison
+    3. Otherwise: remove punctuation
+    """
+    text = text.lower().strip()
+
+    if resolve_language(language) == "ta":
+        # For Tamil, transliterate to Latin for more robust comparison
+        # if the model outputs Latin or if we want to compare phonetically
+        if HAS_INDIC and any(ord(c) > 127 for c in text): # If contains non-ascii
+            try:
+                return transliterate(text, sanscript.TAMIL, sanscript.ITRANS).lower()
+            except Exception:
+                pass
+
+    # Remove punctuation
+    return _PUNCTUATION.sub('', text)
+
+
+class PreparedText(NamedTuple):
+    """
+    Normalized, tokenized form of a scoring target.
+
+    `graphemes` are the scoring units (aksharas / grapheme clusters) of the
+    original text, and `unit_index[i]` is the unit that normalized
+    character i came from (-1 for word separators). `source_hash` identifies
+    the text and language it was prepared from.
+    """
+    language: str
+    normalized: str
+    token_ids: Tuple[int, ...]
+    graphemes: Tuple[str, ...]
+    unit_index: Tuple[int, ...]
+    source_hash: str
+
+    def to_document(self) -> Dict:
+        """Serialize for storage on an exercise document."""
+        return {
+            "version": PREPARED_TEXT_VERSION,
+            "language": self.language,
+            "normalized": self.normalized,
+            "token_ids": list(self.token_ids),
+            "graphemes": list(self.graphemes),
+            "unit_index": list(self.unit_index),
+            "source_hash": self.source_hash,
+        }
+
+    @classmethod
+    def from_document(cls, document: Optional[Dict]) -> Optional["PreparedText"]:
+        """Load a stored target; returns None if missing or from an older version."""
+        if not document or document.get("version") != PREPARED_TEXT_VERSION:
+            return None
+        return cls(
+            language=document["language"],
+            normalized=document["normalized"],
+            token_ids=tuple(document["token_ids"]),
+            graphemes=tuple(document["graphemes"]),
+            unit_index=tuple(document["unit_index"]),
+            source_hash=document["source_hash"],
+        )
+
+
+def source_hash(text: str, language: Optional[str]) -> str:
+    """Hash of the text and (resolved) language a target is prepared from."""
+    return hashlib.sha1(f"{resolve_language(language)}\n{text}".encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=PREPARED_TEXT_CACHE_SIZE)
+def _prepare_text_cached(text: str, language: str) -> PreparedText:
+    text_hash = source_hash(text, language)
+    text = text.lower().strip()
+    pieces: List[str] = []
+    unit_index: List[int] = []
+    graphemes: List[str] = []
+
+    # Normalize unit by unit so every normalized character knows its unit
+    cursor = 0
+    word_break = False
+    for start, end in segment_spans(text):
+        # Spans skip whitespace, so a gap is a word break
+        word_break = word_break or start > cursor
+        cursor = end
+        unit_norm = normalize_text(text[start:end], language)
+        if not unit_norm:
+            continue
+        if word_break and pieces:
+            pieces.append(" ")
+            unit_index.append(-1)
+        word_break = False
+        graphemes.append(text[start:end])
+        pieces.append(unit_norm)
+        unit_index.extend([len(graphemes) - 1] * len(unit_norm))
+
+    normalized = "".join(pieces)
+    token_ids = tuple(get_cost_table(language).encode(normalized).tolist())
+    return PreparedText(
+        language=language,
+        normalized=normalized,
+        token_ids=token_ids,
+        graphemes=tuple(graphemes),
+        unit_index=tuple(unit_index),
+        source_hash=text_hash,
+    )
+
+
+def prepare_text(text: str, language: Optional[str]) -> PreparedText:
+    """
+    Normalize and tokenize a target text, memoized per (text, language).
+
+    Args:
+        text: Target word/sentence as written in the exercise
+        language: Language code or name
+
+    Returns:
+        PreparedText for scoring
+    """
+    return _prepare_text_cached(text, resolve_language(language))
+
+
+def get_prepared_target(text: str, language: Optional[str], stored: Optional[Dict] = None) -> PreparedText:
+    """
+    Use a target stored on an exercise document when it was prepared from
+    this text and language, otherwise prepare it through the LRU cache.
+    """
+    prepared = PreparedText.from_document(stored)
+    if prepared is not None and prepared.source_hash == source_hash(text, language):
+        return prepared
+    return prepare_text(text, language)
+
+
+def prepared_text_cache_info():
+    """Hit/miss statistics of the in-process cache."""
+    return _prepare_text_cached.cache_info()
+
+
+register_cache("prepared_text", prepared_text_cache_info)
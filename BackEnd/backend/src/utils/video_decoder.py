@@ -0,0 +1,261 @@
+#backend\src\utils\video_decoder.py
+"""
+Sampled-frame video decoding.
+
+Video analysis only needs a few frames per second, small and grayscale.
+Frames are therefore decoded at the container's rate but only the ones
+closest to the sampling grid are converted, and the conversion scales
+them down at the same time (swscale in PyAV, INTER_AREA in OpenCV), so
+full-resolution RGB frames are never materialized. When the next sample
+is further away than `seek_gap` seconds the decoder seeks to the keyframe
+before it instead of decoding everything in between.
+
+The audio track is demuxed on its own (decode_audio_track): video
+packets are skipped undecoded and the audio is resampled straight into
+one in-memory 16 kHz buffer.
+
+PyAV is preferred (it exposes the audio track too); OpenCV is the
+fallback. Both are optional: without either, HAS_VIDEO_DECODER is False
+and video analysis is unavailable.
+
+A file neither decoder can read raises VideoDecodeError (bad input, as
+opposed to failures of the analysis itself).
+"""
+
+import math
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import av
+    HAS_PYAV = True
+except ImportError:
+    HAS_PYAV = False
+
+try:
+    import cv2
+    HAS_OPENCV = True
+except ImportError:
+    HAS_OPENCV = False
+
+HAS_VIDEO_DECODER = HAS_PYAV or HAS_OPENCV
+
+
+class VideoDecodeError(ValueError):
+    """The file is not a readable video (corrupt, truncated or no video stream)."""
+
+
+class VideoInfo:
+    """Basic stream properties of a video file."""
+
+    __slots__ = ("duration", "fps", "width", "height", "has_audio")
+
+    def __init__(self, duration: float, fps: float, width: int, height: int, has_audio: bool):
+        self.duration = duration
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.has_audio = has_audio
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def scaled_size(width: int, height: int, max_side: int) -> Tuple[int, int]:
+    """Size with the longer side at most `max_side` (even, aspect kept)."""
+    scale = min(1.0, max_side / max(width, height, 1))
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def sample_times(duration: float, fps: float, max_frames: int) -> np.ndarray:
+    """Sampling grid: `fps` per second, thinned evenly to at most `max_frames`."""
+    count = max(1, int(duration * fps))
+    if count > max_frames:
+        count = max_frames
+    return (np.arange(count) + 0.5) * (duration / count)
+
+
+def probe_video(path: str) -> VideoInfo:
+    """Duration, frame rate, size and audio presence of a video file."""
+    if HAS_PYAV:
+        try:
+            with av.open(path) as container:
+                if not container.streams.video:
+                    raise VideoDecodeError("The file has no video stream")
+                stream = container.streams.video[0]
+                duration = _stream_duration(container, stream)
+                fps = float(stream.average_rate or stream.guessed_rate or 25)
+                return VideoInfo(duration, fps, stream.codec_context.width, stream.codec_context.height,
+                                 bool(container.streams.audio))
+        except av.FFmpegError as e:
+            raise VideoDecodeError(f"Cannot open video: {e}") from e
+    if HAS_OPENCV:
+        capture = cv2.VideoCapture(path)
+        try:
+            if not capture.isOpened():
+                raise VideoDecodeError("Cannot open video")
+            fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+            frames = capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+            return VideoInfo(frames / fps, fps, int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                             int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)), False)
+        finally:
+            capture.release()
+    raise RuntimeError("No video decoder available (install av or opencv-python-headless)")
+
+
+def _stream_duration(container, stream) -> float:
+    if stream.duration is not None and stream.time_base is not None:
+        return float(stream.duration * stream.time_base)
+    if container.duration is not None:
+        return container.duration / 1_000_000  # av.time_base
+    if stream.frames and stream.average_rate:
+        return stream.frames / float(stream.average_rate)
+    return 0.0
+
+
+def decode_audio_track(path: str, sample_rate: int = 16000, partial: bool = False) -> Optional[np.ndarray]:
+    """
+    First audio track as a mono float32 buffer at `sample_rate`.
+
+    Args:
+        path: Media file
+        sample_rate: Output rate
+        partial: The file is still being uploaded: return what decodes
+                 instead of failing at the cut-off point (streamable
+                 containers such as WebM; MP4 with its index at the end
+                 does not open until complete)
+
+    Returns:
+        The samples, or None when the file has no audio track (yet) or
+        PyAV is not installed (OpenCV cannot read audio)
+    """
+    if not HAS_PYAV:
+        return None
+    chunks = []
+    try:
+        with av.open(path) as container:
+            if not container.streams.audio:
+                return None
+            stream = container.streams.audio[0]
+            resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+            try:
+                for packet in container.demux(stream):
+                    for frame in packet.decode():
+                        chunks.extend(out.to_ndarray().reshape(-1) for out in resampler.resample(frame))
+            except av.FFmpegError:
+                if not partial:
+                    raise
+            # Flush the resampler's delay line
+            chunks.extend(out.to_ndarray().reshape(-1) for out in resampler.resample(None))
+    except av.FFmpegError:
+        if not partial:
+            raise
+        if not chunks:
+            return None
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+
+def iter_sampled_frames(
+    path: str,
+    fps: float,
+    max_side: int,
+    max_frames: int,
+    seek_gap: float = 2.0,
+    info: Optional[VideoInfo] = None
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Yield (timestamp, grayscale uint8 frame) on the sampling grid.
+
+    Args:
+        path: Video file
+        fps: Samples per second
+        max_side: Longer side of the returned frames in pixels
+        max_frames: Cap on returned frames (long videos are sampled sparser)
+        seek_gap: Seek to the previous keyframe when the next sample is
+                  further away than this (seconds)
+        info: probe_video() result if already known
+
+    Yields:
+        Frames of one fixed size, in time order
+    """
+    info = info or probe_video(path)
+    targets = sample_times(info.duration, fps, max_frames)
+    size = scaled_size(info.width, info.height, max_side)
+    if HAS_PYAV:
+        try:
+            yield from _iter_pyav(path, targets, size, seek_gap)
+        except av.FFmpegError as e:
+            raise VideoDecodeError(f"Cannot decode video: {e}") from e
+    else:
+        yield from _iter_opencv(path, targets, size, seek_gap)
+
+
+def _iter_pyav(path: str, targets: np.ndarray, size: Tuple[int, int], seek_gap: float):
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        time_base = float(stream.time_base)
+        index = 0
+        previous = None  # (time, frame) of the last decoded frame
+        can_seek = True  # at most one seek per target (keyframes may be sparse)
+
+        while index < len(targets):
+            restart = False
+            for frame in container.decode(stream):
+                if frame.pts is None:
+                    continue
+                timestamp = frame.pts * time_base
+
+                # Far from the next sample: jump to the keyframe before it
+                if can_seek and targets[index] - timestamp > seek_gap:
+                    container.seek(int(targets[index] / time_base), stream=stream, backward=True, any_frame=False)
+                    previous = None
+                    can_seek = False
+                    restart = True
+                    break
+
+                # Emit every target that lies between the previous frame and this one
+                while index < len(targets) and targets[index] <= timestamp:
+                    chosen = frame
+                    if previous is not None and targets[index] - previous[0] < timestamp - targets[index]:
+                        chosen = previous[1]
+                    yield float(targets[index]), chosen.reformat(width=size[0], height=size[1], format="gray").to_ndarray()
+                    index += 1
+                    can_seek = True
+                if index >= len(targets):
+                    return
+                previous = (timestamp, frame)
+
+            if not restart:
+                # Stream ended before the last targets: repeat the final frame
+                if previous is not None:
+                    last = previous[1].reformat(width=size[0], height=size[1], format="gray").to_ndarray()
+                    for target in targets[index:]:
+                        yield float(target), last
+                return
+
+
+def _iter_opencv(path: str, targets: np.ndarray, size: Tuple[int, int], seek_gap: float):
+    capture = cv2.VideoCapture(path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        position = 0  # index of the next frame grab() returns
+        for target in targets:
+            wanted = int(math.floor(target * fps))
+            if wanted - position > seek_gap * fps:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, wanted)
+                position = wanted
+            # grab() decodes without converting; only the sampled frame is retrieved
+            while position < wanted:
+                if not capture.grab():
+                    return
+                position += 1
+            ok, frame = capture.read()
+            if not ok:
+                return
+            position += 1
+            gray = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+            yield float(target), gray
+    finally:
+        capture.release()
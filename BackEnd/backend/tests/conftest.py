@@ -0,0 +1,104 @@
+#backend\tests\conftest.py
+import io
+import wave
+
+import numpy as np
+import pytest
+
+
+async def connect_in_memory():
+    """Drop-in for connect_to_mongo backed by mongomock-motor."""
+    from beanie import init_beanie
+    from mongomock_motor import AsyncMongoMockClient
+    from src.config import settings
+    from src.database.database import db, DOCUMENT_MODELS
+
+    db.client = AsyncMongoMockClient()
+    await init_beanie(database=db.client[settings.MONGODB_DATABASE], document_models=DOCUMENT_MODELS)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """The FastAPI app on an in-memory MongoDB, without background job workers."""
+    pytest.importorskip("mongomock_motor")
+    import src.main
+    from src.config import settings
+    from src.services.analysis_executor import analysis_executor
+
+    monkeypatch.setattr(settings, "JOB_WORKERS", 0)
+    monkeypatch.setattr(src.main, "connect_to_mongo", connect_in_memory)
+    yield src.main.app
+    # App shutdown closes the shared executor; reopen it for the tests that follow
+    analysis_executor.start()
+
+
+@pytest.fixture
+def silent_wav():
+    """A 0.1 s silent 16-bit mono WAV upload."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(np.zeros(1600, dtype="<i2").tobytes())
+    return buffer.getvalue()
+
+
+def _synthetic_vowel(formants, sample_rate=16000, duration=1.0, f0=120, bandwidth=80):
+    from scipy.signal import lfilter
+
+    signal = np.zeros(int(duration * sample_rate))
+    signal[::sample_rate // f0] = 1.0
+    for frequency in formants:
+        radius = np.exp(-np.pi * bandwidth / sample_rate)
+        theta = 2 * np.pi * frequency / sample_rate
+        signal = lfilter([1], [1, -2 * radius * np.cos(theta), radius * radius], signal)
+    return signal / np.abs(signal).max()
+
+
+def _write_test_video(path, seconds, size=(640, 480), audio=None, sample_rate=16000):
+    """Video with a bar sweeping across, plus an optional interleaved audio track.
+
+    mpeg4 / AAC, or VP8 / Opus for .webm paths (what the frontend records).
+    """
+    import av
+
+    webm = path.endswith(".webm")
+    container = av.open(path, "w")
+    stream = container.add_stream("libvpx" if webm else "mpeg4", rate=25)
+    stream.width, stream.height, stream.pix_fmt = size[0], size[1], "yuv420p"
+    # All streams must exist before the first packet is muxed
+    audio_stream = None
+    if audio is not None:
+        audio_stream = container.add_stream("libopus" if webm else "aac", rate=48000 if webm else sample_rate,
+                                            layout="mono")
+    step = sample_rate // 25
+    for i in range(int(seconds * 25)):
+        image = np.full((size[1], size[0], 3), 40, dtype=np.uint8)
+        x = (i * 8) % (size[0] - 40)
+        image[:, x:x + 40] = 255
+        for packet in stream.encode(av.VideoFrame.from_ndarray(image, format="rgb24")):
+            container.mux(packet)
+        if audio_stream is not None:
+            frame = av.AudioFrame.from_ndarray(audio[i * step:(i + 1) * step].astype(np.float32)[None],
+                                               format="flt", layout="mono")
+            frame.sample_rate, frame.pts = sample_rate, i * step
+            for packet in audio_stream.encode(frame):
+                container.mux(packet)
+    for packet in stream.encode():
+        container.mux(packet)
+    if audio_stream is not None:
+        for packet in audio_stream.encode():
+            container.mux(packet)
+    container.close()
+    return path
+
+
+@pytest.fixture
+def synthetic_vowel():
+    return _synthetic_vowel
+
+
+@pytest.fixture
+def write_test_video():
+    return _write_test_video
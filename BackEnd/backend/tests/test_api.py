@@ -1 +1,287 @@
-#backend\tests\test_api.py
\ No newline at end of file
+#backend\tests\test_api.py
+import numpy as np
+import pytest
+
+
+def test_api_load_harness_drives_in_memory_app(monkeypatch, app):
+    import asyncio
+    import load_test_api
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "LOAD_TEST_MODE", True)
+    monkeypatch.setattr(settings, "LOAD_TEST_LATENCY_SCALE", 0.0)
+
+    args = load_test_api.parse_args([
+        "--users", "2", "--exercises", "3", "--steps", "2,3", "--step-duration", "0.5",
+        "--mix", "analyze=2,exercises=1,progress_stats=1,progress_history=1", "--slo-p95", "60"
+    ])
+    reports = asyncio.run(load_test_api.LoadTest(args).run(app))
+
+    assert [report["concurrency"] for report in reports] == [2, 3]
+    for report in reports:
+        assert report["error_rate"] == 0.0 and report["requests"] > 0
+        assert report["endpoints"]["login"]["requests"] == report["concurrency"]
+        assert report["endpoints"]["analyze"]["statuses"] == {200: report["endpoints"]["analyze"]["requests"]}
+        assert report["endpoints"]["analyze"]["p50_ms"] <= report["endpoints"]["analyze"]["p99_ms"]
+    assert "breaking_point" not in reports[-1]
+
+    with pytest.raises(ValueError):
+        load_test_api.parse_mix("upload=3")
+
+
+def test_profiling_middleware_stores_signed_and_sampled_profiles(tmp_path, monkeypatch, app, silent_wav):
+    import asyncio
+    import pstats
+    import httpx
+    from src.api.auth import create_access_token, get_current_user, get_current_active_user
+    from src.config import settings
+    from src.database.models import User, UserRole
+    from src.utils import profiler
+
+    for name, value in {"PROFILING_SECRET": "s3cret", "PROFILE_DIR": str(tmp_path / "profiles"),
+                        "PROFILE_SAMPLE_INTERVAL": 0.001, "LOAD_TEST_MODE": True,
+                        "LOAD_TEST_STAGE_LATENCIES": {"pronunciation": [0.05, 0.0]}}.items():
+        monkeypatch.setattr(settings, name, value)
+
+    async def scenario():
+        await app.router.startup()
+        try:
+            admin = User(email="admin@example.com", username="admin", password_hash="x", role=UserRole.ADMIN)
+            await admin.insert()
+            monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: admin)
+            monkeypatch.setitem(app.dependency_overrides, get_current_active_user, lambda: admin)
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+                async def analyze(headers):
+                    return await client.post("/api/speech/analyze", headers=headers,
+                                             files={"audio": ("a.wav", silent_wav, "audio/wav")})
+
+                # Unsigned / forged headers are ignored
+                forged = await analyze({"X-Profile": "sample:99999999999:00"})
+                assert forged.status_code == 200 and "x-profile-id" not in forged.headers
+
+                token = (await client.post("/api/admin/profiles/token", json={"mode": "cprofile"})).json()
+                bearer = {"Authorization": f"Bearer {create_access_token({'sub': admin.email})}"}
+                other = {"Authorization": f"Bearer {create_access_token({'sub': 'user@example.com'})}"}
+                # Bound to the admin who minted it
+                stolen = await analyze({**other, "X-Profile": token["value"]})
+                assert "x-profile-id" not in stolen.headers
+                profiled = await analyze({**bearer, "X-Profile": token["value"], "X-Request-ID": "slow-req-1"})
+                profile_id = profiled.headers["x-profile-id"]
+                # The client's id is kept as a prefix only
+                assert profile_id.startswith("slow-req-1-") and profile_id != "slow-req-1"
+                # Single use
+                replayed = await analyze({**bearer, "X-Profile": token["value"], "X-Request-ID": "slow-req-1"})
+                assert "x-profile-id" not in replayed.headers
+
+                monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 1.0)
+                sampled = await analyze({})
+                sampled_id = sampled.headers["x-profile-id"]
+                monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+
+                listing = (await client.get("/api/admin/profiles/")).json()
+                assert {p["request_id"] for p in listing} == {profile_id, sampled_id}
+                download = await client.get(f"/api/admin/profiles/{profile_id}")
+                assert download.status_code == 200
+                assert (await client.get("/api/admin/profiles/..%2Fsecrets")).status_code == 404
+                return listing, profile_id, sampled_id
+        finally:
+            await app.router.shutdown()
+
+    listing, profile_id, sampled_id = asyncio.run(scenario())
+    by_id = {p["request_id"]: p for p in listing}
+    # Event loop + executor thread + pipeline branch threads
+    assert by_id[profile_id]["threads_profiled"] >= 3 and by_id[profile_id]["status"] == 200
+    functions = {func[2] for func in pstats.Stats(profiler.profile_path(profile_id)).stats}
+    assert {"generate_synthetic_analysis", "synthetic_sleep", "analyze_speech"} <= functions
+
+    folded = open(profiler.profile_path(sampled_id), encoding="utf-8").read()
+    assert by_id[sampled_id]["mode"] == "sample" and "synthetic_sleep" in folded
+
+
+def test_video_analysis_rejects_unreadable_files_instead_of_mocking(tmp_path, monkeypatch, app):
+    import asyncio
+    pytest.importorskip("av")
+    import httpx
+    from src.api import video
+    from src.api.auth import get_current_user
+    from src.config import settings
+    from src.database.models import User
+    from src.utils.video_decoder import VideoDecodeError
+
+    garbage = tmp_path / "clip.mp4"
+    garbage.write_bytes(b"not a video" * 100)
+    with pytest.raises(VideoDecodeError):
+        video.video_analyzer.analyze_video(str(garbage))
+
+
+    def broken(*args, **kwargs):
+        raise KeyError("summary")
+
+    async def scenario():
+        await app.router.startup()
+        try:
+            child = User(email="kid@example.com", username="kid", password_hash="x")
+            await child.insert()
+            monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: child)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+                async def analyze():
+                    return await client.post("/api/video/analyze",
+                                             files={"video": ("clip.mp4", garbage.read_bytes(), "video/mp4")})
+
+                bad_input = await analyze()
+                monkeypatch.setattr(video.video_analyzer, "analyze_video", broken)
+                return bad_input, await analyze()
+        finally:
+            await app.router.shutdown()
+
+    bad_input, internal = asyncio.run(scenario())
+    assert bad_input.status_code == 422 and "result" not in bad_input.json()
+    assert internal.status_code == 500
+
+
+def test_resumable_upload_resumes_and_scores_audio_while_uploading(tmp_path, monkeypatch, app, silent_wav,
+                                                                    synthetic_vowel, write_test_video):
+    import asyncio
+    import os
+    pytest.importorskip("av")
+    import httpx
+    from src.api import uploads, video
+    from src.api.auth import get_current_user
+    from src.config import settings
+    from src.database.models import User
+    from src.models.wav2vec2_model import Wav2Vec2SpeechModel
+    from src.services.load_shedding import load_shedder
+
+    class FakeModel(Wav2Vec2SpeechModel):
+        def __init__(self):
+            pass
+
+        def transcribe_batch(self, audios, sample_rate=16000, batch_size=8, cancel_tokens=None):
+            return [{"text": "cat", "confidence": 0.9} for _ in audios]
+
+    for name, value in {"RESUMABLE_UPLOAD_DIR": str(tmp_path / "resumable"), "JOB_AUDIO_DIR": str(tmp_path / "jobs"),
+                        "RESUMABLE_EARLY_ANALYSIS_STEP": 1, "VIDEO_FRAME_WORKERS": 0}.items():
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(video.video_analyzer.speech_analyzer, "model_wrapper", FakeModel())
+    monkeypatch.setattr(load_shedder, "should_shed", lambda: True)
+
+    # 12 s WebM session with attempts at 1 s, 5 s and 9 s
+    rng = np.random.default_rng(0)
+    audio = 0.001 * rng.standard_normal(12 * 16000)
+    for start in (1, 5, 9):
+        audio[start * 16000:(start + 1) * 16000] += 0.6 * synthetic_vowel([700, 1220, 2600])
+    data = open(write_test_video(str(tmp_path / "session.webm"), seconds=12, size=(320, 240), audio=audio), "rb").read()
+    cut = len(data) * 2 // 5
+    stream_type = {"Content-Type": "application/offset+octet-stream"}
+
+    async def scenario():
+        await app.router.startup()
+        try:
+            child = User(email="kid@example.com", username="kid", password_hash="x")
+            await child.insert()
+            monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: child)
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+                created = await client.post("/api/uploads", json={"kind": "video", "length": len(data)})
+                assert created.status_code == 201 and created.headers["upload-offset"] == "0"
+                location = created.headers["location"]
+
+                async def patch(offset, body, headers=stream_type):
+                    return await client.patch(location, content=body, headers={**headers, "Upload-Offset": str(offset)})
+
+                assert (await patch(0, data[:cut], {"Content-Type": "video/webm"})).status_code == 415
+                first = await patch(0, data[:cut])
+                assert first.status_code == 204 and first.headers["upload-offset"] == str(cut)
+
+                # A retried chunk is refused with the offset to resume from
+                retry = await patch(0, data[:cut])
+                assert retry.status_code == 409 and retry.headers["upload-offset"] == str(cut)
+                assert (await client.post(f"{location}/finalize")).status_code == 409
+                resume_at = int((await client.head(location)).headers["upload-offset"])
+
+                # The received prefix is scored while the rest is still missing
+                await uploads._early[location.rsplit("/", 1)[1]].task
+                early = (await client.get(location)).json()
+                assert 1 <= early["utterances_scored"] < 3
+
+                assert (await patch(resume_at, data[resume_at:])).status_code == 204
+                finished = await client.post(f"{location}/finalize")
+                assert finished.status_code == 200
+                assert (await client.get("/api/uploads")).json() == []
+
+                # Story recordings are handed to the job queue
+                story = silent_wav
+                created = await client.post("/api/uploads", json={"kind": "audio", "length": len(story),
+                                                                   "filename": "story.wav"})
+                location = created.headers["location"]
+                assert (await patch(0, story)).status_code == 204
+                queued = await client.post(f"{location}/finalize")
+                return early, finished.json()["result"], queued
+        finally:
+            await app.router.shutdown()
+
+    early, result, queued = asyncio.run(scenario())
+    speech = result["speech"]
+    assert speech["utterances_prescored"] == early["utterances_scored"]
+    assert [round(u["start"]) for u in speech["utterances"]] == [1, 5, 9]
+    assert queued.status_code == 202 and queued.json()["status"] == "queued"
+    assert os.listdir(tmp_path / "jobs") and not os.listdir(tmp_path / "resumable")
+
+
+def test_resumable_upload_finalize_is_serialized_and_expiry_cleans_up(tmp_path, monkeypatch, app, silent_wav):
+    import asyncio
+    import os
+    import httpx
+    from src.api import uploads
+    from src.api.auth import get_current_user
+    from src.config import settings
+    from src.database.models import User
+    from src.services.resumable_uploads import upload_store
+
+    for name, value in {"RESUMABLE_UPLOAD_DIR": str(tmp_path / "resumable"), "JOB_AUDIO_DIR": str(tmp_path / "jobs"),
+                        "RESUMABLE_EARLY_ANALYSIS": False}.items():
+        monkeypatch.setattr(settings, name, value)
+    story = silent_wav
+
+    async def scenario():
+        await app.router.startup()
+        try:
+            child = User(email="kid@example.com", username="kid", password_hash="x")
+            await child.insert()
+            monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: child)
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+                async def uploaded(kind="audio"):
+                    created = await client.post("/api/uploads", json={"kind": kind, "length": len(story),
+                                                                       "filename": "story.wav"})
+                    location = created.headers["location"]
+                    await client.patch(location, content=story, headers={
+                        "Content-Type": "application/offset+octet-stream", "Upload-Offset": "0"})
+                    return location
+
+                location = await uploaded()
+                twice = await asyncio.gather(client.post(f"{location}/finalize"), client.post(f"{location}/finalize"))
+                location = await uploaded()
+                raced = await asyncio.gather(client.post(f"{location}/finalize"), client.delete(location))
+                locks_left = dict(upload_store._locks)
+
+                # An expired upload goes with its early analysis and lock on the next create
+                monkeypatch.setattr(settings, "RESUMABLE_UPLOAD_TTL_SECONDS", -1)
+                expired_id = (await uploaded("video")).rsplit("/", 1)[1]
+                monkeypatch.setattr(settings, "RESUMABLE_UPLOAD_TTL_SECONDS", 3600)
+                early = uploads._early[expired_id] = uploads.EarlyAnalysis()
+                upload_store._locks[expired_id] = asyncio.Lock()
+                await uploaded()
+                return twice, raced, locks_left, early, expired_id
+        finally:
+            await app.router.shutdown()
+
+    twice, raced, locks_left, early, expired_id = asyncio.run(scenario())
+    assert sorted(r.status_code for r in twice) == [202, 404]
+    assert sorted(r.status_code for r in raced) in ([202, 404], [204, 404])
+    assert locks_left == {}
+    assert len(os.listdir(tmp_path / "jobs")) == 1 + (raced[0].status_code == 202)
+    assert expired_id not in uploads._early and expired_id not in upload_store._locks
+    assert early.cancel_token.cancelled
+    assert not os.path.exists(tmp_path / "resumable" / f"{expired_id}.part")
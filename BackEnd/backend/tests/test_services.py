@@ -1 +1,973 @@
-#backend\tests\test_models.py
\ No newline at end of file
+#backend\tests\test_services.py
+import numpy as np
+import pytest
+
+from src.utils.scoring_algorithms import ScoringAlgorithms
+from src.utils.batch_scoring import BatchScoringAlgorithms, pack_ragged, pack_frames
+
+
+def _random_pitch_clip(rng):
+    n = int(rng.integers(0, 120))
+    values = rng.normal(rng.uniform(90, 300), rng.uniform(0, 90), size=n)
+    values[rng.random(n) < rng.uniform(0, 0.9)] = np.nan
+    return values
+
+
+def _random_energy_clip(rng, dtype):
+    n = int(rng.integers(1, 400))
+    energy = np.abs(rng.normal(0.05, 0.04, size=n))
+    gaps = rng.random(n) < rng.uniform(0, 0.6)
+    energy[gaps] = rng.uniform(0, 0.004, size=int(gaps.sum()))
+    return energy.astype(dtype)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_pitch_scores_match_scalar(seed):
+    rng = np.random.default_rng(seed)
+    clips = [_random_pitch_clip(rng) for _ in range(200)]
+    voiced = rng.uniform(0, 1, size=len(clips))
+
+    values, offsets = pack_ragged(clips)
+    scores, analysis = BatchScoringAlgorithms.calculate_pitch_scores(values, offsets, voiced)
+
+    for i, clip in enumerate(clips):
+        expected_score, expected = ScoringAlgorithms.calculate_pitch_score(clip, voiced[i])
+        assert scores[i] == expected_score
+        for key, value in expected.items():
+            assert analysis[key][i] == value
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_batch_fluency_scores_match_scalar(seed, dtype):
+    rng = np.random.default_rng(seed)
+    clips = [_random_energy_clip(rng, dtype) for _ in range(200)]
+
+    energy, lengths = pack_frames(clips, dtype=dtype)
+    scores, analysis = BatchScoringAlgorithms.calculate_fluency_scores(energy, lengths, 16000)
+
+    for i, clip in enumerate(clips):
+        expected_score, expected = ScoringAlgorithms.calculate_fluency_score(clip, 16000)
+        assert scores[i] == expected_score
+        if "pause_count" in expected:
+            assert analysis["pause_count"][i] == expected["pause_count"]
+            assert analysis["silence_ratio"][i] == expected["silence_ratio"]
+            assert analysis["pauses_per_second"][i] == expected["pauses_per_second"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_pronunciation_and_overall_scores_match_scalar(seed):
+    rng = np.random.default_rng(seed)
+    clips = [rng.choice([0.0, 40.0, 75.0, 95.0, 100.0], size=int(rng.integers(0, 30))) * rng.uniform(0.5, 1.0)
+             for _ in range(200)]
+    confidence = np.where(rng.random(len(clips)) < 0.2, 0.0, rng.uniform(0, 1, size=len(clips)))
+
+    values, offsets = pack_ragged(clips)
+    pronunciation = BatchScoringAlgorithms.calculate_pronunciation_scores(values, offsets, confidence)
+
+    pitch = rng.integers(0, 101, size=len(clips))
+    fluency = rng.integers(0, 101, size=len(clips))
+    overall = BatchScoringAlgorithms.calculate_overall_scores(pronunciation, pitch, fluency, confidence)
+
+    for i, clip in enumerate(clips):
+        phoneme_scores = {str(j): {"score": float(s)} for j, s in enumerate(clip)}
+        expected = ScoringAlgorithms.calculate_pronunciation_score(phoneme_scores, confidence[i])
+        assert pronunciation[i] == expected
+        assert overall[i] == ScoringAlgorithms.calculate_overall_score(
+            expected, int(pitch[i]), int(fluency[i]), float(confidence[i])
+        )
+
+
+def test_alignment_maps_reference_positions():
+    from src.utils.alignment import align, MATCH, SUBSTITUTE, DELETE
+
+    alignment = align("banana", "bnaxa")
+    assert alignment.distance == 2
+    assert list(alignment.ref_ops) == [MATCH, DELETE, MATCH, MATCH, SUBSTITUTE, MATCH]
+    assert list(alignment.ref_to_hyp) == [0, -1, 1, 2, 3, 4]
+    assert align("", "abc").insertions == [0, 1, 2]
+    assert align("same", "same").similarity() == 1.0
+
+
+def test_phoneme_similarity_averages_repeated_characters():
+    scores = ScoringAlgorithms.calculate_phoneme_similarity(transcription="aba", reference="aaa")
+    assert scores == {"a": {"score": 76.7}}
+
+
+def test_phonetic_cost_tables_grade_substitutions():
+    from src.utils.phonetic_costs import get_cost_table
+
+    english = get_cost_table("english")
+    assert english.cost("p", "b") < english.cost("p", "s") < english.cost("p", "a")
+    assert english.cost("B", "b") == 0.0
+
+    # Characters outside the inventory match themselves, wherever they fall
+    assert english.cost("é", "é") == 0.0 and english.cost("é", "-") == 1.0
+    substitution = english.cost("a", "x")
+    for reference, hypothesis in (("é-ab", "é-xb"), ("ab-é", "xb-é"), ("aé-b", "xé-b")):
+        assert english.engine.align(reference, hypothesis).distance == substitution
+
+    hindi = get_cost_table("hi")
+    assert hindi.cost("ट", "त") < hindi.cost("क", "म")
+    assert hindi.cost("आ", "ा") < hindi.cost("आ", "ई")
+
+    scores = ScoringAlgorithms.calculate_phoneme_similarity(transcription="bat", reference="pat", language="en")
+    assert 40 < scores["p"]["score"] < 95
+
+
+def test_substituted_characters_score_above_omitted_ones():
+    from src.models.wav2vec2_model import Wav2Vec2SpeechModel
+    from src.utils.phonetic_costs import UNRELATED_COST
+
+    class TranscribedModel(Wav2Vec2SpeechModel):
+        def __init__(self):
+            pass
+
+    def vowel_report(heard):
+        result = TranscribedModel().analyze_pronunciation(
+            None, "cat", transcription_result={"text": heard, "confidence": 0.9})
+        return next(report for report in result["phoneme_reports"] if report["expected"] == "a")
+
+    omitted, unknown, related = vowel_report("ct"), vowel_report("c1t"), vowel_report("cit")
+    assert omitted["status"] == "omitted" and omitted["score"] == 0.0
+    assert unknown["status"] == "distorted" and unknown["score"] == round(1 - UNRELATED_COST, 2)
+    assert related["score"] > unknown["score"]
+
+
+def test_prepared_text_round_trips_and_is_cached():
+    from src.utils.text_normalization import prepare_text, get_prepared_target, PreparedText
+
+    prepared = prepare_text("Hello, World!", "en")
+    assert prepared.normalized == "hello world"
+    assert prepare_text("Hello, World!", "english") is prepared
+
+    stored = prepared.to_document()
+    assert PreparedText.from_document(stored) == prepared
+    assert get_prepared_target("Hello, World!", "english", stored) == prepared
+    # Exercise text or language edited without re-preparing the stored target
+    assert get_prepared_target("Hello, Moon!", "en", stored).normalized == "hello moon"
+    assert get_prepared_target("Hello, World!", "hi", stored).language == "hi"
+    assert PreparedText.from_document(dict(stored, version=0)) is None
+
+
+def test_grapheme_segmenter_keeps_aksharas_together():
+    from src.utils.grapheme_segmenter import segment
+    from src.utils.text_normalization import prepare_text
+
+    assert segment("அம்மா") == ("அ", "ம்", "மா")
+    assert segment("नमस्ते दुनिया") == ("न", "म", "स्ते", "दु", "नि", "या")
+    assert segment("ಕನ್ನಡ") == ("ಕ", "ನ್ನ", "ಡ")
+    assert segment("hi!") == ("h", "i", "!")
+
+    prepared = prepare_text("नमस्ते!", "hi")
+    assert prepared.normalized == "नमस्ते"
+    assert prepared.graphemes == ("न", "म", "स्ते")
+    assert prepared.unit_index == (0, 1, 2, 2, 2, 2)
+
+    scores = ScoringAlgorithms.calculate_phoneme_similarity(transcription="नमसते", reference="नमस्ते")
+    assert list(scores) == ["न", "म", "स्ते"]
+    assert scores["स्ते"]["score"] < scores["न"]["score"]
+
+
+def test_formant_extraction_recovers_resonances(synthetic_vowel):
+    from scipy.linalg import solve_toeplitz
+    from src.utils.feature_extractor import extract_formants, summarize_formants, levinson_durbin
+
+    rng = np.random.default_rng(0)
+    frames = rng.normal(size=(4, 400))
+    autocorr = np.stack([np.correlate(f, f, "full")[399:410] for f in frames])
+    coeffs, _ = levinson_durbin(autocorr, 10)
+    for i in range(4):
+        np.testing.assert_allclose(-coeffs[i, 1:], solve_toeplitz(autocorr[i, :10], autocorr[i, 1:11]), atol=1e-9)
+
+    summary = summarize_formants(extract_formants(synthetic_vowel([700, 1220, 2600])))
+    for name, expected in (("f1", 700), ("f2", 1220), ("f3", 2600)):
+        assert abs(summary[name]["median"] - expected) < 0.05 * expected
+
+    assert summarize_formants(extract_formants(np.zeros(16000))) is None
+
+
+def test_series_codec_round_trips_contours():
+    from src.utils.series_codec import (
+        encode_series, decode_series, pack_varints, unpack_varints,
+        pack_pitch_analysis, unpack_pitch_analysis
+    )
+
+    values = np.array([0, 1, 127, 128, 16383, 16384, 2**63 - 1], dtype=np.uint64)
+    assert (unpack_varints(pack_varints(values)) == values).all()
+
+    rng = np.random.default_rng(0)
+    contour = 150 + 20 * np.sin(np.linspace(0, 6, 300)) + rng.normal(0, 2, 300)
+    contour[rng.random(300) < 0.3] = 0
+    contour = contour.tolist()
+
+    decoded = decode_series(encode_series(contour))
+    assert [v == 0 for v in decoded] == [v == 0 for v in contour]
+    # Half a cent of quantization plus rounding to 0.01 Hz
+    np.testing.assert_allclose(decoded, contour, rtol=4e-4)
+    assert decode_series(encode_series([])) == []
+
+    analysis = {"score": 80, "mean_pitch": 150.0, "pitch_contour": contour}
+    packed = pack_pitch_analysis(analysis)
+    assert len(packed["pitch_contour"]) < 2 * len(contour)
+    assert unpack_pitch_analysis(packed)["pitch_contour"] == decoded
+    # Sessions stored before the codec still decode
+    assert unpack_pitch_analysis(analysis) == analysis
+
+
+def test_signal_quality_gate_flags_unusable_clips(synthetic_vowel):
+    from src.utils.signal_quality import assess_signal_quality
+
+    rng = np.random.default_rng(0)
+    sr = 16000
+    t = np.arange(sr) / sr
+    speech = 0.5 * np.sin(2 * np.pi * 220 * t) * (t > 0.3) * (t < 0.8)
+    floor = rng.normal(0, 0.001, sr)
+
+    good = assess_signal_quality(speech + floor, sr)
+    assert good["passed"], good
+    assert good["metrics"]["snr_db"] > 30
+
+    assert assess_signal_quality(floor, sr)["issues"] == ["too_short"]
+    assert assess_signal_quality(speech + rng.normal(0, 0.3, sr), sr)["issues"] == ["too_noisy"]
+    assert "clipped" in assess_signal_quality(np.clip(speech * 4, -1, 1) + floor, sr)["issues"]
+    assert "dc_offset" in assess_signal_quality(speech + floor + 0.3, sr)["issues"]
+
+    # Clean speech trimmed to the word has no quiet frames, but is no noise
+    syllables = 0.8 + 0.2 * np.sin(2 * np.pi * 4 * t)
+    voiced = 0.5 * syllables * synthetic_vowel([700, 1220, 2600]) + rng.normal(0, 1e-4, sr)
+    trimmed = assess_signal_quality(voiced, sr)
+    assert trimmed["passed"], trimmed
+    assert trimmed["metrics"]["speech_duration"] > 0.9
+
+
+def test_analysis_executor_bounds_queue_and_times_out():
+    import asyncio
+    import time
+    from src.services.analysis_executor import AnalysisExecutor, ExecutorOverloadedError, AnalysisTimeoutError
+
+    async def scenario():
+        executor = AnalysisExecutor(max_workers=1, max_queue=1, default_timeout=5)
+        executor.start()
+
+        # The loop stays responsive while work runs on the pool
+        slow = asyncio.create_task(executor.run(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        assert executor.stats()["active"] == 1
+
+        waiting = asyncio.create_task(executor.run(sum, [1, 2]))
+        await asyncio.sleep(0.01)
+        assert executor.stats()["queued"] == 1
+        with pytest.raises(ExecutorOverloadedError):
+            await executor.run(sum, [3])
+
+        await slow
+        assert await waiting == 3
+
+        with pytest.raises(AnalysisTimeoutError):
+            await executor.run(time.sleep, 0.2, timeout=0.01)
+
+        await executor.shutdown()
+        return executor.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["completed"] == 3 and stats["rejected"] == 1 and stats["timed_out"] == 1
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_job_queue_claims_in_order_and_reclaims_expired_leases(tmp_path, monkeypatch):
+    import asyncio
+    import time
+    from datetime import datetime, timedelta
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from beanie import init_beanie
+    from src.config import settings
+    from src.database.models import AnalysisJob, Exercise, JobStatus, Session, Progress
+    from src.services import job_queue
+    from src.services.analysis_executor import ExecutorOverloadedError
+    from src.services.job_queue import enqueue_job, claim_next_job, finish_job, renew_lease, process_job, JobWorker
+    from src.services.session_service import record_session
+
+    analysis = {"success": True, "overall_score": 80, "pronunciation_score": 80, "fluency_score": 70,
+                "pitch_analysis": {"score": 75}, "mispronounced_phonemes": [], "feedback": "Good",
+                "suggestions": [], "signal_quality": {"duration": 1.0}}
+
+    class SlowAnalyzer:
+        def analyze_audio(self, audio_path, reference_text, language=None, prepared_target=None, cancel_token=None):
+            time.sleep(0.5)  # longer than the lease below
+            return dict(analysis)
+
+    async def scenario():
+        client = mongomock_motor.AsyncMongoMockClient()
+        await init_beanie(database=client["jobs_test"], document_models=[AnalysisJob, Exercise, Session, Progress])
+
+        first = await enqueue_job("u1", None, "a.wav")
+        second = await enqueue_job("u1", None, "b.wav")
+
+        claimed = await claim_next_job("w1")
+        assert claimed.id == first.id and claimed.status == JobStatus.RUNNING and claimed.attempts == 1
+        assert (await claim_next_job("w2")).id == second.id
+        assert await claim_next_job("w3") is None
+
+        # A worker died: its lease expires and another worker takes over
+        await AnalysisJob.get_motor_collection().update_one(
+            {"_id": first.id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+        reclaimed = await claim_next_job("w3")
+        assert reclaimed.id == first.id and reclaimed.worker_id == "w3" and reclaimed.attempts == 2
+
+        # ... and the stale worker can no longer touch it
+        assert not await renew_lease(claimed)
+        assert not await finish_job(claimed, JobStatus.FAILED, error="stale")
+        assert (await AnalysisJob.get(first.id)).status == JobStatus.RUNNING and await renew_lease(reclaimed)
+
+        # A job running longer than its lease keeps it through the heartbeat
+        monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 0.15)
+        audio_path = tmp_path / "c.wav"
+        audio_path.write_bytes(b"")
+        job = await enqueue_job("u1", None, str(audio_path))
+        job = await claim_next_job("w4")
+        running = asyncio.create_task(process_job(job, SlowAnalyzer()))
+        await asyncio.sleep(0.3)
+        assert await claim_next_job("w5") is None
+        await running
+        done = await AnalysisJob.get(job.id)
+        assert done.status == JobStatus.COMPLETED and done.session_id == str(job.id)
+
+        # Recording the same job again (retry after a late failure) reuses its session
+        again = await record_session("u1", None, str(audio_path), dict(analysis),
+                                     session_id=str(job.id), job_id=str(job.id))
+        assert str(again.id) == done.session_id and await Session.find_all().count() == 1
+
+        # A full executor defers the job without using up its attempts
+        monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 300.0)
+        for name, value in {"JOB_POLL_INTERVAL": 0.01, "JOB_OVERLOAD_RETRY_SECONDS": 0.05,
+                            "JOB_RETRY_BACKOFF_SECONDS": 60.0}.items():
+            monkeypatch.setattr(settings, name, value)
+        await AnalysisJob.get_motor_collection().update_many({}, {"$set": {"status": JobStatus.COMPLETED.value}})
+        busy = await enqueue_job("u1", None, str(audio_path))
+
+        async def overloaded(*args, **kwargs):
+            raise ExecutorOverloadedError("Too many analyses in progress, please retry shortly")
+
+        monkeypatch.setattr(job_queue.analysis_executor, "run", overloaded)
+        worker = JobWorker(SlowAnalyzer(), "w6")
+        working = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.5)
+        deferred = await AnalysisJob.get(busy.id)
+        assert deferred.status == JobStatus.QUEUED and deferred.attempts == 0
+
+        # Other failures count and back off exponentially
+        async def broken(*args, **kwargs):
+            raise RuntimeError("database hiccup")
+
+        monkeypatch.setattr(job_queue.analysis_executor, "run", broken)
+        await asyncio.sleep(0.2)
+        worker.stop()
+        await working
+        failed_once = await AnalysisJob.get(busy.id)
+        assert failed_once.status == JobStatus.QUEUED and failed_once.attempts == 1
+        assert failed_once.not_before > datetime.utcnow() + timedelta(seconds=50)
+        assert await claim_next_job("w7") is None
+        assert job_queue.retry_delay(2) == 120.0 and job_queue.retry_delay(10) == settings.JOB_RETRY_BACKOFF_MAX
+
+    asyncio.run(scenario())
+
+
+def test_analysis_pipeline_runs_independent_branches_concurrently():
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from src.services.analysis_pipeline import AnalysisPipeline, Stage
+
+    def slow(name):
+        def run(ctx):
+            time.sleep(0.2)
+            return f"{name}:{ctx['audio']}"
+        return run
+
+    pipeline = AnalysisPipeline([
+        Stage("merge", lambda ctx: (ctx["a"], ctx["b"], ctx["c"]), deps=["a", "b", "c"]),
+        Stage("a", slow("a"), deps=["audio"]),
+        Stage("b", slow("b"), deps=["audio"]),
+        Stage("c", slow("c"), deps=["audio"]),
+    ])
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        start = time.perf_counter()
+        results, timings = pipeline.run({"audio": "x"}, pool=pool)
+        elapsed = time.perf_counter() - start
+
+    assert results["merge"] == ("a:x", "b:x", "c:x")
+    assert set(timings) == {"a", "b", "c", "merge"}
+    assert elapsed < 0.5
+
+    with pytest.raises(ValueError):
+        AnalysisPipeline([Stage("a", slow("a"), deps=["missing"])]).run({})
+
+
+def test_load_shedding_degrades_and_skips_optional_stages():
+    from types import SimpleNamespace
+    from src.services.analysis_pipeline import AnalysisPipeline, Stage
+    from src.services.load_shedding import LoadShedder
+
+    pipeline = AnalysisPipeline([
+        Stage("pronunciation", lambda ctx: "full", deps=["audio"]),
+        Stage("pitch", lambda ctx: "pyin", deps=["audio"], essential=False, degraded=lambda ctx: "yin"),
+        Stage("formants", lambda ctx: "lpc", deps=["audio"], essential=False),
+        Stage("scoring", lambda ctx: (ctx["pronunciation"], ctx["pitch"], ctx["formants"]),
+              deps=["pronunciation", "pitch", "formants"]),
+    ])
+    results, timings = pipeline.run({"audio": "x"}, shed=True)
+    assert results["scoring"] == ("full", "yin", None)
+    assert results["degraded_stages"] == ["pitch"] and results["skipped_stages"] == ["formants"]
+    assert "formants" not in timings
+
+    results, _ = pipeline.run({"audio": "x"})
+    assert results["scoring"] == ("full", "pyin", "lpc") and not results["skipped_stages"]
+
+    executor = SimpleNamespace(queued=0, latency_percentile=lambda p: None)
+    shedder = LoadShedder(executor, queue_depth=2, latency_slo=5.0)
+    assert not shedder.should_shed()
+    executor.queued = 2
+    assert shedder.should_shed()
+    executor.queued, executor.latency_percentile = 0, lambda p: 6.0
+    assert shedder.should_shed() and shedder.stats()["shed_count"] == 2
+
+    # Called from executor worker threads: no increment is lost
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: [shedder.should_shed() for _ in range(2000)], range(8)))
+    assert shedder.stats()["shed_count"] == 2 + 8 * 2000
+
+
+def test_cancellation_stops_pipeline_and_abandoned_requests():
+    import asyncio
+    import time
+    from src.services.analysis_pipeline import AnalysisPipeline, Stage
+    from src.services.analysis_executor import AnalysisExecutor
+    from src.services.cancellation import (
+        CancellationToken, AnalysisCancelledError, ClientDisconnectedError, run_until_disconnected
+    )
+
+    ran = []
+
+    def first(ctx):
+        ran.append("first")
+        ctx["cancel_token"].cancel("client disconnected")
+        return 1
+
+    pipeline = AnalysisPipeline([
+        Stage("first", first, deps=["audio"]),
+        Stage("second", lambda ctx: ran.append("second"), deps=["first"]),
+    ])
+    with pytest.raises(AnalysisCancelledError):
+        pipeline.run({"audio": "x"}, cancel_token=CancellationToken())
+    assert ran == ["first"]
+
+    class DisconnectingRequest:
+        def __init__(self):
+            self.polls = 0
+
+        async def is_disconnected(self):
+            self.polls += 1
+            return self.polls >= 2
+
+    def analysis(cancel_token=None):
+        # Worker-side checkpoint loop
+        for _ in range(100):
+            cancel_token.raise_if_cancelled()
+            time.sleep(0.01)
+        return "finished"
+
+    async def scenario():
+        executor = AnalysisExecutor(max_workers=1, max_queue=2, default_timeout=5)
+        token = CancellationToken()
+        with pytest.raises(ClientDisconnectedError):
+            await run_until_disconnected(
+                DisconnectingRequest(), executor.run(analysis, cancel_token=token), token, poll_interval=0.05
+            )
+        assert token.cancelled
+        await executor.shutdown()
+        assert executor.failed == 1 and executor.completed == 0
+
+        # A request abandoned while queued is never dispatched
+        executor = AnalysisExecutor(max_workers=1, max_queue=2, default_timeout=5)
+        with pytest.raises(AnalysisCancelledError):
+            await executor.run(analysis, cancel_token=token)
+        assert executor.active == 0
+        await executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_idempotency_keys_replay_wait_and_release(tmp_path, monkeypatch):
+    import asyncio
+    from datetime import datetime, timedelta
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from beanie import init_beanie
+    from src.config import settings
+    from src.database.models import IdempotencyRecord
+    from src.services.idempotency import (
+        claim_key, request_fingerprint, IdempotencyKeyMismatchError, IdempotencyInProgressError
+    )
+
+    async def scenario():
+        client = mongomock_motor.AsyncMongoMockClient()
+        await init_beanie(database=client["idempotency_test"], document_models=[IdempotencyRecord])
+        fingerprint = request_fingerprint("ex1", b"audio")
+
+        # A concurrent duplicate waits for the owner's response
+        claim, stored = await claim_key("u1", "k1", fingerprint)
+        assert claim is not None and stored is None
+        duplicate = asyncio.create_task(claim_key("u1", "k1", fingerprint))
+        await asyncio.sleep(0.05)
+        assert not duplicate.done()
+        await claim.complete(200, {"session_id": "s1"})
+        claim2, stored = await duplicate
+        assert claim2 is None and stored.status_code == 200 and stored.response == {"session_id": "s1"}
+
+        # Same key for a different payload, or for another user
+        with pytest.raises(IdempotencyKeyMismatchError):
+            await claim_key("u1", "k1", request_fingerprint("ex1", b"other"))
+        assert (await claim_key("u2", "k1", fingerprint))[0] is not None
+
+        # A released (failed) request runs again; a dead owner is taken over
+        claim, _ = await claim_key("u1", "k2", fingerprint)
+        with pytest.raises(IdempotencyInProgressError):
+            await claim_key("u1", "k2", fingerprint, wait_seconds=0.05)
+        await claim.release()
+        claim, _ = await claim_key("u1", "k2", fingerprint)
+        assert claim is not None
+        claim.record.locked_until = datetime.utcnow() - timedelta(seconds=1)
+        await claim.record.save()
+        takeover, stored = await claim_key("u1", "k2", fingerprint, wait_seconds=0)
+        assert takeover is not None and takeover.record.id == claim.record.id
+
+        # The slow original can no longer record, release or complete
+        with pytest.raises(IdempotencyInProgressError):
+            await claim.reserve_session()
+        await claim.release()
+        await claim.complete(200, {"session_id": "stale"})
+        assert (await IdempotencyRecord.get(takeover.record.id)).owner == takeover.record.owner
+
+        # Failing after the session was recorded unlocks the key; the retry reuses the session id
+        session_id = await takeover.reserve_session()
+        await takeover.release()
+        retry, _ = await claim_key("u1", "k2", fingerprint, wait_seconds=0)
+        assert await retry.reserve_session() == session_id
+
+        # An owner queued or running past the lock length keeps the key: duplicates wait
+        monkeypatch.setattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 0.15)
+        slow, _ = await claim_key("u1", "k3", fingerprint)
+        await asyncio.sleep(0.5)
+        with pytest.raises(IdempotencyInProgressError):
+            await claim_key("u1", "k3", fingerprint, wait_seconds=0.05)
+        await slow.reserve_session()
+        await slow.complete(200, {"session_id": "s3"})
+        assert (await claim_key("u1", "k3", fingerprint))[1].response == {"session_id": "s3"}
+
+    asyncio.run(scenario())
+
+    # Uploads are hashed from the file, in chunks
+    upload = tmp_path / "clip.wav"
+    upload.write_bytes(b"audio" * 300000)
+    with open(upload, "rb") as f:
+        assert request_fingerprint("ex1", f) == request_fingerprint("ex1", upload.read_bytes())
+
+
+def test_batch_analysis_transcribes_clips_in_model_batches(tmp_path, synthetic_vowel):
+    import soundfile as sf
+    from src.models.wav2vec2_model import Wav2Vec2SpeechModel
+    from src.services.speech_analyzer import SpeechAnalyzer
+
+    class FakeModel(Wav2Vec2SpeechModel):
+        def __init__(self):
+            self.batches = []
+
+        def transcribe_batch(self, audios, sample_rate=16000, batch_size=8, cancel_tokens=None):
+            self.batches.append(len(audios))
+            return [{"text": "cat", "confidence": 0.9} for _ in audios]
+
+        def transcribe(self, *args, **kwargs):
+            raise AssertionError("clips must not be transcribed one by one")
+
+    rng = np.random.default_rng(0)
+    pause = 0.001 * rng.standard_normal(4800)
+    voiced = np.concatenate([pause, 0.6 * synthetic_vowel([700, 1220, 2600]), pause])
+    silent = 0.001 * rng.standard_normal(16000)
+    paths = []
+    for name, signal in (("a", voiced), ("b", silent), ("c", voiced)):
+        path = tmp_path / f"{name}.wav"
+        sf.write(path, signal, 16000)
+        paths.append(str(path))
+
+    analyzer = SpeechAnalyzer()
+    analyzer.model_wrapper = FakeModel()
+    run_pipeline = analyzer._run_pipeline
+
+    def overlapping_stages(*args, timings=None, **kwargs):
+        result = run_pipeline(*args, timings=timings, **kwargs)
+        # Concurrent branches: stage times add up to more than the wall time
+        timings.update({"pitch": 5.0, "formants": 5.0})
+        return result
+
+    analyzer._run_pipeline = overlapping_stages
+    results = analyzer.analyze_batch(
+        [{"audio_path": path, "reference_text": text, "language": "english"}
+         for path, text in zip(paths, ("cat", "cat", "cut"))],
+        shed=True
+    )
+
+    # The silent clip is rejected before inference; the others share one batch
+    assert analyzer.model_wrapper.batches == [2]
+    assert results[1]["needs_rerecord"]
+    assert results[0]["transcription"] == "cat" and results[0]["pronunciation_score"] > results[2]["pronunciation_score"]
+    assert results[0]["skipped_stages"] == ["formants", "features"]
+    # Clip totals are wall time, not the sum of overlapping stages
+    assert 0 < results[0]["timings"]["total"] < 5.0
+
+
+def test_reanalysis_cli_updates_scores_and_resumes(tmp_path, monkeypatch):
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from beanie import init_beanie
+    from src.database.models import Session, Exercise
+    import reanalyze_sessions
+
+    def fake_chunk(clips):
+        return [{"error": "noisy"} if "bad" in clip["audio_path"] else
+                {"overall_score": 90.0, "pronunciation_score": 90.0, "pitch_score": 80.0}
+                for clip in clips]
+
+    monkeypatch.setattr(reanalyze_sessions, "_analyze_chunk", fake_chunk)
+    for name in ("a.wav", "b.wav", "bad.wav"):
+        (tmp_path / name).write_bytes(b"RIFF")
+
+    async def scenario():
+        client = mongomock_motor.AsyncMongoMockClient()
+        await init_beanie(database=client["reanalysis_test"], document_models=[Session, Exercise])
+        for name in ("a.wav", "missing.wav", "b.wav", "bad.wav"):
+            await Session(user_id="u1", audio_url=f"/uploads/{name}", overall_score=50.0,
+                          pronunciation_score=50.0, is_completed=True).insert()
+
+        checkpoint = str(tmp_path / "checkpoint.json")
+        args = reanalyze_sessions.parse_args([
+            "--audio-dir", str(tmp_path), "--checkpoint", checkpoint, "--batch-size", "2", "--workers", "1"
+        ])
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            dry = reanalyze_sessions.Reanalysis(reanalyze_sessions.parse_args(
+                ["--audio-dir", str(tmp_path), "--dry-run", "--checkpoint", checkpoint]))
+            await dry.run(pool)
+            assert dry.checkpoint["updated"] == 2 and await Session.find(Session.overall_score == 90.0).count() == 0
+
+            first = reanalyze_sessions.Reanalysis(args)
+            await first.run(pool)
+            assert first.checkpoint["processed"] == 4 and first.checkpoint["updated"] == 2
+            assert first.checkpoint["failed"] == 1 and first.checkpoint["missing_audio"] == 1
+
+            # Resuming from the checkpoint finds nothing left to do
+            resumed = reanalyze_sessions.Reanalysis(args)
+            await resumed.run(pool)
+            assert resumed.total == 0
+
+        updated = await Session.find(Session.overall_score == 90.0).to_list()
+        assert len(updated) == 2 and all(s.reanalyzed_at for s in updated)
+
+    asyncio.run(scenario())
+
+
+def test_metrics_registry_renders_prometheus_text():
+    from functools import lru_cache
+    from src.utils.metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    stages = registry.histogram("stage_seconds", "Stage time", ["stage"], buckets=(0.1, 1.0))
+    requests = registry.counter("requests_total", "Requests", ["route"])
+    for seconds in (0.05, 0.5, 3.0):
+        stages.observe(seconds, stage="pitch")
+    with stages.time(stage="decode"):
+        pass
+    requests.inc(route='/a"b')
+
+    @lru_cache(maxsize=4)
+    def square(x):
+        return x * x
+
+    square(2), square(2), square(3)
+    registry.register_collector(lambda: [
+        ("cache_hits_total", "counter", "Hits", [({"cache": "square"}, square.cache_info().hits)])
+    ])
+
+    lines = registry.render().splitlines()
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="pitch",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="pitch",le="1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="pitch",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="pitch"} 3.55' in lines
+    assert 'stage_seconds_count{stage="decode"} 1' in lines
+    assert 'requests_total{route="/a\\"b"} 1' in lines
+    assert 'cache_hits_total{cache="square"} 1' in lines
+
+    with pytest.raises(ValueError):
+        stages.observe(1.0, route="x")
+    with pytest.raises(ValueError):
+        registry.counter("stage_seconds", "clash")
+
+
+def test_load_test_mode_is_deterministic_and_sleeps_stage_latencies(tmp_path, monkeypatch):
+    from src.services.speech_analyzer import SpeechAnalyzer
+    from src.services.synthetic_load import DEGRADED_LATENCY_FACTOR
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "LOAD_TEST_MODE", True)
+    monkeypatch.setattr(settings, "LOAD_TEST_SEED", 7)
+    # Only pitch takes time: 0.2 s full, DEGRADED_LATENCY_FACTOR of it when shed
+    latencies = {stage: 0.0 for stage in ("decode", "quality_gate", "pronunciation", "fluency",
+                                          "formants", "features", "scoring")}
+    latencies["pitch"] = [0.2, 0.0]
+    monkeypatch.setattr(settings, "LOAD_TEST_STAGE_LATENCIES", latencies)
+    clip = tmp_path / "clip.wav"
+    clip.write_bytes(b"RIFF-synthetic-clip")
+    analyzer = SpeechAnalyzer()
+
+    def run(**kwargs):
+        result = analyzer.analyze_audio(str(clip), "rabbit", **kwargs)
+        return result, result.pop("timings")
+
+    first, timings = run(shed=False)
+    second, _ = run(shed=False)
+    assert first == second and first["is_mock"]
+    assert timings["pitch"] >= 0.2 and 1.5 <= timings["clip_duration"] <= 6.0
+
+    monkeypatch.setattr(settings, "LOAD_TEST_SEED", 8)
+    assert run(shed=False)[0] != first
+
+    shed, shed_timings = run(shed=True)
+    assert shed["degraded_stages"] == ["pitch"] and shed["skipped_stages"] == ["formants", "features"]
+    assert 0.2 * DEGRADED_LATENCY_FACTOR <= shed_timings["pitch"] < 0.2
+
+
+def test_benchmark_fixtures_are_reproducible_and_regressions_flagged():
+    import benchmark_stages
+    from src.services.speech_analyzer import SpeechAnalyzer
+
+    clip = benchmark_stages.synthesize_clip(2.0, seed=3)
+    assert clip.dtype == np.float32 and len(clip) == 32000
+    assert np.array_equal(clip, benchmark_stages.synthesize_clip(2.0, seed=3))
+    assert not np.array_equal(clip, benchmark_stages.synthesize_clip(2.0, seed=4))
+    # Leading 10% is silence (noise floor only), the glide after it is voiced
+    assert np.sqrt(np.mean(clip[:3000] ** 2)) < 0.01 < np.sqrt(np.mean(clip[4000:8000] ** 2))
+
+    analyzer = SpeechAnalyzer()
+    assert analyzer.check_signal_quality(clip)["passed"]
+    assert 110 < analyzer.analyze_pitch(clip, fast=True)["mean_pitch"] < 230
+
+    baseline = {"results": {"a": {"median_ms": 1.0}, "b": {"median_ms": 1.0}, "c": {"median_ms": 0.01}}}
+    report = {"results": {"a": {"median_ms": 1.5}, "b": {"median_ms": 0.5}, "c": {"median_ms": 0.05},
+                          "new": {"median_ms": 1.0}}}
+    rows = {row["name"]: row["status"] for row in benchmark_stages.compare(report, baseline)}
+    assert rows == {"a": "regression", "b": "improvement", "c": "ok"}
+
+
+def test_cprofile_session_survives_a_busy_profiling_hook(tmp_path, monkeypatch):
+    import cProfile
+    from src.config import settings
+    from src.utils import profiler
+
+    class BusyProfile(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiler.cProfile, "Profile", BusyProfile)
+    session = profiler.ProfileSession("cprofile", "busy")
+    session.start()
+    assert session.run_profiled(sum, [1, 2, 3]) == 6
+    session.stop()
+    assert session.save({})["threads_profiled"] == 0
+
+
+def test_video_analysis_samples_frames_and_summarizes_engagement(tmp_path, monkeypatch, write_test_video):
+    av = pytest.importorskip("av")
+    from src.config import settings
+    from src.services.video_analyzer import VideoAnalyzer, FrameStats, summarize_frames
+    from src.utils.video_decoder import iter_sampled_frames, probe_video
+
+    # 6 s, 25 fps, 640x480 with a bar sweeping across (motion, no faces)
+    path = write_test_video(str(tmp_path / "session.mp4"), seconds=6)
+
+    info = probe_video(path)
+    assert info.duration == pytest.approx(6.0, abs=0.1) and not info.has_audio
+    frames = list(iter_sampled_frames(path, fps=2.0, max_side=160, max_frames=100, info=info))
+    times = [t for t, _ in frames]
+    assert len(frames) == 12 and times == sorted(times) and times[0] < 0.5
+    assert all(frame.shape == (120, 160) and frame.dtype == np.uint8 for _, frame in frames)
+    # Long videos are sampled sparser
+    assert len(list(iter_sampled_frames(path, fps=25.0, max_side=160, max_frames=5, info=info))) == 5
+
+    monkeypatch.setattr(settings, "VIDEO_FRAME_WORKERS", 0)
+    monkeypatch.setattr(settings, "VIDEO_FRAME_BATCH", 4)
+    result = VideoAnalyzer().analyze_video(path)
+    assert result["success"] and result["is_mock"] is False
+    assert result["video"]["frames_analyzed"] == int(6.0 * settings.VIDEO_SAMPLE_FPS)
+    assert result["emotion_detected"] == "Neutral" and result["accuracy_trend"]
+
+    # Summary from per-frame features: centred face half the time, alternating
+    stats = FrameStats()
+    timestamps = list(np.arange(40) * 0.5)
+    present = (np.arange(40) // 10) % 2 == 0
+    boxes = np.where(present[:, None], [[140, 60, 40, 40]], np.nan)
+    stats.add(timestamps, {"motion": np.full(40, 1.0), "faces": present.astype(int), "face_box": boxes})
+    metrics = summarize_frames(stats, (320, 240), 20.0)
+    assert metrics["eye_contact_score"] == 50 and metrics["attention"] == "Fluctuating"
+    assert metrics["posture_score"] >= 90 and metrics["activity"] == "Speaking practice"
+    assert [point["accuracy"] for point in metrics["timeline"]] == [100, 0, 100, 0]
+
+
+def test_video_audio_track_is_scored_per_utterance(tmp_path, monkeypatch, synthetic_vowel, write_test_video):
+    pytest.importorskip("av")
+    from src.config import settings
+    from src.models.wav2vec2_model import Wav2Vec2SpeechModel
+    from src.services.load_shedding import load_shedder
+    from src.services.video_analyzer import VideoAnalyzer
+    from src.utils.video_decoder import decode_audio_track
+
+    class FakeModel(Wav2Vec2SpeechModel):
+        def __init__(self):
+            self.batches = []
+
+        def transcribe_batch(self, audios, sample_rate=16000, batch_size=8, cancel_tokens=None):
+            self.batches.append(len(audios))
+            # First attempt is wrong, the later ones right
+            return [{"text": "cut" if i == 0 else "cat", "confidence": 0.9} for i in range(len(audios))]
+
+    # Three attempts at 1 s, 8 s and 15 s of an 18 s session
+    rng = np.random.default_rng(0)
+    audio = 0.001 * rng.standard_normal(18 * 16000)
+    for start in (1, 8, 15):
+        audio[start * 16000:(start + 1) * 16000] += 0.6 * synthetic_vowel([700, 1220, 2600])
+    path = write_test_video(str(tmp_path / "session.mp4"), seconds=18, size=(320, 240), audio=audio)
+
+    track = decode_audio_track(path)
+    assert track.dtype == np.float32 and abs(len(track) - len(audio)) < 0.1 * 16000
+
+    monkeypatch.setattr(settings, "VIDEO_FRAME_WORKERS", 0)
+    analyzer = VideoAnalyzer()
+    analyzer.speech_analyzer.model_wrapper = FakeModel()
+    monkeypatch.setattr(load_shedder, "should_shed", lambda: True)  # skip optional stages
+    result = analyzer.analyze_video(path, reference_text="cat", language="english")
+
+    # One batched forward pass for all utterances
+    assert analyzer.speech_analyzer.model_wrapper.batches == [3]
+    speech = result["speech"]
+    assert [round(u["start"]) for u in speech["utterances"]] == [1, 8, 15]
+    assert [u["transcription"] for u in speech["utterances"]] == ["cut", "cat", "cat"]
+
+    # Trend and mastery come from the speech scores, not the frames
+    trend = [point["accuracy"] for point in result["accuracy_trend"]]
+    assert len(trend) == 3 and trend[0] < trend[1] == trend[2]
+    mastery = {entry["phoneme"]: entry for entry in result["phoneme_mastery"]}
+    assert set(mastery) == {"/c/", "/a/", "/t/"}
+    assert mastery["/a/"]["score"] < mastery["/t/"]["score"]
+
+
+def test_lip_motion_tracks_speech_energy():
+    from src.services.video_analyzer import VideoAnalyzer
+    from src.utils.av_sync import lip_audio_sync, rms_envelope, summarize_sync
+    from src.utils.frame_features import analyze_frame_batch, mouth_motion
+
+    # 12 fps, 10 s; the mouth region flickers in 1 s bursts starting every 2 s
+    fps, n = 12, 120
+    rng = np.random.default_rng(0)
+    frames = np.repeat(rng.integers(0, 255, (1, 120, 160), dtype=np.uint8), n, axis=0)
+    speaking = (np.arange(n) // fps) % 2 == 0
+    for i in np.flatnonzero(speaking):
+        frames[i, 72:96, 60:100] = rng.integers(0, 255, (24, 40))
+    boxes = np.tile([40.0, 20.0, 80.0, 80.0], (n, 1))
+    boxes[100:] = np.nan
+
+    lips = mouth_motion(frames, boxes)
+    assert np.isnan(lips[100:]).all()
+    # Still mouth in pauses, apart from the first frame after each burst
+    assert lips[1:100][speaking[1:100]].min() > 20
+    assert np.flatnonzero(lips[:100][~speaking[:100]] > 20).size == 4
+
+    # Oversampled batch: faces on every 3rd frame, lip motion on all
+    features = analyze_frame_batch(frames[:48], frames[:3], detect_every=3)
+    assert len(features["faces"]) == 16 and len(features["mouth_motion"]) == 48
+
+    sr = 16000
+    times = (np.arange(n) + 0.5) / fps
+    t = np.arange(10 * sr) / sr
+    voiced = (t.astype(int) % 2 == 0)
+    audio = 0.001 * rng.standard_normal(len(t)) + voiced * 0.5 * np.sin(2 * np.pi * 220 * t)
+    envelope = rms_envelope(audio, sr, times, 1 / fps)
+    synced = lip_audio_sync(lips, envelope, fps)
+    assert synced["av_sync_score"] > 80 and abs(synced["av_lag_seconds"]) <= 1 / fps
+    assert synced["articulation_score"] == 100 and synced["mouth_samples"] == 100
+
+    # Lips that move during the pauses instead: out of sync, no effort while speaking
+    shifted = lip_audio_sync(np.roll(lips, fps), envelope, fps)
+    assert shifted["av_sync_score"] < 20 and shifted["articulation_score"] == 0
+    assert lip_audio_sync(np.full(n, np.nan), envelope, fps)["av_sync_score"] is None
+    # The rate comes from the timestamps, whatever grid the frames were sampled on
+    assert summarize_sync(times, lips, audio, sr) == synced
+    thinned = summarize_sync(times[::2], lips[::2], audio, sr)
+    assert thinned == lip_audio_sync(lips[::2], rms_envelope(audio, sr, times[::2], 2 / fps), fps / 2)
+
+    areas = VideoAnalyzer(speech_analyzer=object())._analyze_improvement_areas({
+        "eye_contact_score": 90, "interaction_score": 90, "attention": "High",
+        "articulation_score": 10, "av_sync_score": 15
+    })
+    assert areas[0] == "Lip rounding for 'o' and 'u' sounds" and "Moving the lips together with the sounds" in areas
+
+    # Good scores everywhere: the filler tips are the same every time
+    good = {"eye_contact_score": 90, "interaction_score": 90, "attention": "High"}
+    assert VideoAnalyzer(speech_analyzer=object())._analyze_improvement_areas(good) == [
+        "Clarity of consonant clusters", "Completing sentences without rushing"
+    ]
+
+
+def test_utterances_scored_early_and_after_upload_leave_no_gap(monkeypatch, synthetic_vowel):
+    from src.models.wav2vec2_model import Wav2Vec2SpeechModel
+    from src.services.load_shedding import load_shedder
+    from src.services.speech_analyzer import SpeechAnalyzer
+
+    class FakeModel(Wav2Vec2SpeechModel):
+        def __init__(self):
+            pass
+
+        def transcribe_batch(self, audios, sample_rate=16000, batch_size=8, cancel_tokens=None):
+            return [{"text": "cat", "confidence": 0.9} for _ in audios]
+
+    analyzer = SpeechAnalyzer()
+    analyzer.model_wrapper = FakeModel()
+    monkeypatch.setattr(load_shedder, "should_shed", lambda: True)
+
+    # 25 s of speech without a pause, of which 13 s had arrived for the early pass
+    sr = 16000
+    audio = 0.001 * np.random.default_rng(0).standard_normal(27 * sr)
+    audio[sr:26 * sr] += 0.5 * np.tile(synthetic_vowel([700, 1220, 2600]), 25)
+    early = analyzer.analyze_utterances(audio[:13 * sr], "cat", until=12.0)
+    final = analyzer.analyze_utterances(audio, "cat", after=early["handled_until"])
+
+    spans = [(u["start"], u["end"]) for u in early["utterances"] + final["utterances"]]
+    assert len(early["utterances"]) >= 1 and early["rejected"] == final["rejected"] == 0
+    assert spans[0][0] < 1.0 and spans[-1][1] > 26.0
+    # Each region starts where the previous one stopped (or inside its padding)
+    assert all(start <= previous_end for (_, previous_end), (start, _) in zip(spans, spans[1:]))
+
+
+def test_video_lip_sync_analysis_samples_the_oversampled_grid(tmp_path, monkeypatch, write_test_video):
+    pytest.importorskip("av")
+    pytest.importorskip("cv2")
+    from src.config import settings
+    from src.services.video_analyzer import VideoAnalyzer
+
+    # 20 s of 640x480 with a (speechless) audio track: lip-motion grid is oversampled
+    audio = 0.001 * np.random.default_rng(0).standard_normal(20 * 16000)
+    path = write_test_video(str(tmp_path / "session.mp4"), seconds=20, audio=audio)
+    monkeypatch.setattr(settings, "VIDEO_FRAME_WORKERS", 0)
+    result = VideoAnalyzer().analyze_video(path)
+
+    assert result["video"]["frames_analyzed"] == 20 * settings.VIDEO_SAMPLE_FPS
+    assert result["articulation"]["mouth_samples"] == 0 and result["articulation"]["av_sync_score"] is None